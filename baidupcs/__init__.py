@@ -10,3 +10,8 @@ __license__ = 'MIT'
 __copyright__ = 'Copyright (c) 2014 mozillazg'
 
 from .api import PCS, InvalidToken
+from .models import (FileEntry, RecycleEntry, Quota, DownloadTask,
+                     FileList, DiffPage)
+from .index import MetadataIndex
+from .search import multi_search
+from .pool import PCSPool, NoAvailableClient
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""分片传输时的分片大小和并发数控制."""
+
+from collections import deque
+import sys
+import threading
+import time
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+class PermanentError(Exception):
+    """异常：重试也不会成功的错误，:func:`run_chunks` 遇到时不再重试."""
+    pass
+
+
+class FixedController(object):
+    """固定的分片大小和并发数."""
+
+    def __init__(self, chunk_size, streams=4):
+        self.chunk_size = chunk_size
+        self.streams = streams
+        self.max_streams = streams
+
+    def record(self, nbytes, seconds, ok):
+        pass
+
+
+class AdaptiveController(object):
+    """根据传输情况动态调整分片大小和并发数（类似 TCP 拥塞控制）.
+
+    * 分片失败时分片大小和并发数减半（乘性减）；
+    * 每完成 ``window`` 个分片比较一次总吞吐量（分片的平均速度乘以
+      并发数）：比上一次高则继续沿同一方向调整（并发数加一、分片大小
+      翻倍），否则反向调整。
+
+    :param initial_chunk: 初始分片大小。
+    :param min_chunk: 最小分片大小。
+    :param max_chunk: 最大分片大小。
+    :param min_streams: 最小并发数。
+    :param max_streams: 最大并发数。
+    :param window: 每次调整之间完成的分片数。
+    """
+
+    def __init__(self, initial_chunk=4 * 1024 * 1024,
+                 min_chunk=256 * 1024, max_chunk=64 * 1024 * 1024,
+                 min_streams=1, max_streams=8, initial_streams=2, window=4):
+        self.chunk_size = initial_chunk
+        self.min_chunk = min_chunk
+        self.max_chunk = max_chunk
+        self.streams = initial_streams
+        self.min_streams = min_streams
+        self.max_streams = max_streams
+        self.window = window
+        self._direction = 1
+        self._last_throughput = None
+        self._samples = deque()
+        self._lock = threading.Lock()
+        self._clamp()
+
+    def _clamp(self):
+        self.chunk_size = int(min(max(self.chunk_size, self.min_chunk),
+                                  self.max_chunk))
+        self.streams = int(min(max(self.streams, self.min_streams),
+                               self.max_streams))
+
+    def _step(self, direction):
+        if direction > 0:
+            self.streams += 1
+            self.chunk_size *= 2
+        else:
+            self.streams -= 1
+            self.chunk_size //= 2
+        self._clamp()
+
+    def record(self, nbytes, seconds, ok):
+        """记录一个分片的传输结果.
+
+        :param nbytes: 分片大小。
+        :param seconds: 传输耗时。
+        :param ok: 是否成功。
+        """
+        with self._lock:
+            if not ok:
+                self.chunk_size //= 2
+                self.streams //= 2
+                self._clamp()
+                self._samples.clear()
+                self._last_throughput = None
+                self._direction = 1
+                return
+            self._samples.append((nbytes, seconds))
+            if len(self._samples) < self.window:
+                return
+            elapsed = max(sum(x[1] for x in self._samples), 1e-6)
+            throughput = (sum(x[0] for x in self._samples) / elapsed *
+                          self.streams)
+            if (self._last_throughput is not None and
+                    throughput < self._last_throughput):
+                self._direction = -self._direction
+            self._last_throughput = throughput
+            self._samples.clear()
+            self._step(self._direction)
+
+
+def _gaps(size, done):
+    """返回 [0, size) 中没有被 ``done`` 的 (offset, length) 覆盖的区间."""
+    gaps = []
+    position = 0
+    for offset, length in sorted(done):
+        if offset > position:
+            gaps.append((position, offset - position))
+        position = max(position, offset + length)
+    if position < size:
+        gaps.append((position, size - position))
+    return gaps
+
+
+def run_chunks(controller, size, func, done=(), max_chunks=None,
+               retries=3):
+    """把 [0, size) 中尚未完成的部分按 ``controller`` 的分片大小切分，
+    以 ``controller`` 的并发数调用 ``func(offset, length)`` ，
+    按完成顺序返回 ``(offset, length, result)`` 。
+
+    :param controller: :class:`FixedController` 或
+                       :class:`AdaptiveController` 对象。
+    :param size: 总字节数。
+    :param func: 传输一个分片的函数。
+    :param done: 已经完成的 ``(offset, length)`` 列表。
+    :param max_chunks: 分片总数（包括 ``done``）的上限。
+    :param retries: 每个分片失败后的重试次数，
+                    :class:`PermanentError` 不重试。
+    """
+    pending = deque(_gaps(size, done))
+    results = queue.Queue()
+    used = len(done)
+    active = 0
+    failures = {}
+
+    def work(offset, length):
+        start = time.time()
+        try:
+            result = func(offset, length)
+        except Exception:
+            results.put((offset, length, None, time.time() - start,
+                         sys.exc_info()))
+        else:
+            results.put((offset, length, result, time.time() - start, None))
+
+    while pending or active:
+        while pending and active < controller.streams:
+            offset, length = pending.popleft()
+            chunk = controller.chunk_size
+            if max_chunks:
+                remaining = length + sum(x[1] for x in pending)
+                chunk = max(chunk, -(-remaining // max(max_chunks - used, 1)))
+            if length > chunk:
+                pending.appendleft((offset + chunk, length - chunk))
+                length = chunk
+            used += 1
+            active += 1
+            thread = threading.Thread(target=work, args=(offset, length))
+            thread.daemon = True
+            thread.start()
+
+        offset, length, result, seconds, exc_info = results.get()
+        active -= 1
+        controller.record(length, seconds, exc_info is None)
+        if exc_info is not None:
+            failures[offset] = failures.get(offset, 0) + 1
+            if (failures[offset] > retries or
+                    isinstance(exc_info[1], PermanentError)):
+                raise exc_info[1]
+            used -= 1
+            pending.appendleft((offset, length))
+            continue
+        yield offset, length, result
@@ -1,18 +1,19 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import binascii
 from functools import wraps
 import json
-try:
-    from urllib import urlencode
-except ImportError:
-    from urllib.parse import urlencode
+import os
 
-import requests
-from requests_toolbelt import MultipartEncoder
+# requests 和 requests_toolbelt 在第一次发送请求时才导入，
+# 减少 ``import baidupcs`` 的耗时
 
 API_TEMPLATE = 'https://pcs.baidu.com/rest/2.0/pcs/{0}'
 
+# (api_template, uri) -> url
+_urls = {}
+
 
 class InvalidToken(Exception):
     """异常：Access Token 不正确或者已经过期."""
@@ -24,22 +25,62 @@ def check_token(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
         response = func(*args, **kwargs)
-        if response.status_code == 401:
-            raise InvalidToken('Access token invalid or no longer valid')
-        else:
-            return response
+        if hasattr(response, 'add_done_callback'):
+            # AsyncTransport 返回的 Future
+            from .transport import then
+            return then(response, _check_status)
+        return _check_status(response)
     return wrapper
 
 
+def _check_status(response):
+    if response.status_code == 401:
+        raise InvalidToken('Access token invalid or no longer valid')
+    else:
+        return response
+
+
+def _encode_files(files):
+    """编码 multipart/form-data 请求体，返回 ``(请求体, Content-Type)`` .
+
+    内容都是 bytes 时直接拼接成一个请求体，只复制一次数据；
+    包含文件对象时使用 ``MultipartEncoder`` 流式读取。
+    """
+    if not all(isinstance(x[1], bytes) for x in files.values()):
+        from requests_toolbelt import MultipartEncoder
+        data = MultipartEncoder(files)
+        return data, data.content_type
+    boundary = binascii.hexlify(os.urandom(16)).decode('ascii')
+    parts = []
+    for name, (filename, content, content_type) in files.items():
+        head = '--%s\r\nContent-Disposition: form-data; name="%s"; ' \
+               'filename="%s"\r\n' % (boundary, name, filename)
+        if content_type:
+            head += 'Content-Type: %s\r\n' % content_type
+        parts.extend([(head + '\r\n').encode('utf-8'), content, b'\r\n'])
+    parts.append(('--%s--\r\n' % boundary).encode('ascii'))
+    return (b''.join(parts),
+            'multipart/form-data; boundary=%s' % boundary)
+
+
 class BaseClass(object):
-    def __init__(self, access_token, api_template=API_TEMPLATE):
+    def __init__(self, access_token, api_template=API_TEMPLATE,
+                 session=None, hedger=None, breakers=None, transport=None):
+        if getattr(transport, 'is_async', False) and (hedger or breakers):
+            raise ValueError('hedger and breakers can not be used with '
+                             'an async transport')
         self.access_token = access_token
         self.api_template = api_template
+        self.session = session
+        self.hedger = hedger
+        self.breakers = breakers
+        self.transport = transport
 
     def _remove_empty_items(self, data):
-        for k, v in data.copy().items():
-            if v is None:
-                data.pop(k)
+        # 只删除值为 None 的项，不复制整个 dict
+        empty = [k for k, v in data.items() if v is None]
+        for k in empty:
+            del data[k]
 
     @check_token
     def _request(self, uri, method, url=None, extra_params=None,
@@ -49,28 +90,45 @@ class BaseClass(object):
             'access_token': self.access_token
         }
         if extra_params:
-            params.update(extra_params)
-            self._remove_empty_items(params)
+            for k, v in extra_params.items():
+                if v is not None:
+                    params[k] = v
 
         if not url:
-            url = self.api_template.format(uri)
-        api = url
+            url = _urls.get((self.api_template, uri))
+            if url is None:
+                url = self.api_template.format(uri)
+                _urls[(self.api_template, uri)] = url
+        http = self.transport
+        if http is None:
+            http = self.session
+            if http is None:
+                import requests as http
 
         if data or files:
-            api = '%s?%s' % (url, urlencode(params))
             if data:
                 self._remove_empty_items(data)
             else:
                 self._remove_empty_items(files)
-                data = MultipartEncoder(files)
+                data, content_type = _encode_files(files)
                 if kwargs.get('headers'):
-                    kwargs['headers']['Content-Type'] = data.content_type
+                    kwargs['headers']['Content-Type'] = content_type
                 else:
-                    kwargs['headers'] = {'Content-Type': data.content_type}
-            response = requests.post(api, data=data, **kwargs)
+                    kwargs['headers'] = {'Content-Type': content_type}
+
+            def send():
+                return http.post(url, params=params, data=data, **kwargs)
+        elif (self.hedger is not None and (uri, method) in self.hedger.apis
+                and not kwargs.get('stream')):
+            def send():
+                return self.hedger.call((uri, method), lambda: http.get(
+                    url, params=params, **kwargs))
         else:
-            response = requests.get(api, params=params, **kwargs)
-        return response
+            def send():
+                return http.get(url, params=params, **kwargs)
+        if self.breakers is not None:
+            return self.breakers.call(url, send)
+        return send()
 
 
 class PCS(BaseClass):
@@ -91,6 +149,17 @@ class PCS(BaseClass):
       >>>
       >>> response.json()  # 将 json 字符串转换为 python dict
       {u'used': 5138887, u'quota': 6442450944L, u'request_id': 1216061570}
+
+    指定 ``session`` （``requests.Session`` 对象）时所有请求复用它的连接::
+
+      >>> pcs = PCS('access_token', session=requests.Session())
+
+    指定 ``hedger`` （``baidupcs.hedging.Hedger`` 对象）时对慢的只读请求
+    发送对冲请求；指定 ``breakers`` （``baidupcs.breaker.CircuitBreakers``
+    对象）时按域名熔断请求。
+
+    指定 ``transport`` 时使用它发送请求，见 ``baidupcs.transport`` ，
+    例如 ``MemoryTransport`` 不发送请求而是返回预先设置的响应。
     """
     def info(self, **kwargs):
         """获取当前用户空间配额信息.
@@ -100,6 +169,42 @@ class PCS(BaseClass):
 
         return self._request('quota', 'info', **kwargs)
 
+    def disk_usage(self, remote_path, depth=0, workers=4, index=None):
+        """统计目录及其子目录中文件的总大小和文件数.
+
+        并发调用 ``list_files`` 遍历目录；指定 ``index`` 时
+        通过 ``diff`` 增量更新本地索引后在索引中统计。
+
+        :param remote_path: 网盘中目录的路径，必须以 /apps/ 开头。
+        :param depth: 单独统计的子目录层数，0 表示只统计 ``remote_path`` 。
+        :param workers: 同时进行的 ``list_files`` 请求数。
+        :param index: （可选）``baidupcs.MetadataIndex`` 对象。
+        :return: 以目录路径为键，``baidupcs.usage.Usage`` 为值的 dict
+        """
+        from .usage import disk_usage
+        return disk_usage(self, remote_path, depth=depth, workers=workers,
+                          index=index)
+
+    def open(self, remote_path, block_size=1024 * 1024, cache_blocks=32,
+             read_ahead=2, **kwargs):
+        """以只读方式打开网盘中的文件，只下载实际读取的部分.
+
+        ::
+
+          >>> with pcs.open('/apps/test_sdk/big.zip') as f:
+          ...     print(zipfile.ZipFile(f).namelist())
+
+        :param remote_path: 网盘中文件的路径，必须以 /apps/ 开头。
+        :param block_size: 每个 ``Range`` 请求下载的块大小。
+        :param cache_blocks: 最多缓存的块数。
+        :param read_ahead: 顺序读取时预先下载的块数。
+        :return: ``baidupcs.remotefile.RemoteFile`` 对象
+        """
+        from .remotefile import RemoteFile
+        return RemoteFile(self, remote_path, block_size=block_size,
+                          cache_blocks=cache_blocks, read_ahead=read_ahead,
+                          **kwargs)
+
     def upload(self, remote_path, file_content, ondup=None, **kwargs):
         """上传单个文件（<2G）.
 
@@ -384,7 +489,7 @@ class PCS(BaseClass):
         }
         return self._request('file', 'move', data=data, **kwargs)
 
-    def copy(self, from_path, to_path, **kwargs):
+    def copy(self, from_path, to_path, ondup=None, **kwargs):
         """拷贝文件或目录.
 
         :param from_path: 源文件/目录在网盘中的路径（包括文件名）。
@@ -403,6 +508,7 @@ class PCS(BaseClass):
                             * 文件名或路径名开头结尾不能是 ``.``
                               或空白字符，空白字符包括：
                               ``\\r, \\n, \\t, 空格, \\0, \\x0B`` 。
+        :param ondup: （可选）目标文件已经存在时的处理方式，同 :meth:`upload` 。
         :return: Response 对象
 
         .. warning::
@@ -414,7 +520,8 @@ class PCS(BaseClass):
             'from': from_path,
             'to': to_path,
         }
-        return self._request('file', 'copy', data=data, **kwargs)
+        return self._request('file', 'copy', extra_params={'ondup': ondup},
+                             data=data, **kwargs)
 
     def multi_copy(self, path_list, **kwargs):
         """批量拷贝文件或目录.
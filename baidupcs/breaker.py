@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""按域名（pcs/c.pcs/d.pcs.baidu.com）熔断请求."""
+
+from collections import deque
+import threading
+import time
+try:
+    from urlparse import urlparse
+except ImportError:
+    from urllib.parse import urlparse
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpen(Exception):
+    """异常：域名的熔断器处于打开状态，请求没有发送."""
+
+    def __init__(self, host, retry_after):
+        super(CircuitOpen, self).__init__(
+            'Circuit for %s is open, retry after %.1f seconds' % (
+                host, retry_after))
+        self.host = host
+        self.retry_after = retry_after
+
+
+class CircuitBreaker(object):
+    """单个域名的熔断器.
+
+    * closed：正常发送请求，记录最近 ``window`` 个请求的结果；至少有
+      ``min_requests`` 个记录且失败（异常或 5xx）的比例达到
+      ``error_rate`` 、或者慢请求（超过 ``slow_seconds`` 秒）的比例达到
+      ``slow_rate`` 时打开；
+    * open：直接抛出 :class:`CircuitOpen` ，``reset_timeout`` 秒后进入
+      half_open ；
+    * half_open：只允许 ``half_open_requests`` 个试探请求，都成功后关闭，
+      有一个失败就重新打开。
+
+    :param listener: （可选）状态变化时调用
+                     ``listener(host, 原状态, 新状态)`` ，可以用来上报监控。
+    """
+
+    def __init__(self, host, error_rate=0.5, slow_seconds=10, slow_rate=0.5,
+                 min_requests=10, window=50, reset_timeout=30,
+                 half_open_requests=1, listener=None):
+        self.host = host
+        self.error_rate = error_rate
+        self.slow_seconds = slow_seconds
+        self.slow_rate = slow_rate
+        self.min_requests = min_requests
+        self.reset_timeout = reset_timeout
+        self.half_open_requests = half_open_requests
+        self.listener = listener
+        self.state = CLOSED
+        self.opened_at = None
+        self._results = deque(maxlen=window)
+        self._probes = 0
+        self._successes = 0
+        self._lock = threading.Lock()
+
+    def _set_state(self, state):
+        old, self.state = self.state, state
+        if state == OPEN:
+            self.opened_at = time.time()
+        self._results.clear()
+        self._probes = self._successes = 0
+        if self.listener is not None and old != state:
+            self.listener(self.host, old, state)
+
+    def before(self):
+        """发送请求前调用，熔断器打开时抛出 :class:`CircuitOpen` ."""
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self.opened_at + self.reset_timeout - time.time()
+                if remaining > 0:
+                    raise CircuitOpen(self.host, remaining)
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_requests:
+                    raise CircuitOpen(self.host, 0)
+                self._probes += 1
+
+    def cancel(self):
+        """请求被中断、没有结果时调用，归还 half_open 的试探名额."""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record(self, ok, seconds):
+        """记录请求的结果和耗时."""
+        slow = seconds > self.slow_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                if not ok or slow:
+                    self._set_state(OPEN)
+                else:
+                    self._successes += 1
+                    if self._successes >= self.half_open_requests:
+                        self._set_state(CLOSED)
+                return
+            if self.state != CLOSED:
+                return
+            self._results.append((ok, slow))
+            total = len(self._results)
+            if total < self.min_requests:
+                return
+            errors = sum(1 for x in self._results if not x[0])
+            slows = sum(1 for x in self._results if x[1])
+            if (errors >= self.error_rate * total or
+                    slows >= self.slow_rate * total):
+                self._set_state(OPEN)
+
+    def stats(self):
+        with self._lock:
+            return {'state': self.state, 'requests': len(self._results),
+                    'errors': sum(1 for x in self._results if not x[0]),
+                    'slow': sum(1 for x in self._results if x[1])}
+
+
+class CircuitBreakers(object):
+    """每个域名一个 :class:`CircuitBreaker` ::
+
+      >>> pcs = PCS('access_token', breakers=CircuitBreakers(
+      ...     listener=lambda host, old, new: log.warning(
+      ...         '%s: %s -> %s', host, old, new)))
+
+    :param options: 创建 :class:`CircuitBreaker` 的参数。
+    """
+
+    def __init__(self, **options):
+        self.options = options
+        self._breakers = {}
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def get(self, host):
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(
+                    host, **self.options)
+            return breaker
+
+    def call(self, url, func):
+        """通过 ``url`` 所在域名的熔断器调用 ``func()`` 发送请求."""
+        host = self._hosts.get(url)
+        if host is None:
+            host = self._hosts[url] = urlparse(url).netloc
+        breaker = self.get(host)
+        breaker.before()
+        start = time.time()
+        ok = None
+        try:
+            response = func()
+            ok = response.status_code < 500
+        except Exception:
+            ok = False
+            raise
+        finally:
+            if ok is None:
+                # KeyboardInterrupt 等中断不代表域名不可用
+                breaker.cancel()
+            else:
+                breaker.record(ok, time.time() - start)
+        return response
+
+    def stats(self):
+        """返回 ``{域名: 状态统计}`` ."""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return dict((x.host, x.stats()) for x in breakers)
@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""把大量小文件打包成少数几个大文件（bundle）保存.
+
+每个 bundle 是网盘中的一个普通文件 ``<名称>.pack`` ，按顺序拼接各个小文件的
+内容；同名的 ``<名称>.idx`` 是它的索引，保存每个小文件的
+``[文件名, 偏移, 长度, md5]`` 。读取单个小文件只需要一个 ``Range`` 请求。
+
+::
+
+  >>> with BundleWriter(pcs, '/apps/test_sdk/logs') as writer:
+  ...     for path in paths:
+  ...         writer.add_file(path)
+  >>> reader = BundleReader(pcs, '/apps/test_sdk/logs').load()
+  >>> reader.read('2014-03-23.log')
+"""
+
+import binascii
+from hashlib import md5
+import json
+import os
+import posixpath
+import time
+
+from .hashing import BLOCK_SIZE, block_size_for
+from .jsonlib import response_json
+from .models import FileList
+from .transfer import check_integrity, upload_block
+from .utils import imap_unordered
+
+BUNDLE_SUFFIX = '.pack'
+INDEX_SUFFIX = '.idx'
+
+
+class BundleWriter(object):
+    """把小文件追加到 bundle 中上传.
+
+    内容按 ``block_size`` 分片，每攒够 ``workers`` 个分片就并发
+    ``upload_tmpfile`` ，内存中最多保存 ``workers`` 个分片；bundle 达到
+    ``bundle_size`` 后用 ``upload_superfile`` 合并，然后上传它的索引。
+    小文件不会跨越两个 bundle 。
+
+    只有索引上传成功的 bundle 才能被 :class:`BundleReader` 读取，
+    上传过程中出错时已经写入的小文件需要重新添加。单个小文件不能超过
+    ``bundle_size`` ，否则分片数可能超出 ``upload_superfile`` 的限制。
+
+    :param pcs: PCS 对象
+    :param remote_dir: 保存 bundle 和索引的目录。
+    :param bundle_size: 每个 bundle 的大小上限。
+    :param block_size: 分片大小。
+    :param workers: 同时上传的分片数。
+    :param prefix: （可选）bundle 的文件名前缀，默认为当前时间加随机数，
+                   多个 writer 可以写入同一个目录。
+    """
+
+    def __init__(self, pcs, remote_dir, bundle_size=256 * 1024 * 1024,
+                 block_size=BLOCK_SIZE, workers=4, prefix=None):
+        self.pcs = pcs
+        self.remote_dir = remote_dir
+        self.bundle_size = bundle_size
+        self.block_size = block_size_for(bundle_size, block_size)
+        self.workers = workers
+        if prefix is None:
+            prefix = '%s-%s' % (time.strftime('%Y%m%d%H%M%S'),
+                                binascii.hexlify(os.urandom(4)).decode())
+        self.prefix = prefix
+        #: 已经上传的 bundle 路径
+        self.bundles = []
+        #: 已经上传的小文件数
+        self.files = 0
+        self._start_bundle()
+
+    def _start_bundle(self):
+        self._entries = []
+        self._size = 0
+        self._buffer = bytearray()
+        self._blocks = []
+        self._block_list = []
+
+    def _path(self, suffix):
+        return posixpath.join(self.remote_dir, '%s-%05d%s' % (
+            self.prefix, len(self.bundles), suffix))
+
+    def add(self, name, content):
+        """添加文件名为 ``name`` 、内容为 ``content`` （bytes）的文件."""
+        if len(content) > self.bundle_size:
+            raise ValueError('%s is larger than bundle_size (%d > %d)' % (
+                name, len(content), self.bundle_size))
+        if self._entries and self._size + len(content) > self.bundle_size:
+            self.flush()
+        self._entries.append([name, self._size, len(content),
+                              md5(content).hexdigest()])
+        self._size += len(content)
+        self._buffer.extend(content)
+        # 保留最后一个分片，这样 flush 时至少还有一个分片没有上传
+        while len(self._buffer) > self.block_size:
+            self._blocks.append(bytes(self._buffer[:self.block_size]))
+            del self._buffer[:self.block_size]
+            if len(self._blocks) >= self.workers:
+                self._upload_blocks()
+
+    def add_file(self, local_path, name=None):
+        """添加本地文件，``name`` 默认为文件名."""
+        with open(local_path, 'rb') as f:
+            content = f.read()
+        self.add(name or os.path.basename(local_path), content)
+
+    def _upload_blocks(self):
+        start = len(self._block_list)
+        self._block_list.extend([None] * len(self._blocks))
+        for (index, _), block_md5 in imap_unordered(
+                lambda item: upload_block(self.pcs, item[1]),
+                enumerate(self._blocks), self.workers):
+            self._block_list[start + index] = block_md5
+        self._blocks = []
+
+    def flush(self):
+        """上传当前的 bundle 和它的索引."""
+        if not self._entries:
+            return None
+        path = self._path(BUNDLE_SUFFIX)
+        if not self._block_list and not self._blocks:
+            response = self.pcs.upload(path, bytes(self._buffer),
+                                       ondup='overwrite')
+        else:
+            self._blocks.append(bytes(self._buffer))
+            self._upload_blocks()
+            response = self.pcs.upload_superfile(path, self._block_list,
+                                                 ondup='overwrite')
+        response.raise_for_status()
+        check_integrity(self._size, response_json(response).get('size'),
+                        'Size of %s' % path)
+        index = {'bundle': posixpath.basename(path), 'size': self._size,
+                 'files': self._entries}
+        response = self.pcs.upload(
+            self._path(INDEX_SUFFIX),
+            json.dumps(index, separators=(',', ':')).encode('utf-8'),
+            ondup='overwrite')
+        response.raise_for_status()
+        self.bundles.append(path)
+        self.files += len(self._entries)
+        self._start_bundle()
+        return path
+
+    close = flush
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+
+
+class BundleReader(object):
+    """读取 :class:`BundleWriter` 上传的小文件.
+
+    :param pcs: PCS 对象
+    :param remote_dir: 保存 bundle 和索引的目录。
+    :param workers: 加载索引时同时下载的索引数。
+    """
+
+    def __init__(self, pcs, remote_dir, workers=4):
+        self.pcs = pcs
+        self.remote_dir = remote_dir
+        self.workers = workers
+        self._files = {}
+
+    def _load_index(self, path):
+        response = self.pcs.download(path)
+        response.raise_for_status()
+        return response_json(response)
+
+    def load(self):
+        """下载目录中的所有索引；同名的文件以较新的 bundle 中的为准.
+
+        新旧按索引文件的修改时间比较，修改时间相同时再按路径比较，
+        与 bundle 的文件名前缀无关。
+        """
+        response = self.pcs.list_files(self.remote_dir)
+        response.raise_for_status()
+        entries = [x for x in FileList.from_response(response)
+                   if x.path.endswith(INDEX_SUFFIX)]
+        indexes = dict(imap_unordered(self._load_index,
+                                      [x.path for x in entries],
+                                      self.workers))
+        files = {}
+        for entry in sorted(entries, key=lambda x: (x.mtime, x.path)):
+            index = indexes[entry.path]
+            bundle = posixpath.join(self.remote_dir, index['bundle'])
+            for name, offset, length, content_md5 in index['files']:
+                files[name] = (bundle, offset, length, content_md5)
+        self._files = files
+        return self
+
+    def __contains__(self, name):
+        return name in self._files
+
+    def __len__(self):
+        return len(self._files)
+
+    def names(self):
+        return sorted(self._files)
+
+    def entry(self, name):
+        """返回 ``(bundle 路径, 偏移, 长度, md5)`` ."""
+        return self._files[name]
+
+    def read(self, name, check_md5=True):
+        """用一个 ``Range`` 请求读取文件 ``name`` 的内容.
+
+        :param check_md5: 是否校验读取的内容，不一致时抛出
+                          :class:`~baidupcs.transfer.IntegrityError` 。
+        """
+        bundle, offset, length, content_md5 = self._files[name]
+        if not length:
+            return b''
+        response = self.pcs.download(bundle, headers={
+            'Range': 'bytes=%d-%d' % (offset, offset + length - 1)})
+        response.raise_for_status()
+        content = response.content
+        if response.status_code != 206:
+            content = content[offset:offset + length]
+        if check_md5:
+            check_integrity(content_md5, md5(content).hexdigest(),
+                            'MD5 of %s' % name)
+        return content
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""元信息、缩略图和文件校验值的缓存.
+
+:class:`MemoryCache` 只在当前进程内有效；:class:`SQLiteCache` 把数据
+保存在本机的 SQLite 文件中，由 SQLite 的文件锁保证多进程（例如多个
+gunicorn/celery worker）同时读写的安全，所有进程共享命中和淘汰。
+"""
+
+from collections import OrderedDict
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from .hashing import file_digest
+from .models import FileEntry
+from .utils import sqlite_connect
+
+
+class BaseCache(object):
+    """缓存接口，值可以是任意可以 pickle 的对象."""
+
+    def get(self, key, default=None):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        """保存 ``value`` ，``ttl`` 秒后过期（None 表示不过期）."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def get_or_set(self, key, func, ttl=None):
+        """缓存中没有 ``key`` 时调用 ``func()`` 并保存结果."""
+        value = self.get(key, _missing)
+        if value is _missing:
+            value = func()
+            self.set(key, value, ttl)
+        return value
+
+
+_missing = object()
+
+
+class MemoryCache(BaseCache):
+    """进程内的 LRU 缓存.
+
+    :param max_entries: 最多保存的条目数。
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+            if item is None or (item[1] and item[1] < time.time()):
+                return default
+            self._data[key] = item
+            return item[0]
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache(BaseCache):
+    """保存在 SQLite 文件中、多个进程共享的 LRU 缓存.
+
+    每个进程/线程使用自己的连接（``fork`` 之后重新连接），数据库使用
+    WAL 模式，读操作不会被其他进程的写操作阻塞。为了减少写操作，
+    条目的访问时间最多每 ``touch_interval`` 秒更新一次；条目数在每个
+    进程的第一次写入以及之后每 ``cull_interval`` 次写入时检查一次，
+    因此可能暂时超出 ``max_entries`` 。
+
+    ::
+
+      >>> cache = SQLiteCache(os.path.expanduser('~/.cache/baidupcs.db'))
+      >>> entry = cached_meta(pcs, '/apps/test_sdk/test.txt', cache)
+
+    .. warning::
+       值使用 pickle 保存，读取时可以执行数据库文件中的任意代码。
+       数据库文件必须放在只有当前用户可以写入的目录中，不要使用 ``/tmp``
+       等共享目录，也不要打开不可信的数据库文件。
+
+    :param path: 数据库文件路径。
+    :param max_entries: 最多保存的条目数，超出后淘汰最久没有访问的
+                        ``1 / cull_frequency`` 。
+    :param cull_frequency: 见 ``max_entries`` 。
+    :param cull_interval: 检查条目数的写入间隔，默认为
+                          ``max_entries / 100`` 。
+    :param timeout: 等待其他进程释放锁的秒数。
+    :param touch_interval: 更新访问时间的最小间隔（秒）。
+    """
+
+    def __init__(self, path, max_entries=10000, cull_frequency=10,
+                 timeout=30, touch_interval=1, cull_interval=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.cull_frequency = cull_frequency
+        if cull_interval is None:
+            cull_interval = max(max_entries // 100, 1)
+        self.cull_interval = cull_interval
+        self._writes = (None, 0)
+        self._writes_lock = threading.Lock()
+        self.timeout = timeout
+        self.touch_interval = touch_interval
+        self._local = threading.local()
+        with self._connect() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS cache ('
+                       'key TEXT PRIMARY KEY, value BLOB, '
+                       'expires REAL, accessed REAL)')
+            db.execute('CREATE INDEX IF NOT EXISTS cache_accessed '
+                       'ON cache (accessed)')
+
+    def _connect(self):
+        return sqlite_connect(self._local, self.path, self.timeout)
+
+    def get(self, key, default=None):
+        db = self._connect()
+        row = db.execute('SELECT value, expires, accessed FROM cache '
+                         'WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return default
+        now = time.time()
+        if row[1] and row[1] < now:
+            self.delete(key)
+            return default
+        if now - row[2] >= self.touch_interval:
+            with db:
+                db.execute('UPDATE cache SET accessed = ? WHERE key = ?',
+                           (now, key))
+        return pickle.loads(bytes(row[0]))
+
+    def _should_cull(self):
+        pid = os.getpid()
+        with self._writes_lock:
+            writes = self._writes[1] if self._writes[0] == pid else 0
+            self._writes = (pid, writes + 1)
+        return writes % self.cull_interval == 0
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        data = sqlite3.Binary(pickle.dumps(value, 2))
+        db = self._connect()
+        with db:
+            db.execute('INSERT OR REPLACE INTO cache '
+                       '(key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+                       (key, data, now + ttl if ttl else None, now))
+            if not self._should_cull():
+                return
+            count = db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+            if count > self.max_entries:
+                db.execute('DELETE FROM cache WHERE key IN ('
+                           'SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                           (max(count // self.cull_frequency, 1),))
+
+    def delete(self, key):
+        db = self._connect()
+        with db:
+            db.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def clear(self):
+        db = self._connect()
+        with db:
+            db.execute('DELETE FROM cache')
+
+    def __len__(self):
+        db = self._connect()
+        return db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+
+def cached_meta(pcs, remote_path, cache, ttl=60):
+    """通过缓存获取文件/目录的 :class:`~baidupcs.models.FileEntry` ."""
+    def meta():
+        response = pcs.meta(remote_path)
+        response.raise_for_status()
+        return FileEntry.from_response(response)[0]
+    return cache.get_or_set('meta:' + remote_path, meta, ttl)
+
+
+def cached_thumbnail(pcs, remote_path, height, width, cache, quality=100,
+                     ttl=None):
+    """通过缓存获取图片的缩略图内容（bytes）."""
+    def thumbnail():
+        response = pcs.thumbnail(remote_path, height, width, quality=quality)
+        response.raise_for_status()
+        return response.content
+    key = 'thumbnail:%s:%dx%d:%d' % (remote_path, height, width, quality)
+    return cache.get_or_set(key, thumbnail, ttl)
+
+
+def cached_digest(local_path, cache):
+    """通过缓存计算本地文件的 :class:`~baidupcs.hashing.FileDigest` ，
+    文件的大小或修改时间变化后重新计算."""
+    stat = os.stat(local_path)
+    key = 'digest:%s:%d:%r' % (os.path.abspath(local_path), stat.st_size,
+                               stat.st_mtime)
+    return cache.get_or_set(key, lambda: file_digest(local_path))
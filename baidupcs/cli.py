@@ -0,0 +1,339 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""baidupcs 命令行工具.
+
+  $ export BAIDUPCS_ACCESS_TOKEN=xxx
+  $ baidupcs ls /apps/test_sdk
+  $ baidupcs put -w 8 ./photos /apps/test_sdk/photos
+  $ baidupcs get /apps/test_sdk/photos ./photos
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import posixpath
+import sys
+import threading
+import time
+
+STATE_DIR = os.path.join(os.path.expanduser('~'), '.baidupcs', 'state')
+
+
+def format_size(size):
+    for unit in ('B', 'K', 'M', 'G', 'T'):
+        if abs(size) < 1024 or unit == 'T':
+            break
+        size /= 1024.0
+    if unit == 'B':
+        return '%d%s' % (size, unit)
+    return '%.1f%s' % (size, unit)
+
+
+class Progress(object):
+    """在标准错误输出中显示传输进度和速度."""
+
+    def __init__(self, total=None, stream=sys.stderr, interval=0.5):
+        self.total = total
+        self.stream = stream
+        self.interval = interval
+        self.done = 0
+        self.start = self.last = time.time()
+        self._lock = threading.Lock()
+
+    def __call__(self, nbytes):
+        with self._lock:
+            self.done += nbytes
+            now = time.time()
+            if now - self.last >= self.interval:
+                self.last = now
+                self.show(now)
+
+    def show(self, now=None):
+        elapsed = max((now or time.time()) - self.start, 1e-6)
+        text = format_size(self.done)
+        if self.total:
+            text += ' / %s' % format_size(self.total)
+        text += '  %s/s' % format_size(self.done / elapsed)
+        self.stream.write('\r%-40s' % text)
+        self.stream.flush()
+
+    def close(self):
+        self.show()
+        self.stream.write('\n')
+
+
+def _meta(pcs, remote_path):
+    from .models import FileEntry
+    response = pcs.meta(remote_path)
+    response.raise_for_status()
+    return FileEntry.from_response(response)[0]
+
+
+def _run(jobs, func, workers, progress):
+    from .utils import imap_unordered
+    try:
+        for _ in imap_unordered(func, jobs, workers):
+            pass
+    finally:
+        progress.close()
+
+
+def cmd_ls(pcs, args):
+    from .models import FileList
+    response = pcs.list_files(args.remote_path)
+    response.raise_for_status()
+    for entry in FileList.from_response(response):
+        if args.long:
+            print('%s %8s %s %s' % (
+                'd' if entry.isdir else '-',
+                '-' if entry.isdir else format_size(entry.size),
+                time.strftime('%Y-%m-%d %H:%M',
+                              time.localtime(entry.mtime)),
+                entry.name))
+        else:
+            print(entry.name + ('/' if entry.isdir else ''))
+
+
+def _local_files(local_path, remote_path):
+    if os.path.isfile(local_path):
+        yield local_path, remote_path
+        return
+    for root, dirs, files in os.walk(local_path):
+        for name in files:
+            path = os.path.join(root, name)
+            relpath = os.path.relpath(path, local_path)
+            yield path, posixpath.join(remote_path,
+                                       *relpath.split(os.sep))
+
+
+def _controller(args, jobs):
+    if not args.adaptive:
+        return None
+    from .adaptive import AdaptiveController
+    return AdaptiveController(max_streams=args.workers if len(jobs) == 1
+                              else 1)
+
+
+def _scheduler(args, direction):
+    if not args.limit_rate:
+        return None
+    from .scheduler import Scheduler
+    return Scheduler(streams=args.workers,
+                     **{direction + '_rate': args.limit_rate})
+
+
+def _upload(pcs, jobs, args):
+    from .transfer import upload_file
+    total = sum(os.path.getsize(x[0]) for x in jobs)
+    progress = Progress(total)
+    block_workers = args.workers if len(jobs) == 1 else 1
+    scheduler = _scheduler(args, 'upload')
+
+    def upload(job):
+        upload_file(pcs, job[0], job[1], ondup='overwrite',
+                    workers=block_workers,
+                    state_dir=None if args.no_resume else STATE_DIR,
+                    callback=progress, controller=_controller(args, jobs),
+                    scheduler=scheduler)
+    _run(jobs, upload, args.workers, progress)
+
+
+def cmd_put(pcs, args):
+    jobs = []
+    for source in args.local_paths:
+        remote_path = args.remote_path
+        if len(args.local_paths) > 1 or os.path.isdir(source):
+            remote_path = posixpath.join(
+                remote_path, os.path.basename(os.path.abspath(source)))
+        jobs.extend(_local_files(source, remote_path))
+    _upload(pcs, jobs, args)
+
+
+def cmd_sync(pcs, args):
+    """单向同步：把本地目录中新增或大小变化的文件上传到网盘."""
+    from .usage import walk
+    remote = dict((x.path, x)
+                  for x in walk(pcs, args.remote_path, args.workers)
+                  if not x.isdir)
+    local = list(_local_files(args.local_path, args.remote_path))
+    jobs = [(path, remote_path) for path, remote_path in local
+            if remote_path not in remote or
+            remote[remote_path].size != os.path.getsize(path)]
+    _upload(pcs, jobs, args)
+    if args.delete:
+        extra = set(remote) - set(x[1] for x in local)
+        if extra:
+            pcs.multi_delete(sorted(extra)).raise_for_status()
+
+
+def cmd_get(pcs, args):
+    from .transfer import download_file
+    from .usage import walk
+    entry = _meta(pcs, args.remote_path)
+    if entry.isdir:
+        files = [x for x in walk(pcs, args.remote_path, args.workers)
+                 if not x.isdir]
+        prefix = args.remote_path.rstrip('/') + '/'
+        jobs = [(x.path, os.path.join(args.local_path,
+                                      *x.path[len(prefix):].split('/')))
+                for x in files]
+    else:
+        files = [entry]
+        local_path = args.local_path
+        if os.path.isdir(local_path):
+            local_path = os.path.join(local_path, entry.name)
+        jobs = [(entry.path, local_path)]
+    progress = Progress(sum(x.size for x in files))
+    scheduler = _scheduler(args, 'download')
+
+    def download(job):
+        directory = os.path.dirname(os.path.abspath(job[1]))
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:  # 其他线程已经创建
+                pass
+        if args.no_resume:
+            for path in (job[1] + '.part', job[1] + '.part.json'):
+                if os.path.exists(path):
+                    os.remove(path)
+        download_file(pcs, job[0], job[1], callback=progress,
+                      controller=_controller(args, jobs),
+                      scheduler=scheduler)
+    _run(jobs, download, args.workers, progress)
+
+
+def cmd_rm(pcs, args):
+    if len(args.remote_paths) == 1:
+        response = pcs.delete(args.remote_paths[0])
+    else:
+        response = pcs.multi_delete(args.remote_paths)
+    response.raise_for_status()
+
+
+def cmd_mv(pcs, args):
+    pcs.move(args.from_path, args.to_path).raise_for_status()
+
+
+def cmd_cp(pcs, args):
+    pcs.copy(args.from_path, args.to_path).raise_for_status()
+
+
+def cmd_du(pcs, args):
+    from .usage import disk_usage
+    index = None
+    if args.snapshot:
+        from .index import MetadataIndex
+        index = MetadataIndex.load(args.snapshot)
+    usage = disk_usage(pcs, args.remote_path, depth=args.depth,
+                       workers=args.workers, index=index)
+    if index is not None:
+        index.save(args.snapshot)
+    for path in sorted(usage):
+        size = usage[path].size
+        print('%s\t%d\t%s' % (size if args.bytes else format_size(size),
+                              usage[path].files, path))
+
+
+def cmd_quota(pcs, args):
+    from .models import Quota
+    response = pcs.info()
+    response.raise_for_status()
+    quota = Quota.from_response(response)
+    print('used: %s  total: %s  free: %s' % (
+        format_size(quota.used), format_size(quota.quota),
+        format_size(quota.free)))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='baidupcs',
+                                     description='百度个人云存储命令行工具')
+    parser.add_argument('-t', '--access-token',
+                        default=os.environ.get('BAIDUPCS_ACCESS_TOKEN'),
+                        help='Access Token，默认读取环境变量 '
+                             'BAIDUPCS_ACCESS_TOKEN')
+    subparsers = parser.add_subparsers(dest='command')
+
+    def add(name, func, help):
+        sub = subparsers.add_parser(name, help=help)
+        sub.set_defaults(func=func)
+        return sub
+
+    def add_transfer_options(sub):
+        sub.add_argument('-w', '--workers', type=int, default=4,
+                         help='同时传输的文件/分片数')
+        sub.add_argument('--no-resume', action='store_true',
+                         help='不使用之前的传输进度')
+        sub.add_argument('--adaptive', action='store_true',
+                         help='根据网络情况自动调整分片大小和并发数')
+        sub.add_argument('--limit-rate', type=int, metavar='BYTES',
+                         help='限制传输速度（字节/秒）')
+
+    sub = add('ls', cmd_ls, '列出目录')
+    sub.add_argument('-l', '--long', action='store_true')
+    sub.add_argument('remote_path')
+
+    sub = add('put', cmd_put, '上传文件/目录')
+    sub.add_argument('local_paths', nargs='+')
+    sub.add_argument('remote_path')
+    add_transfer_options(sub)
+
+    sub = add('get', cmd_get, '下载文件/目录')
+    sub.add_argument('remote_path')
+    sub.add_argument('local_path', nargs='?', default='.')
+    add_transfer_options(sub)
+
+    sub = add('sync', cmd_sync, '把本地目录同步到网盘')
+    sub.add_argument('local_path')
+    sub.add_argument('remote_path')
+    sub.add_argument('--delete', action='store_true',
+                     help='删除网盘中本地不存在的文件')
+    add_transfer_options(sub)
+
+    sub = add('rm', cmd_rm, '删除文件/目录')
+    sub.add_argument('remote_paths', nargs='+')
+
+    for name, func, help in (('mv', cmd_mv, '移动文件/目录'),
+                             ('cp', cmd_cp, '拷贝文件/目录')):
+        sub = add(name, func, help)
+        sub.add_argument('from_path')
+        sub.add_argument('to_path')
+
+    sub = add('du', cmd_du, '统计目录占用的空间')
+    sub.add_argument('remote_path')
+    sub.add_argument('-d', '--depth', type=int, default=0)
+    sub.add_argument('-b', '--bytes', action='store_true')
+    sub.add_argument('-w', '--workers', type=int, default=4,
+                     help='同时进行的 list_files 请求数')
+    sub.add_argument('--snapshot', metavar='FILE',
+                     help='本地元信息快照文件，再次统计时只获取变化的部分')
+
+    add('quota', cmd_quota, '空间配额信息')
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not getattr(args, 'func', None):
+        parser.print_help()
+        return 2
+    if not args.access_token:
+        parser.error('access token is required')
+
+    from .api import PCS
+    pcs = PCS(args.access_token)
+    try:
+        args.func(pcs, args)
+    except KeyboardInterrupt:
+        return 130
+    except Exception as e:
+        print('baidupcs: error: %s' % e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
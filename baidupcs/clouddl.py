@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""接收离线下载任务完成时的回调，代替轮询 ``query_download_tasks`` ."""
+
+import binascii
+import logging
+import os
+import threading
+import time
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlparse
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlparse
+
+from .jsonlib import response_json
+from .models import DownloadTask
+
+logger = logging.getLogger(__name__)
+
+
+class TaskFuture(object):
+    """离线下载任务的结果，任务完成（成功或失败）后可以获得
+    :class:`~baidupcs.models.DownloadTask` ."""
+
+    def __init__(self, task_id):
+        self.task_id = task_id
+        self._task = None
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def done(self):
+        return self._event.is_set()
+
+    def result(self, timeout=None):
+        """等待任务完成，返回 DownloadTask ；超时时抛出 ``RuntimeError`` ."""
+        if not self._event.wait(timeout):
+            raise RuntimeError('Task %s is not finished' % self.task_id)
+        return self._task
+
+    def add_done_callback(self, func):
+        """任务完成后调用 ``func(future)`` ."""
+        with self._lock:
+            if not self.done():
+                self._callbacks.append(func)
+                return
+        func(self)
+
+    def _set_result(self, task):
+        with self._lock:
+            self._task = task
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for func in callbacks:
+            try:
+                func(self)
+            except Exception:
+                logger.exception('Callback %r of task %s failed', func,
+                                 self.task_id)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def _handle(self):
+        query = parse_qs(urlparse(self.path).query)
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            body = self.rfile.read(length).decode('utf-8', 'replace')
+            for key, value in parse_qs(body).items():
+                query.setdefault(key, value)
+        found = self.server.receiver._notify(
+            (query.get('key') or [None])[0],
+            (query.get('task_id') or [None])[0])
+        self.send_response(200 if found else 404)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    do_GET = do_POST = _handle
+
+    def log_message(self, *args):
+        pass
+
+
+_WILDCARD_HOSTS = ('', '0.0.0.0', '::')
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class CallbackReceiver(object):
+    """可以嵌入应用中的离线下载回调接收服务.
+
+    :meth:`submit` 调用 ``add_download_task`` 时把本服务的地址（带有每个
+    任务不同的 key）作为 ``callback`` ，收到回调后批量调用一次
+    ``query_download_tasks`` 获取任务结果。不论是否收到回调，每隔
+    ``poll_interval`` 秒批量查询一次所有未完成的任务。
+
+    ::
+
+      >>> with CallbackReceiver(pcs, port=8000,
+      ...                       public_url='http://example.com:8000/') as r:
+      ...     future = r.submit('http://example.com/a.iso',
+      ...                       '/apps/test_sdk/a.iso')
+      ...     task = future.result()
+
+    :param pcs: PCS 对象
+    :param host: 监听的地址。
+    :param port: 监听的端口，0 表示随机选择。
+    :param public_url: （可选）百度服务器访问本服务的地址，
+                       默认为 ``http://host:port/`` ；``host`` 为
+                       ``'0.0.0.0'`` 等通配地址时必须指定。
+    :param poll_interval: 轮询没有收到回调的任务的间隔（秒）。
+    :param batch_size: 每次 ``query_download_tasks`` 最多查询的任务数。
+    """
+
+    def __init__(self, pcs, host='0.0.0.0', port=0, public_url=None,
+                 poll_interval=60, batch_size=100):
+        if public_url is None and host in _WILDCARD_HOSTS:
+            raise ValueError('public_url is required when listening on %r'
+                             % host)
+        self.pcs = pcs
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.server = _ThreadingHTTPServer((host, port), _Handler)
+        self.server.receiver = self
+        if public_url is None:
+            public_url = 'http://%s:%d/' % self.server.server_address[:2]
+        self.public_url = public_url
+        self.handlers = []
+        #: 收到的回调数
+        self.callbacks = 0
+        #: ``query_download_tasks`` 请求数
+        self.queries = 0
+        self._futures = {}
+        self._keys = {}
+        self._notified = set()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._threads = []
+        self._last_poll = time.time()
+
+    def start(self):
+        """在后台线程中启动回调服务和轮询."""
+        for target in (self.server.serve_forever, self._loop):
+            thread = threading.Thread(target=target)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._threads:
+            self.server.shutdown()
+            for thread in self._threads:
+                thread.join()
+            self._threads = []
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def on_finished(self, handler):
+        """任务完成后调用 ``handler(DownloadTask)`` ."""
+        self.handlers.append(handler)
+        return handler
+
+    def submit(self, source_url, remote_path, **kwargs):
+        """添加离线下载任务，返回 :class:`TaskFuture` .
+
+        :param kwargs: 传给 ``add_download_task`` 的其他参数。
+        """
+        key = binascii.hexlify(os.urandom(8)).decode('ascii')
+        separator = '&' if '?' in self.public_url else '?'
+        response = self.pcs.add_download_task(
+            source_url, remote_path,
+            callback='%s%skey=%s' % (self.public_url, separator, key),
+            **kwargs)
+        response.raise_for_status()
+        task_id = str(response_json(response)['task_id'])
+        with self._cond:
+            future = self._futures.get(task_id)
+            if future is None:
+                future = self._futures[task_id] = TaskFuture(task_id)
+            self._keys[key] = task_id
+        return future
+
+    def pending(self):
+        """还没有完成的任务 ID 列表."""
+        with self._cond:
+            return sorted(self._futures)
+
+    def _notify(self, key, task_id):
+        with self._cond:
+            task_id = self._keys.get(key, task_id)
+            if task_id not in self._futures:
+                return False
+            self.callbacks += 1
+            self._notified.add(task_id)
+            self._cond.notify_all()
+        return True
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._notified and not self._closed:
+                    timeout = (self._last_poll + self.poll_interval -
+                               time.time())
+                    if timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+                if self._closed:
+                    return
+                # 持续收到回调时也要定期查询所有任务
+                if time.time() - self._last_poll >= self.poll_interval:
+                    task_ids = sorted(self._futures)
+                    self._last_poll = time.time()
+                else:
+                    task_ids = sorted(self._notified)
+                self._notified.clear()
+            try:
+                self.poll(task_ids)
+            except Exception:
+                # 查询失败时下次轮询再重试
+                logger.exception('Failed to query download tasks %r',
+                                 task_ids)
+
+    def poll(self, task_ids=None):
+        """批量查询任务，完成已经结束的任务；默认查询所有未完成的任务."""
+        if task_ids is None:
+            task_ids = self.pending()
+        for start in range(0, len(task_ids), self.batch_size):
+            batch = task_ids[start:start + self.batch_size]
+            response = self.pcs.query_download_tasks(batch)
+            self.queries += 1
+            response.raise_for_status()
+            for task in DownloadTask.from_response(response):
+                if task.finished:
+                    self._finish(task)
+
+    def _finish(self, task):
+        with self._cond:
+            future = self._futures.pop(task.task_id, None)
+            for key in [k for k, v in self._keys.items() if v == task.task_id]:
+                del self._keys[key]
+        if future is None:
+            return
+        future._set_result(task)
+        # 一个 handler 出错不影响其他 handler 和同一批完成的其他任务
+        for handler in self.handlers:
+            try:
+                handler(task)
+            except Exception:
+                logger.exception('Handler %r of task %s failed', handler,
+                                 task.task_id)
@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""上传时流式压缩、下载时流式解压缩.
+
+网盘不支持自定义的文件元信息，压缩格式由文件扩展名决定：
+``.gz`` 为 gzip ，``.zst`` 为 zstd （需要安装 zstandard ，
+``pip install baidupcs[zstd]``）::
+
+  >>> upload_compressed(pcs, 'app.log', '/apps/test_sdk/app.log')
+  >>> download_decompressed(pcs, '/apps/test_sdk/app.log.gz', 'app.log')
+"""
+
+from hashlib import md5
+import itertools
+import os
+import sys
+import threading
+import zlib
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from .hashing import BLOCK_SIZE, GROW_BLOCKS, MAX_BLOCKS
+from .jsonlib import response_json
+from .transfer import check_integrity, finish_download, upload_block
+from .utils import imap_unordered
+
+#: 压缩格式对应的扩展名
+SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+_DONE = object()
+
+
+def codec_for_path(path):
+    """根据扩展名返回压缩格式，不是压缩文件时返回 None ."""
+    for codec, suffix in SUFFIXES.items():
+        if path.endswith(suffix):
+            return codec
+    return None
+
+
+def _compressor(codec, level=None):
+    if codec == 'gzip':
+        return zlib.compressobj(6 if level is None else level, zlib.DEFLATED,
+                                16 + zlib.MAX_WBITS)
+    if codec == 'zstd':
+        import zstandard
+        return zstandard.ZstdCompressor(
+            level=3 if level is None else level).compressobj()
+    raise ValueError('Unsupported codec: %s' % codec)
+
+
+def _decompressor(codec):
+    if codec == 'gzip':
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if codec == 'zstd':
+        import zstandard
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise ValueError('Unsupported codec: %s' % codec)
+
+
+def _compress(fileobj, codec, level, read_size=1024 * 1024):
+    compressor = _compressor(codec, level)
+    for data in iter(lambda: fileobj.read(read_size), b''):
+        data = compressor.compress(data)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _blocks(chunks, block_size, what):
+    """把 ``chunks`` 重新拼接成 ``block_size`` 大小的分片.
+
+    压缩后的大小事先不知道，每 ``GROW_BLOCKS`` 个分片后分片大小加倍，
+    分片数仍然超出 ``MAX_BLOCKS`` 时抛出 IOError 。
+    """
+    buf = bytearray()
+    count = 0
+    for chunk in itertools.chain(chunks, [None]):
+        if chunk is not None:
+            buf.extend(chunk)
+        while len(buf) >= block_size or (chunk is None and buf):
+            if count >= MAX_BLOCKS:
+                raise IOError('%s: upload_superfile supports at most %d '
+                              'blocks' % (what, MAX_BLOCKS))
+            yield bytes(buf[:block_size])
+            del buf[:block_size]
+            count += 1
+            if count % GROW_BLOCKS == 0:
+                block_size *= 2
+
+
+def _decompress(chunks, codec, what):
+    """解压缩 ``chunks`` ，支持首尾相连的多个压缩流（如多 member 的 gzip）."""
+    decompressor = _decompressor(codec)
+    for chunk in chunks:
+        while chunk:
+            if getattr(decompressor, 'eof', False):
+                decompressor = _decompressor(codec)
+            data = decompressor.decompress(chunk)
+            if data:
+                yield data
+            chunk = (decompressor.unused_data
+                     if getattr(decompressor, 'eof', False) else b'')
+    data = decompressor.flush()
+    if data:
+        yield data
+    if not getattr(decompressor, 'eof', True):
+        raise IOError('Compressed content of %s is truncated' % what)
+
+
+def _prefetch(iterable, size=16):
+    """在单独的线程中遍历 ``iterable`` ，最多预先取得 ``size`` 项.
+
+    返回的生成器被关闭（或者被回收）后遍历的线程也会停止。
+    """
+    items = queue.Queue(size)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def feed():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except Exception:
+            put((None, sys.exc_info()))
+            return
+        put((_DONE, None))
+
+    thread = threading.Thread(target=feed)
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            item, exc_info = items.get()
+            if exc_info is not None:
+                raise exc_info[1]
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        stop.set()
+
+
+def upload_compressed(pcs, local_path, remote_path, codec='gzip', level=None,
+                      ondup=None, block_size=BLOCK_SIZE, workers=4,
+                      callback=None, **kwargs):
+    """压缩并上传本地文件.
+
+    压缩在单独的线程中进行，压缩后的内容按 ``block_size`` 分片，
+    与压缩同时用 ``upload_tmpfile`` 并发上传，最后 ``upload_superfile``
+    合并；压缩后只有一个分片时使用 ``upload`` 直接上传。内存中最多
+    保存约 ``3 * workers`` 个分片。压缩后的大小事先不知道，每上传
+    ``GROW_BLOCKS`` 个分片后分片大小加倍，分片数超出 ``MAX_BLOCKS`` 时
+    抛出 IOError 。
+
+    :param pcs: PCS 对象
+    :param local_path: 本地文件路径。
+    :param remote_path: 网盘中文件的保存路径，没有压缩格式的扩展名时
+                        自动添加。
+    :param codec: ``'gzip'`` 或 ``'zstd'`` 。
+    :param level: （可选）压缩级别。
+    :param ondup: 同 ``PCS.upload`` 。
+    :param block_size: 开始时的分片大小。
+    :param workers: 同时上传的分片数。
+    :param callback: （可选）每上传完一个分片后调用
+                     ``callback(压缩后的字节数)`` 。
+    :return: 最后一次请求的 Response 对象
+    """
+    suffix = SUFFIXES.get(codec)
+    if suffix is None:
+        raise ValueError('Unsupported codec: %s' % codec)
+    if not remote_path.endswith(suffix):
+        remote_path += suffix
+
+    def upload_item(item):
+        block_md5 = upload_block(pcs, item[1], **kwargs)
+        if callback:
+            callback(len(item[1]))
+        return block_md5
+
+    with open(local_path, 'rb') as f:
+        blocks = _blocks(_compress(f, codec, level), block_size,
+                         remote_path)
+        first = next(blocks, b'')
+        second = next(blocks, None)
+        if second is None:
+            response = pcs.upload(remote_path, first, ondup=ondup, **kwargs)
+            response.raise_for_status()
+            check_integrity(response_json(response).get('md5'),
+                            md5(first).hexdigest(),
+                            'MD5 of %s' % remote_path)
+            if callback:
+                callback(len(first))
+            return response
+        # imap_unordered 在单独的线程中遍历 blocks ，压缩与上传同时进行
+        block_list = {}
+        size = 0
+        for (index, data), block_md5 in imap_unordered(
+                upload_item, enumerate(itertools.chain([first, second],
+                                                        blocks)),
+                workers):
+            block_list[index] = block_md5
+            size += len(data)
+
+    response = pcs.upload_superfile(
+        remote_path, [block_list[x] for x in sorted(block_list)],
+        ondup=ondup, **kwargs)
+    response.raise_for_status()
+    check_integrity(size, response_json(response).get('size'),
+                    'Size of %s' % remote_path)
+    return response
+
+
+def download_decompressed(pcs, remote_path, local_path, codec=None,
+                          chunk_size=64 * 1024, callback=None, **kwargs):
+    """下载并解压缩文件.
+
+    下载在单独的线程中进行，同时解压缩已经下载的内容并写入
+    ``local_path + '.part'`` ，完成后再重命名；下载或解压缩出错时
+    删除 ``.part`` 文件并关闭响应。
+
+    :param pcs: PCS 对象
+    :param remote_path: 网盘中文件的路径。
+    :param local_path: 本地文件路径。
+    :param codec: （可选）压缩格式，默认由 ``remote_path`` 的扩展名决定，
+                  不是压缩文件时直接保存。
+    :param chunk_size: 每次读取的字节数。
+    :param callback: （可选）每下载一部分内容后调用
+                     ``callback(压缩后的字节数)`` 。
+    :return: Response 对象
+    """
+    codec = codec or codec_for_path(remote_path)
+    response = pcs.download(remote_path, stream=True, **kwargs)
+    response.raise_for_status()
+    part_path = local_path + '.part'
+    chunks = _prefetch(response.iter_content(chunk_size))
+
+    def downloaded():
+        for chunk in chunks:
+            if callback:
+                callback(len(chunk))
+            yield chunk
+    data = downloaded()
+    if codec:
+        data = _decompress(data, codec, remote_path)
+    try:
+        with open(part_path, 'wb') as f:
+            for chunk in data:
+                f.write(chunk)
+    except Exception:
+        chunks.close()
+        response.close()
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    finish_download(part_path, local_path)
+    return response
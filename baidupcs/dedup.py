@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""上传前去重：网盘中已有相同内容时不再上传."""
+
+import threading
+
+from .cache import cached_digest
+from .hashing import SLICE_SIZE, file_digest
+from .jsonlib import response_json
+from .models import FileEntry
+from .transfer import upload_file
+
+
+class Deduplicator(object):
+    """根据文件 MD5 避免重复上传.
+
+    上传前先计算本地文件的 MD5：
+
+    1. 本地 MD5 索引中已有相同内容的网盘文件、并且 ``meta`` 确认它的
+       md5 没有变化时，用 ``copy`` 拷贝（已经被删除或修改的条目从索引中
+       移除）；
+    2. 文件大于 256KB 时尝试 ``rapid_upload`` 秒传；
+    3. 都不成功时才调用 :func:`~baidupcs.transfer.upload_file` 上传。
+
+    索引可以由 ``meta``/``list_files`` 等返回的条目（包含 md5）建立::
+
+      >>> dedup = Deduplicator(pcs, FileList.from_response(
+      ...     pcs.list_files('/apps/test_sdk/assets')))
+      >>> dedup.upload('big.iso', '/apps/test_sdk/backup/big.iso')
+
+    指定 ``cache`` （:mod:`baidupcs.cache` 中的缓存）时本地文件的校验值
+    保存在缓存中，没有变化的文件不需要重新计算。
+
+    .. note::
+       分片上传合并得到的文件，服务端返回的 md5 不是文件内容的 MD5 ，
+       这类条目不会命中索引，通过分片上传的文件也不会被记录到索引中。
+    """
+
+    def __init__(self, pcs, entries=(), cache=None):
+        self.pcs = pcs
+        self.cache = cache
+        self._paths = {}
+        self._lock = threading.Lock()
+        self.add(entries)
+
+    def add(self, entries):
+        """添加网盘中的文件（dict 或 FileEntry）到 MD5 索引."""
+        with self._lock:
+            for entry in entries:
+                if not isinstance(entry, FileEntry):
+                    entry = FileEntry.from_dict(entry)
+                if entry.md5 and not entry.isdir:
+                    self._paths.setdefault(entry.md5, entry.path)
+
+    def lookup(self, content_md5):
+        """返回内容 MD5 为 ``content_md5`` 的网盘文件路径."""
+        return self._paths.get(content_md5)
+
+    def forget(self, content_md5, remote_path=None):
+        """从索引中移除内容 MD5 为 ``content_md5`` 的条目，
+        指定 ``remote_path`` 时只在路径相同时移除."""
+        with self._lock:
+            if remote_path is None or \
+                    self._paths.get(content_md5) == remote_path:
+                self._paths.pop(content_md5, None)
+
+    def _verify(self, remote_path, content_md5):
+        """网盘中的 ``remote_path`` 是否仍然是内容 MD5 为 ``content_md5``
+        的文件."""
+        response = self.pcs.meta(remote_path)
+        if response.ok:
+            entry = FileEntry.from_response(response)[0]
+            if entry.md5 == content_md5 and not entry.isdir:
+                return True
+        elif response.status_code >= 500:
+            response.raise_for_status()
+        self.forget(content_md5, remote_path)
+        return False
+
+    def upload(self, local_path, remote_path, ondup=None, **kwargs):
+        """上传文件，返回 ``(方式, Response 对象)`` ，
+        方式为 ``'copy'`` 、 ``'rapid_upload'`` 或 ``'upload'`` 。
+
+        :param kwargs: 传给 :func:`~baidupcs.transfer.upload_file` 的参数。
+        """
+        if self.cache is not None:
+            digest = cached_digest(local_path, self.cache)
+        else:
+            digest = file_digest(local_path)
+        existing = self.lookup(digest.content_md5)
+        if existing and existing != remote_path and \
+                self._verify(existing, digest.content_md5):
+            response = self.pcs.copy(existing, remote_path, ondup=ondup)
+            if response.ok:
+                # 源文件的 md5 已经由 meta 确认
+                self._remember(digest.content_md5, remote_path)
+                return 'copy', response
+
+        if digest.content_length > SLICE_SIZE:
+            response = self.pcs.rapid_upload(
+                remote_path, *digest.rapid_upload_args(), ondup=ondup)
+            if response.ok:
+                self._remember_response(response, digest.content_md5,
+                                        remote_path)
+                return 'rapid_upload', response
+
+        response = upload_file(self.pcs, local_path, remote_path,
+                               ondup=ondup, **kwargs)
+        self._remember_response(response, digest.content_md5, remote_path)
+        return 'upload', response
+
+    def _remember_response(self, response, content_md5, remote_path):
+        # 只有服务端返回的 md5 就是内容的 MD5 （单个分片上传、秒传）时才
+        # 记录；upload_superfile 合并得到的文件的 md5 不是内容的 MD5
+        if response_json(response).get('md5') == content_md5:
+            self._remember(content_md5, remote_path)
+
+    def _remember(self, content_md5, remote_path):
+        with self._lock:
+            self._paths.setdefault(content_md5, remote_path)
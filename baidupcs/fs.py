@@ -0,0 +1,312 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""`fsspec <https://filesystem-spec.readthedocs.io/>`__ 文件系统.
+
+需要安装 fsspec （``pip install baidupcs[fsspec]``）。之后 pandas 、dask 、
+pyarrow 等可以直接读写网盘中的文件::
+
+  >>> import pandas as pd
+  >>> df = pd.read_csv('baidupcs:///apps/test_sdk/data.csv',
+  ...                  storage_options={'access_token': 'token'})
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import datetime
+from hashlib import md5
+
+from fsspec import AbstractFileSystem
+from fsspec.spec import AbstractBufferedFile
+
+from .api import PCS
+from .hashing import BLOCK_SIZE, GROW_BLOCKS, MAX_BLOCKS
+from .jsonlib import response_json
+from .models import FileEntry, FileList
+from .transfer import upload_block
+from .utils import imap_unordered
+
+#: 文件或目录不存在
+NOT_FOUND_ERROR_CODES = (31066,)
+#: 每个 ``multi_*`` 请求最多包含的路径数
+BATCH_SIZE = 100
+
+
+def _info(entry):
+    return {'name': entry.path, 'size': entry.size,
+            'type': 'directory' if entry.isdir else 'file',
+            'md5': entry.md5, 'mtime': entry.mtime, 'fs_id': entry.fs_id}
+
+
+class PCSFileSystem(AbstractFileSystem):
+    """以 ``PCS`` 为后端的 fsspec 文件系统.
+
+    * ``ls`` 使用 ``list_files`` ，结果保存在 ``dircache`` 中，
+      ``info`` 优先从父目录的缓存中查找，没有时使用 ``meta`` ；
+    * ``cat_ranges`` 使用多个并发的 ``Range`` 请求；
+    * 写入的文件按 ``block_size`` 分片，并发 ``upload_tmpfile`` 后
+      ``upload_superfile`` 合并；
+    * ``rm`` 、``mv`` 、``copy`` 多个路径时使用 ``multi_*`` 接口。
+
+    :param access_token: Access Token ，没有指定 ``pcs`` 时使用。
+    :param pcs: （可选）PCS 对象。
+    :param workers: 并发请求数。
+    :param block_size: 读写文件时的分片大小。
+    """
+    protocol = ('baidupcs', 'bdpcs')
+    root_marker = '/'
+
+    def __init__(self, access_token=None, pcs=None, workers=4,
+                 block_size=BLOCK_SIZE, **storage_options):
+        super(PCSFileSystem, self).__init__(**storage_options)
+        self.pcs = pcs if pcs is not None else PCS(access_token)
+        self.workers = workers
+        self.blocksize = block_size
+
+    @classmethod
+    def _strip_protocol(cls, path):
+        path = super(PCSFileSystem, cls)._strip_protocol(path)
+        return '/' + path.lstrip('/')
+
+    def _check(self, response, path):
+        if response.ok:
+            return response
+        try:
+            error_code = response_json(response).get('error_code')
+        except ValueError:
+            error_code = None
+        if (response.status_code == 404 or
+                error_code in NOT_FOUND_ERROR_CODES):
+            raise FileNotFoundError(path)
+        response.raise_for_status()
+
+    def ls(self, path, detail=True, refresh=False, **kwargs):
+        path = self._strip_protocol(path)
+        entries = None if refresh else self._ls_from_cache(path)
+        if entries is None:
+            response = self._check(self.pcs.list_files(path), path)
+            entries = [_info(x) for x in FileList.from_response(response)]
+            info = None if entries else self.info(path)
+            if info is not None and info['type'] != 'directory':
+                entries = [info]
+            else:
+                self.dircache[path] = entries
+        if detail:
+            return entries
+        return [x['name'] for x in entries]
+
+    def info(self, path, **kwargs):
+        path = self._strip_protocol(path)
+        parent = self._parent(path)
+        for entry in self.dircache.get(parent, ()):
+            if entry['name'] == path:
+                return entry
+        if path == '/':
+            return {'name': '/', 'size': 0, 'type': 'directory'}
+        response = self._check(self.pcs.meta(path), path)
+        return _info(FileEntry.from_response(response)[0])
+
+    def invalidate_cache(self, path=None):
+        if path is None:
+            self.dircache.clear()
+            return
+        path = self._strip_protocol(path)
+        self.dircache.pop(path, None)
+        self.dircache.pop(self._parent(path), None)
+
+    def _range_headers(self, path, start, end):
+        if start is None and end is None:
+            return None
+        if (start is not None and start < 0) or (end is not None and end < 0):
+            size = self.info(path)['size']
+            start = size + start if start is not None and start < 0 \
+                else start
+            end = size + end if end is not None and end < 0 else end
+        start = max(start or 0, 0)
+        if end is None:
+            return {'Range': 'bytes=%d-' % start}
+        if end <= start:
+            return False
+        return {'Range': 'bytes=%d-%d' % (start, end - 1)}
+
+    def cat_file(self, path, start=None, end=None, **kwargs):
+        path = self._strip_protocol(path)
+        headers = self._range_headers(path, start, end)
+        if headers is False:
+            return b''
+        response = self.pcs.download(path, headers=headers)
+        if response.status_code == 416:
+            return b''
+        return self._check(response, path).content
+
+    def cat_ranges(self, paths, starts, ends, max_gap=None,
+                   on_error='return', **kwargs):
+        """并发下载多个文件的多个部分."""
+        if not isinstance(paths, list):
+            raise TypeError('paths must be a list')
+        if not isinstance(starts, list):
+            starts = [starts] * len(paths)
+        if not isinstance(ends, list):
+            ends = [ends] * len(paths)
+        if len(starts) != len(paths) or len(ends) != len(paths):
+            raise ValueError('paths, starts and ends must be the same length')
+
+        def fetch(index):
+            try:
+                return self.cat_file(paths[index], starts[index],
+                                     ends[index])
+            except Exception as e:
+                if on_error == 'raise':
+                    raise
+                return e
+        results = [None] * len(paths)
+        for index, value in imap_unordered(fetch, range(len(paths)),
+                                           self.workers):
+            results[index] = value
+        return results
+
+    def _open(self, path, mode='rb', block_size=None, autocommit=True,
+              cache_options=None, **kwargs):
+        if mode not in ('rb', 'wb'):
+            raise ValueError('Unsupported mode: %s' % mode)
+        return PCSFile(self, path, mode, block_size or self.blocksize,
+                       autocommit=autocommit, cache_options=cache_options,
+                       **kwargs)
+
+    def mkdir(self, path, create_parents=True, **kwargs):
+        path = self._strip_protocol(path)
+        self._check(self.pcs.mkdir(path), path)
+        self.invalidate_cache(path)
+
+    def makedirs(self, path, exist_ok=False):
+        if self.exists(path):
+            if not exist_ok:
+                raise FileExistsError(path)
+            return
+        self.mkdir(path)
+
+    def rmdir(self, path):
+        self.rm(path)
+
+    def rm_file(self, path):
+        self.rm(path)
+
+    def rm(self, path, recursive=False, maxdepth=None):
+        """删除文件或目录（网盘中删除目录时总是删除其中的所有内容）."""
+        paths = [path] if isinstance(path, str) else list(path)
+        paths = [self._strip_protocol(x) for x in paths]
+        for start in range(0, len(paths), BATCH_SIZE):
+            batch = paths[start:start + BATCH_SIZE]
+            if len(batch) == 1:
+                response = self.pcs.delete(batch[0])
+            else:
+                response = self.pcs.multi_delete(batch)
+            self._check(response, batch[0])
+        for x in paths:
+            self.invalidate_cache(x)
+
+    def _pairs(self, path1, path2):
+        if isinstance(path1, str):
+            path1, path2 = [path1], [path2]
+        if len(path1) != len(path2):
+            raise ValueError('path1 and path2 must be the same length')
+        return [(self._strip_protocol(x), self._strip_protocol(y))
+                for x, y in zip(path1, path2)]
+
+    def _batch(self, single, multi, pairs):
+        for start in range(0, len(pairs), BATCH_SIZE):
+            batch = pairs[start:start + BATCH_SIZE]
+            if len(batch) == 1:
+                response = single(*batch[0])
+            else:
+                response = multi(batch)
+            self._check(response, batch[0][0])
+        for x, y in pairs:
+            self.invalidate_cache(x)
+            self.invalidate_cache(y)
+
+    def mv(self, path1, path2, recursive=False, maxdepth=None, **kwargs):
+        self._batch(self.pcs.move, self.pcs.multi_move,
+                    self._pairs(path1, path2))
+
+    def copy(self, path1, path2, recursive=False, maxdepth=None,
+             on_error=None, **kwargs):
+        self._batch(self.pcs.copy, self.pcs.multi_copy,
+                    self._pairs(path1, path2))
+
+    def cp_file(self, path1, path2, **kwargs):
+        self.copy(path1, path2)
+
+    def modified(self, path):
+        return datetime.datetime.fromtimestamp(self.info(path)['mtime'])
+
+    def created(self, path):
+        return self.modified(path)
+
+    def ukey(self, path):
+        info = self.info(path)
+        return info.get('md5') or str(info.get('fs_id', info['name']))
+
+    def checksum(self, path):
+        # ukey 可能是 md5 ，也可能是十进制的 fs_id 或者路径
+        return int(md5(self.ukey(path).encode('utf-8')).hexdigest(), 16)
+
+    def _upload_block(self, data):
+        return upload_block(self.pcs, data)
+
+
+class PCSFile(AbstractBufferedFile):
+    """:class:`PCSFileSystem` 打开的文件.
+
+    写入时第一个分片先保存在内存中：文件只有一个分片时用 ``upload``
+    直接上传，否则之后的分片并发上传，关闭时合并。
+
+    ``upload_superfile`` 最多合并 ``MAX_BLOCKS`` 个分片，每上传
+    ``GROW_BLOCKS`` 个分片后分片大小加倍，分片数仍然超出时抛出 IOError 。
+    """
+
+    def _fetch_range(self, start, end):
+        return self.fs.cat_file(self.path, start, end)
+
+    def _initiate_upload(self):
+        self._first = None
+        self._futures = []
+        self._executor = ThreadPoolExecutor(self.fs.workers)
+
+    def _submit(self, data):
+        if len(self._futures) >= MAX_BLOCKS:
+            self._executor.shutdown()
+            raise IOError('%s: upload_superfile supports at most %d blocks'
+                          % (self.path, MAX_BLOCKS))
+        self._futures.append(self._executor.submit(self.fs._upload_block,
+                                                   data))
+        if len(self._futures) % GROW_BLOCKS == 0:
+            self.blocksize *= 2
+
+    def _upload_chunk(self, final=False):
+        data = self.buffer.getvalue()
+        if final and not self._futures and (self._first is None or
+                                            not data):
+            # upload_superfile 至少需要两个分片
+            self._executor.shutdown()
+            content = data if self._first is None else self._first
+            self.fs._check(self.fs.pcs.upload(self.path, content,
+                                              ondup='overwrite'), self.path)
+            self.fs.invalidate_cache(self.path)
+            return True
+        if not final and self._first is None and not self._futures:
+            self._first = data
+            return True
+        if self._first is not None:
+            self._submit(self._first)
+            self._first = None
+        if data:
+            self._submit(data)
+        if final:
+            try:
+                block_list = [x.result() for x in self._futures]
+            finally:
+                self._executor.shutdown()
+            self.fs._check(self.fs.pcs.upload_superfile(
+                self.path, block_list, ondup='overwrite'), self.path)
+            self.fs.invalidate_cache(self.path)
+        return True
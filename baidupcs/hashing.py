@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""计算秒传、分片上传所需的文件校验值."""
+
+from hashlib import md5
+import mmap
+import multiprocessing
+import os
+import sys
+import threading
+import traceback
+from zlib import crc32
+
+from .utils import imap_unordered
+
+#: 秒传接口的校验段长度
+SLICE_SIZE = 256 * 1024
+#: 分片上传时每个分片的默认大小
+BLOCK_SIZE = 4 * 1024 * 1024
+#: ``upload_superfile`` 最多支持 1024 个分片
+MAX_BLOCKS = 1024
+#: 事先不知道大小的流式上传每上传这么多个分片后分片大小加倍
+GROW_BLOCKS = 128
+
+
+def block_size_for(size, block_size=BLOCK_SIZE):
+    """分片数不能超过 ``MAX_BLOCKS`` ，必要时增大分片大小."""
+    return max(block_size, -(-size // MAX_BLOCKS))
+
+
+class FileDigest(object):
+    """文件的长度和各个校验值，可直接用于 ``PCS.rapid_upload`` ；
+    ``block_list`` 为各个分片的 MD5 ，可用于 ``PCS.upload_superfile`` ."""
+    __slots__ = ('content_length', 'content_md5', 'content_crc32',
+                 'slice_md5', 'block_size', 'block_list')
+
+    def __init__(self, content_length, content_md5, content_crc32,
+                 slice_md5, block_size=None, block_list=None):
+        self.content_length = content_length
+        self.content_md5 = content_md5
+        self.content_crc32 = content_crc32
+        self.slice_md5 = slice_md5
+        self.block_size = block_size
+        self.block_list = block_list
+
+    def rapid_upload_args(self):
+        return (self.content_length, self.content_md5, self.content_crc32,
+                self.slice_md5)
+
+    def __repr__(self):
+        return '<FileDigest %s length=%d>' % (self.content_md5,
+                                              self.content_length)
+
+
+def file_digest(local_path, buffer_size=1024 * 1024):
+    """读一遍文件，同时计算长度、MD5、CRC32 和校验段的 MD5."""
+    content_md5 = md5()
+    slice_md5 = md5()
+    crc = 0
+    length = 0
+    with open(local_path, 'rb') as f:
+        while True:
+            data = f.read(buffer_size)
+            if not data:
+                break
+            if length < SLICE_SIZE:
+                slice_md5.update(data[:SLICE_SIZE - length])
+            content_md5.update(data)
+            crc = crc32(data, crc)
+            length += len(data)
+    return FileDigest(length, content_md5.hexdigest(),
+                      '%x' % (crc & 0xffffffff), slice_md5.hexdigest())
+
+
+def content_digest(content):
+    """计算已经读入内存的文件内容的长度、MD5、CRC32 和校验段的 MD5."""
+    return FileDigest(len(content), md5(content).hexdigest(),
+                      '%x' % (crc32(content) & 0xffffffff),
+                      md5(content[:SLICE_SIZE]).hexdigest())
+
+
+def _view(buf, start, end):
+    # 避免复制数据；Python 2 的 mmap 不支持 memoryview
+    try:
+        return memoryview(buf)[start:end]
+    except TypeError:
+        return buf[start:end]
+
+
+def _iter_views(buf, size, step):
+    for start in range(0, size, step):
+        yield _view(buf, start, min(start + step, size))
+
+
+def _hash_range(args):
+    """在子进程中计算文件一段内容的 MD5."""
+    local_path, start, length = args
+    with open(local_path, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return start, md5(_view(buf, start, start + length)).hexdigest()
+        finally:
+            buf.close()
+
+
+def _whole_digest(buf, size, buffer_size):
+    """按顺序读取一遍内容，同时计算 MD5 和 CRC32 ."""
+    content_md5 = md5()
+    content_crc32 = 0
+    for view in _iter_views(buf, size, buffer_size):
+        content_md5.update(view)
+        content_crc32 = crc32(view, content_crc32)
+    return content_md5.hexdigest(), '%x' % (content_crc32 & 0xffffffff)
+
+
+def cpu_count():
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError:
+        return 1
+
+
+def hash_file(local_path, block_size=BLOCK_SIZE, workers=None,
+              processes=False, buffer_size=8 * 1024 * 1024):
+    """并发计算文件的所有校验值和分片 MD5 列表.
+
+    文件通过 ``mmap`` 映射到内存，一个线程按顺序读取每一段内容，
+    同时更新整个文件的 MD5 和 CRC32 ；各个分片的 MD5 同时由 ``workers``
+    个线程并发计算（hashlib 和 zlib 计算时会释放 GIL）。
+
+    :param local_path: 本地文件路径。
+    :param block_size: 分片大小，会按 ``MAX_BLOCKS`` 自动增大。
+    :param workers: 计算分片 MD5 的线程/进程数，默认为 CPU 核数。
+    :param processes: 为 True 时使用进程池计算分片 MD5 。
+    :param buffer_size: 计算整个文件 MD5/CRC32 时每次处理的字节数。
+    :return: :class:`FileDigest` 对象
+    """
+    size = os.path.getsize(local_path)
+    if not size:
+        digest = file_digest(local_path)
+        digest.block_size = block_size
+        digest.block_list = []
+        return digest
+    workers = workers or cpu_count()
+    block_size = block_size_for(size, block_size)
+    starts = list(range(0, size, block_size))
+    blocks = {}
+    result = {}
+
+    with open(local_path, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        def whole_file():
+            try:
+                result['digest'] = _whole_digest(buf, size, buffer_size)
+            except Exception:
+                exc_info = sys.exc_info()
+                if hasattr(traceback, 'clear_frames'):
+                    # traceback 引用的 memoryview 会导致 mmap 无法关闭
+                    traceback.clear_frames(exc_info[2])
+                result['exc_info'] = exc_info
+
+        thread = threading.Thread(target=whole_file)
+        thread.start()
+
+        if processes:
+            pool = multiprocessing.Pool(workers)
+            try:
+                jobs = [(local_path, start, block_size) for start in starts]
+                blocks.update(pool.imap_unordered(_hash_range, jobs))
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            def hash_block(start):
+                return md5(_view(buf, start, start + block_size)).hexdigest()
+            blocks.update(imap_unordered(hash_block, starts, workers))
+
+        slice_md5 = md5(_view(buf, 0, SLICE_SIZE)).hexdigest()
+    finally:
+        thread.join()
+        buf.close()
+    if 'exc_info' in result:
+        raise result['exc_info'][1]
+
+    content_md5, content_crc32 = result['digest']
+    return FileDigest(size, content_md5, content_crc32, slice_md5,
+                      block_size=block_size,
+                      block_list=[blocks[start] for start in starts])
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""对冲请求：慢的只读请求再发一份，使用先返回的结果."""
+
+from collections import deque
+import sys
+import threading
+import time
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+#: 默认对冲的 api （``(uri, method)``）：``meta`` 、``list_files`` 、
+#: ``search`` 、``diff`` 和 ``info``
+HEDGED_APIS = (('file', 'meta'), ('file', 'list'), ('file', 'search'),
+               ('file', 'diff'), ('quota', 'info'))
+
+
+class Hedger(object):
+    """为 ``apis`` 中的只读 GET 请求发送对冲请求，降低长尾延迟.
+
+    按 api（``(uri, method)``）分别记录最近 ``window`` 次请求的耗时，
+    请求在 ``percentile`` 分位的耗时内没有返回时再发送一个相同的请求，
+    先返回的作为结果，另一个返回后直接关闭。对冲请求数不超过总请求数的
+    ``max_ratio`` 。
+
+    ::
+
+      >>> pcs = PCS('access_token', hedger=Hedger())
+
+    只有 ``apis`` 中的请求会对冲，下载（``download`` 、``download_stream``）、
+    缩略图、转码等返回内容较大的请求以及 ``stream=True`` 的请求都不会对冲。
+
+    :param percentile: 触发对冲的耗时分位数。
+    :param max_ratio: 对冲请求数占总请求数的上限。
+    :param min_samples: 记录的耗时少于这个数时不对冲。
+    :param window: 每个 api 保留的耗时记录数。
+    :param min_delay: 对冲前至少等待的秒数。
+    :param apis: 对冲的 api 列表，默认为 :data:`HEDGED_APIS` 。
+    """
+
+    def __init__(self, percentile=0.95, max_ratio=0.05, min_samples=20,
+                 window=200, min_delay=0.01, apis=HEDGED_APIS):
+        self.apis = frozenset(tuple(x) for x in apis)
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.window = window
+        self.min_delay = min_delay
+        #: 总请求数（不包括对冲请求）
+        self.requests = 0
+        #: 对冲请求数
+        self.hedges = 0
+        #: 对冲请求先返回的次数
+        self.wins = 0
+        self._latencies = {}
+        self._lock = threading.Lock()
+
+    def delay(self, endpoint):
+        """返回 ``endpoint`` 触发对冲的等待秒数，记录不足时返回 None."""
+        with self._lock:
+            latencies = sorted(self._latencies.get(endpoint, ()))
+        if len(latencies) < self.min_samples:
+            return None
+        index = min(int(len(latencies) * self.percentile), len(latencies) - 1)
+        return max(latencies[index], self.min_delay)
+
+    def record(self, endpoint, seconds):
+        with self._lock:
+            latencies = self._latencies.get(endpoint)
+            if latencies is None:
+                latencies = self._latencies[endpoint] = deque(
+                    maxlen=self.window)
+            latencies.append(seconds)
+
+    def _allow_hedge(self, reserve=True):
+        with self._lock:
+            if self.hedges + 1 > self.max_ratio * self.requests:
+                return False
+            if reserve:
+                self.hedges += 1
+            return True
+
+    def call(self, endpoint, func):
+        """调用 ``func()`` 发送请求，必要时发送对冲请求."""
+        with self._lock:
+            self.requests += 1
+        delay = self.delay(endpoint)
+        if delay is None or not self._allow_hedge(reserve=False):
+            # 不会对冲时直接在当前线程中发送请求
+            begin = time.time()
+            response = func()
+            self.record(endpoint, time.time() - begin)
+            return response
+
+        results = queue.Queue()
+        lock = threading.Lock()
+        decided = []
+
+        def attempt(number):
+            begin = time.time()
+            try:
+                response = func()
+            except Exception:
+                results.put((number, None, sys.exc_info()))
+                return
+            self.record(endpoint, time.time() - begin)
+            with lock:
+                if not decided:
+                    results.put((number, response, None))
+                    return
+            # 已经使用了另一个请求的结果
+            response.close()
+
+        def start(number):
+            thread = threading.Thread(target=attempt, args=(number,))
+            thread.daemon = True
+            thread.start()
+
+        start(0)
+        pending = 1
+        try:
+            result = results.get(timeout=delay)
+        except queue.Empty:
+            if self._allow_hedge():
+                start(1)
+                pending += 1
+            result = results.get()
+        pending -= 1
+        if result[2] is not None and pending:
+            # 一个请求失败时使用另一个的结果
+            result = results.get()
+        with lock:
+            decided.append(result[0])
+        # 关闭在确定结果之前已经返回的落后的请求
+        while True:
+            try:
+                loser = results.get_nowait()
+            except queue.Empty:
+                break
+            if loser[1] is not None:
+                loser[1].close()
+        number, response, exc_info = result
+        if exc_info is not None:
+            raise exc_info[1]
+        if number:
+            with self._lock:
+                self.wins += 1
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {'requests': self.requests, 'hedges': self.hedges,
+                    'wins': self.wins}
+
@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""预取 ``video_convert`` 返回的 HLS 播放列表中的分段，通过本地 HTTP 服务
+提供给播放器."""
+
+import threading
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import urljoin
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urljoin
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+
+def parse_playlist(text, base_url=None):
+    """解析 M3U8 播放列表，返回 ``(各行, 分段 url 列表, 分段所在的行号列表)`` ."""
+    lines = text.splitlines()
+    urls = []
+    positions = []
+    for number, line in enumerate(lines):
+        line = line.strip()
+        if line and not line.startswith('#'):
+            urls.append(urljoin(base_url, line) if base_url else line)
+            positions.append(number)
+    return lines, urls, positions
+
+
+class SegmentPrefetcher(object):
+    """从播放器正在读取的分段开始，用 ``workers`` 个线程预取之后的
+    ``prefetch`` 个分段.
+
+    已下载的分段保存在一个环形缓冲区中，只保留当前分段之前的 ``keep``
+    个和之后的 ``prefetch`` 个，播放器跳转后缓冲区外的分段直接丢弃。
+
+    :param pcs: PCS 对象
+    :param remote_path: 视频文件的路径。
+    :param video_type: 同 ``PCS.video_convert`` 。
+    :param prefetch: 预取的分段数。
+    :param keep: 保留的已经播放过的分段数。
+    :param workers: 同时下载的分段数，默认与 ``prefetch`` 相同。
+    :param session: （可选）下载分段使用的 ``requests.Session`` ，
+                    默认使用 ``pcs.session`` 或新建一个。
+    """
+
+    def __init__(self, pcs, remote_path, video_type, prefetch=4, keep=1,
+                 workers=None, session=None):
+        self.pcs = pcs
+        self.remote_path = remote_path
+        self.video_type = video_type
+        self.prefetch = prefetch
+        self.keep = keep
+        self.workers = workers or prefetch
+        self.session = session or getattr(pcs, 'session', None)
+        self.lines = []
+        self.urls = []
+        self._positions = []
+        self._segments = {}
+        self._pending = set()
+        self._cond = threading.Condition()
+        self._queue = queue.Queue()
+        self._threads = []
+
+    def load(self):
+        """调用 ``video_convert`` 获取播放列表并启动下载线程."""
+        response = self.pcs.video_convert(self.remote_path, self.video_type)
+        response.raise_for_status()
+        self.lines, self.urls, self._positions = parse_playlist(
+            response.content.decode('utf-8'), getattr(response, 'url', None))
+        if self.session is None:
+            import requests
+            self.session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.workers)
+            self.session.mount('https://', adapter)
+            self.session.mount('http://', adapter)
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._work)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def playlist(self, segment_url='segment/%d.ts'):
+        """返回分段 url 替换为 ``segment_url % 序号`` 的播放列表."""
+        lines = list(self.lines)
+        for index, number in enumerate(self._positions):
+            lines[number] = segment_url % index
+        return '\n'.join(lines) + '\n'
+
+    def _work(self):
+        while True:
+            index = self._queue.get()
+            if index is None:
+                return
+            with self._cond:
+                if index not in self._pending:
+                    continue
+            try:
+                response = self.session.get(self.urls[index])
+                response.raise_for_status()
+                data = response.content
+            except Exception as e:
+                data = e
+            with self._cond:
+                if index in self._pending:
+                    self._pending.discard(index)
+                    self._segments[index] = data
+                    self._cond.notify_all()
+
+    def _schedule(self, current):
+        first = max(current - self.keep, 0)
+        last = min(current + self.prefetch, len(self.urls) - 1)
+        for index in list(self._segments):
+            if not first <= index <= last:
+                del self._segments[index]
+        self._pending = set(x for x in self._pending if first <= x <= last)
+        for index in range(current, last + 1):
+            if index not in self._segments and index not in self._pending:
+                self._pending.add(index)
+                self._queue.put(index)
+
+    def get(self, index):
+        """返回第 ``index`` 个分段的内容，并预取之后的分段."""
+        if not 0 <= index < len(self.urls):
+            raise IndexError(index)
+        with self._cond:
+            self._schedule(index)
+            while index not in self._segments:
+                if index not in self._pending:
+                    self._schedule(index)
+                self._cond.wait()
+            data = self._segments[index]
+            if isinstance(data, Exception):
+                del self._segments[index]
+        if isinstance(data, Exception):
+            raise data
+        return data
+
+    def buffered(self):
+        """已经下载并保存在缓冲区中的分段序号."""
+        with self._cond:
+            return sorted(self._segments)
+
+    def close(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        self._threads = []
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        prefetcher = self.server.prefetcher
+        path = self.path.split('?')[0]
+        if path == '/playlist.m3u8':
+            body = prefetcher.playlist().encode('utf-8')
+            content_type = 'application/vnd.apple.mpegurl'
+        elif path.startswith('/segment/') and path.endswith('.ts'):
+            try:
+                body = prefetcher.get(int(path[len('/segment/'):-3]))
+            except (ValueError, IndexError):
+                return self.send_error(404)
+            except Exception:
+                return self.send_error(502)
+            content_type = 'video/mp2t'
+        else:
+            return self.send_error(404)
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class HLSServer(object):
+    """把 :class:`SegmentPrefetcher` 通过本地 HTTP 服务提供给播放器::
+
+      >>> server = HLSServer(SegmentPrefetcher(
+      ...     pcs, '/apps/test_sdk/a.mp4', 'M3U8_640_480').load())
+      >>> server.start()
+      >>> subprocess.call(['ffplay', server.url])
+
+    :param prefetcher: :class:`SegmentPrefetcher` 对象。
+    :param host: 监听的地址。
+    :param port: 监听的端口，0 表示随机选择。
+    """
+
+    def __init__(self, prefetcher, host='127.0.0.1', port=0):
+        self.prefetcher = prefetcher
+        self.server = _ThreadingHTTPServer((host, port), _Handler)
+        self.server.prefetcher = prefetcher
+        self._thread = None
+
+    @property
+    def url(self):
+        """播放列表的地址."""
+        host, port = self.server.server_address[:2]
+        return 'http://%s:%d/playlist.m3u8' % (host, port)
+
+    def start(self):
+        """在后台线程中启动服务."""
+        self._thread = threading.Thread(target=self.server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def close(self):
+        if self._thread is not None:
+            self.server.shutdown()
+            self._thread = None
+        self.server.server_close()
+        self.prefetcher.close()
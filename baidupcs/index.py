@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""本地文件元信息索引."""
+
+import json
+import os
+import posixpath
+import threading
+import time
+
+from .models import DiffPage, FileEntry
+from .utils import replace_file
+
+
+class MetadataIndex(object):
+    """以路径为键保存 :class:`~baidupcs.models.FileEntry` 的本地索引.
+
+    可以用 ``list_files``/``meta``/``diff`` 等的结果更新索引。索引按目录
+    记录最后一次完整同步的时间，只有目录被 :meth:`sync` 或 :meth:`touch`
+    标记过、并且足够新时才在本地回答这个目录中的查询::
+
+      >>> index = MetadataIndex()
+      >>> index.update(FileList.from_response(pcs.list_files('/apps/a')))
+      >>> index.is_fresh(300, '/apps/a')
+      False
+      >>> index.touch('/apps/a')
+      >>> index.is_fresh(300, '/apps/a/sub')
+      True
+
+    也可以通过 :meth:`sync` 使用 ``diff`` 接口建立并增量更新整个索引，
+    并用 :meth:`save`/:meth:`load` 保存到本地文件::
+
+      >>> index = MetadataIndex.load('pcs.index')
+      >>> index.sync(pcs)  # 只获取上次同步之后变化的部分
+      >>> index.save('pcs.index')
+    """
+
+    def __init__(self, entries=(), cursor=None):
+        self._entries = {}
+        self._lock = threading.Lock()
+        #: 最后一次修改条目的时间
+        self.updated_at = None
+        #: ``{目录: 最后一次完整同步的时间}``
+        self.synced = {}
+        #: 最后一次调用 ``diff`` 返回的 cursor
+        self.cursor = cursor
+        if entries:
+            self.update(entries)
+
+    def update(self, entries):
+        """添加或替换条目，``entries`` 中的元素可以是 dict 或 FileEntry."""
+        with self._lock:
+            for entry in entries:
+                if not isinstance(entry, FileEntry):
+                    entry = FileEntry.from_dict(entry)
+                self._entries[entry.path] = entry
+            self.updated_at = time.time()
+
+    def remove(self, remote_path):
+        """删除一个文件或整个目录."""
+        prefix = remote_path.rstrip('/') + '/'
+        with self._lock:
+            self._entries.pop(remote_path, None)
+            for path in [x for x in self._entries if x.startswith(prefix)]:
+                del self._entries[path]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def sync(self, pcs, root='/', **kwargs):
+        """调用 ``diff`` 把索引更新到最新，并把 ``root`` 标记为已同步.
+
+        第一次同步时 ``diff`` 会返回所有文件，之后只返回变化的部分。
+
+        :param root: 标记为已同步的目录，默认为所有目录。
+        """
+        cursor = self.cursor or 'null'
+        while True:
+            response = pcs.diff(cursor=cursor, **kwargs)
+            response.raise_for_status()
+            page = DiffPage.from_response(response)
+            if page.reset:
+                self.clear()
+            for entry in page.entries:
+                if entry.isdelete:
+                    self.remove(entry.path)
+            self.update(x for x in page.entries if not x.isdelete)
+            cursor = self.cursor = page.cursor
+            if not page.has_more:
+                break
+        self.touch(root)
+
+    def save(self, filename):
+        """保存到本地文件（每行一个 JSON 对象，第一行为 cursor 等信息）."""
+        tmp_filename = filename + '.tmp'
+        with open(tmp_filename, 'w') as f:
+            json.dump({'cursor': self.cursor,
+                       'updated_at': self.updated_at,
+                       'synced': self.synced}, f)
+            f.write('\n')
+            for entry in self:
+                json.dump(entry.to_dict(), f)
+                f.write('\n')
+        replace_file(tmp_filename, filename)
+
+    @classmethod
+    def load(cls, filename):
+        """从 :meth:`save` 保存的文件中读取索引，文件不存在时返回空索引."""
+        index = cls()
+        if not os.path.exists(filename):
+            return index
+        with open(filename) as f:
+            header = json.loads(f.readline())
+            index.update(json.loads(line) for line in f if line.strip())
+        index.cursor = header.get('cursor')
+        index.updated_at = header.get('updated_at')
+        index.synced = header.get('synced') or {}
+        return index
+
+    def touch(self, root='/'):
+        """标记目录 ``root`` （包括子目录）中的条目已经与服务端同步."""
+        with self._lock:
+            self.synced[root.rstrip('/') or '/'] = time.time()
+
+    def is_fresh(self, max_age, remote_path='/'):
+        """``remote_path`` 或它的上级目录是否在 ``max_age`` 秒内同步过."""
+        path = remote_path.rstrip('/') or '/'
+        now = time.time()
+        with self._lock:
+            synced = list(self.synced.items())
+        for root, synced_at in synced:
+            if (root == '/' or path == root or
+                    path.startswith(root + '/')) and \
+                    now - synced_at <= max_age:
+                return True
+        return False
+
+    def get(self, remote_path, default=None):
+        return self._entries.get(remote_path, default)
+
+    def iter_children(self, remote_path, recurrent=False):
+        """返回目录下的条目，``recurrent`` 为 True 时包括子目录中的条目."""
+        prefix = remote_path.rstrip('/') + '/'
+        for path, entry in list(self._entries.items()):
+            if not path.startswith(prefix):
+                continue
+            if recurrent or '/' not in path[len(prefix):]:
+                yield entry
+
+    def search(self, remote_path, keyword, recurrent='0'):
+        """与 ``PCS.search`` 相同：按文件名搜索文件（不包括目录）."""
+        recurrent = str(recurrent) == '1'
+        for entry in self.iter_children(remote_path, recurrent):
+            if not entry.isdir and keyword in posixpath.basename(entry.path):
+                yield entry
+
+    def __contains__(self, remote_path):
+        return remote_path in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(list(self._entries.values()))
@@ -0,0 +1,359 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""保存在本地文件中、重启后不会丢失的传输任务队列.
+
+::
+
+  >>> jobs = JobQueue('/var/lib/baidupcs/jobs.db')
+  >>> jobs.put('upload', 'backup.tar', '/apps/test_sdk/backup.tar')
+  >>> # 每个工作进程
+  >>> TransferWorker(pcs, jobs, '/var/lib/baidupcs/state').run()
+"""
+
+import binascii
+import json
+import logging
+import os
+import threading
+import time
+
+from .adaptive import PermanentError
+from .transfer import download_file, upload_file
+from .utils import sqlite_connect
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+#: 任务类型
+KINDS = ('upload', 'download')
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseLost(PermanentError):
+    """异常：执行中的任务的租约已经被其他进程取得."""
+    pass
+
+
+class _LeasedPCS(object):
+    """租约被其他进程取得后，调用任何 api 方法都抛出 :class:`LeaseLost`
+    的 PCS 对象包装."""
+
+    def __init__(self, pcs, check):
+        self._pcs = pcs
+        self._check = check
+
+    def __getattr__(self, name):
+        value = getattr(self._pcs, name)
+        if name.startswith('_') or not callable(value):
+            return value
+
+        def method(*args, **kwargs):
+            self._check()
+            return value(*args, **kwargs)
+        method.__name__ = name
+        return method
+
+
+class Job(object):
+    """队列中的一个任务."""
+    __slots__ = ('id', 'kind', 'local_path', 'remote_path', 'options',
+                 'state', 'attempts', 'error', 'token', 'lease_expires')
+
+    def __init__(self, id, kind, local_path, remote_path, options, state,
+                 attempts, error, token, lease_expires):
+        self.id = id
+        self.kind = kind
+        self.local_path = local_path
+        self.remote_path = remote_path
+        self.options = json.loads(options) if options else {}
+        self.state = state
+        self.attempts = attempts
+        self.error = error
+        self.token = token
+        self.lease_expires = lease_expires
+
+    def __repr__(self):
+        return '<Job %d %s %s>' % (self.id, self.kind, self.state)
+
+
+_COLUMNS = ('id, kind, local_path, remote_path, options, state, attempts, '
+            'error, token, lease_expires')
+
+
+class JobQueue(object):
+    """保存在 SQLite 文件中、多个进程可以同时使用的传输任务队列.
+
+    任务的状态为 queued 、running 、done 或 failed 。:meth:`claim` 取得
+    任务时得到一个 ``lease`` 秒的租约，工作进程需要在租约到期前
+    :meth:`renew` ；进程退出后租约到期的任务可以被其他进程重新取得。
+    失败的任务在 ``retry_delay * 已尝试次数`` 秒后重试，
+    尝试 ``max_attempts`` 次后不再重试。
+
+    :param path: 数据库文件路径。
+    :param lease: 租约的秒数。
+    :param max_attempts: 每个任务最多尝试的次数。
+    :param retry_delay: 重试前等待的秒数。
+    :param timeout: 等待其他进程释放锁的秒数。
+    """
+
+    def __init__(self, path, lease=60, max_attempts=3, retry_delay=10,
+                 timeout=30):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._connect() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS jobs ('
+                       'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                       'kind TEXT, local_path TEXT, remote_path TEXT, '
+                       'options TEXT, state TEXT, attempts INTEGER, '
+                       'error TEXT, token TEXT, lease_expires REAL, '
+                       'available_at REAL, updated REAL)')
+            db.execute('CREATE INDEX IF NOT EXISTS jobs_state '
+                       'ON jobs (state, available_at)')
+
+    def _connect(self):
+        return sqlite_connect(self._local, self.path, self.timeout)
+
+    def put(self, kind, local_path, remote_path, **options):
+        """添加任务，返回任务 ID .
+
+        :param kind: ``'upload'`` 或 ``'download'`` 。
+        :param local_path: 本地文件路径。
+        :param remote_path: 网盘中文件的路径。
+        :param options: 传给 ``upload_file``/``download_file`` 的其他参数，
+                        需要可以编码为 JSON ；``state_dir`` 和 ``callback``
+                        由 :class:`TransferWorker` 指定。
+        """
+        if kind not in KINDS:
+            raise ValueError('Unsupported job kind: %s' % kind)
+        for name in ('state_dir', 'callback'):
+            if name in options:
+                raise ValueError('%s is set by TransferWorker' % name)
+        now = time.time()
+        db = self._connect()
+        with db:
+            cursor = db.execute(
+                'INSERT INTO jobs (kind, local_path, remote_path, options, '
+                'state, attempts, available_at, updated) '
+                'VALUES (?, ?, ?, ?, ?, 0, ?, ?)',
+                (kind, local_path, remote_path, json.dumps(options), QUEUED,
+                 now, now))
+        return cursor.lastrowid
+
+    def claim(self):
+        """取得一个可以执行的任务，没有时返回 None ."""
+        now = time.time()
+        token = binascii.hexlify(os.urandom(8)).decode('ascii')
+        db = self._connect()
+        with db:
+            db.execute('UPDATE jobs SET state = ?, error = ?, updated = ? '
+                       'WHERE state = ? AND lease_expires < ? '
+                       'AND attempts >= ?',
+                       (FAILED, 'lease expired', now, RUNNING, now,
+                        self.max_attempts))
+            # 一条 UPDATE 语句中选择并标记任务，多个进程不会取得同一个任务
+            cursor = db.execute(
+                'UPDATE jobs SET state = ?, token = ?, lease_expires = ?, '
+                'attempts = attempts + 1, updated = ? WHERE id = ('
+                'SELECT id FROM jobs WHERE (state = ? AND available_at <= ?) '
+                'OR (state = ? AND lease_expires < ?) ORDER BY id LIMIT 1)',
+                (RUNNING, token, now + self.lease, now, QUEUED, now, RUNNING,
+                 now))
+            if not cursor.rowcount:
+                return None
+        row = db.execute('SELECT %s FROM jobs WHERE token = ?' % _COLUMNS,
+                         (token,)).fetchone()
+        return Job(*row)
+
+    def _update(self, job, sql, args):
+        db = self._connect()
+        with db:
+            cursor = db.execute(
+                'UPDATE jobs SET %s, updated = ? WHERE id = ? AND token = ? '
+                'AND state = ?' % sql,
+                tuple(args) + (time.time(), job.id, job.token, RUNNING))
+        return cursor.rowcount == 1
+
+    def renew(self, job):
+        """延长任务的租约，租约已经被其他进程取得时返回 False ."""
+        expires = time.time() + self.lease
+        if self._update(job, 'lease_expires = ?', (expires,)):
+            job.lease_expires = expires
+            return True
+        return False
+
+    def complete(self, job):
+        """标记任务已完成."""
+        if self._update(job, 'state = ?, error = NULL', (DONE,)):
+            job.state = DONE
+            return True
+        return False
+
+    def fail(self, job, error):
+        """标记任务执行失败，没有达到尝试次数时稍后重试."""
+        if job.attempts >= self.max_attempts:
+            state, available_at = FAILED, None
+        else:
+            state = QUEUED
+            available_at = time.time() + self.retry_delay * job.attempts
+        if self._update(job, 'state = ?, error = ?, available_at = ?',
+                        (state, str(error), available_at)):
+            job.state = state
+            job.error = str(error)
+            return True
+        return False
+
+    def retry(self, job_id):
+        """重新执行已经失败的任务."""
+        db = self._connect()
+        with db:
+            db.execute('UPDATE jobs SET state = ?, attempts = 0, '
+                       'available_at = ?, updated = ? '
+                       'WHERE id = ? AND state = ?',
+                       (QUEUED, time.time(), time.time(), job_id, FAILED))
+
+    def get(self, job_id):
+        row = self._connect().execute(
+            'SELECT %s FROM jobs WHERE id = ?' % _COLUMNS,
+            (job_id,)).fetchone()
+        return Job(*row) if row else None
+
+    def jobs(self, state=None):
+        """返回所有（或者状态为 ``state`` 的）任务."""
+        sql = 'SELECT %s FROM jobs' % _COLUMNS
+        args = ()
+        if state is not None:
+            sql += ' WHERE state = ?'
+            args = (state,)
+        return [Job(*x) for x in self._connect().execute(
+            sql + ' ORDER BY id', args)]
+
+    def counts(self):
+        """返回各个状态的任务数."""
+        counts = dict((x, 0) for x in (QUEUED, RUNNING, DONE, FAILED))
+        counts.update(self._connect().execute(
+            'SELECT state, COUNT(*) FROM jobs GROUP BY state'))
+        return counts
+
+    def purge(self, state=DONE):
+        """删除状态为 ``state`` 的任务."""
+        db = self._connect()
+        with db:
+            db.execute('DELETE FROM jobs WHERE state = ?', (state,))
+
+
+class TransferWorker(object):
+    """从 :class:`JobQueue` 中取得并执行传输任务.
+
+    上传使用 ``upload_file`` 并在 ``state_dir`` 中保存进度，下载使用
+    ``download_file`` 的 ``.part`` 文件，重新执行中断的任务时从已经
+    完成的分片继续。执行任务时一个后台线程每隔 ``lease / 3`` 秒
+    延长租约；租约被其他进程取得后中止传输（每个请求开始前和每传输完
+    一部分内容后检查），并且不再修改任务的状态。
+
+    可以在多个进程中同时运行多个 worker 。
+
+    :param pcs: PCS 对象
+    :param queue: :class:`JobQueue` 对象。
+    :param state_dir: 保存上传进度的目录。
+    """
+
+    def __init__(self, pcs, queue, state_dir):
+        self.pcs = pcs
+        self.queue = queue
+        self.state_dir = state_dir
+        #: 执行完成的任务数
+        self.done = 0
+        #: 执行失败的次数
+        self.failures = 0
+        #: 因为租约被其他进程取得而中止的次数
+        self.lost = 0
+
+    def execute(self, job, callback=None, pcs=None):
+        """执行任务，每传输一部分内容后调用 ``callback(字节数)`` .
+
+        :param pcs: （可选）代替 ``self.pcs`` 使用的 PCS 对象。
+        """
+        pcs = pcs or self.pcs
+        if job.kind == 'upload':
+            return upload_file(pcs, job.local_path, job.remote_path,
+                               state_dir=self.state_dir, callback=callback,
+                               **job.options)
+        return download_file(pcs, job.remote_path, job.local_path,
+                             callback=callback, **job.options)
+
+    def _heartbeat(self, job, stop, lost):
+        while True:
+            stop.wait(self.queue.lease / 3.0)
+            if stop.is_set():
+                return
+            try:
+                renewed = self.queue.renew(job)
+            except Exception:
+                # 数据库暂时不可用时下次再试
+                logger.exception('Failed to renew the lease of %r', job)
+                continue
+            if not renewed:
+                lost.set()
+                return
+
+    def run_once(self):
+        """执行一个任务，没有可以执行的任务时返回 None ."""
+        job = self.queue.claim()
+        if job is None:
+            return None
+        stop = threading.Event()
+        lost = threading.Event()
+        thread = threading.Thread(target=self._heartbeat,
+                                  args=(job, stop, lost))
+        thread.daemon = True
+        thread.start()
+
+        def check_lease(nbytes=None):
+            if lost.is_set():
+                raise LeaseLost('Lease of job %d was lost' % job.id)
+        try:
+            try:
+                # 每个请求（例如每个分片）开始前和每传输一部分内容后检查租约
+                self.execute(job, check_lease,
+                             _LeasedPCS(self.pcs, check_lease))
+            finally:
+                stop.set()
+                thread.join()
+        except Exception as e:
+            if lost.is_set():
+                self._lease_lost(job)
+            else:
+                self.failures += 1
+                self.queue.fail(job, e)
+        else:
+            if lost.is_set():
+                self._lease_lost(job)
+            else:
+                self.done += 1
+                self.queue.complete(job)
+        return job
+
+    def _lease_lost(self, job):
+        # 任务已经由其他进程执行，不能再修改它的状态
+        self.lost += 1
+        logger.warning('Lease of %r was lost, abandoning it', job)
+
+    def run(self, stop=None, poll_interval=1, exit_when_empty=False):
+        """不断执行任务，直到 ``stop`` （``threading.Event``）被设置.
+
+        :param poll_interval: 没有任务时等待的秒数。
+        :param exit_when_empty: 为 True 时没有任务后立即返回。
+        """
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            if self.run_once() is None:
+                if exit_when_empty:
+                    return
+                stop.wait(poll_interval)
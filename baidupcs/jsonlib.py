@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""JSON 解析.
+
+``loads`` 优先使用已安装的更快的 JSON 库（orjson、ujson、simplejson），
+都没有安装时使用标准库 ``json`` 。可以通过 :func:`set_backend` 指定::
+
+  >>> from baidupcs import jsonlib
+  >>> jsonlib.set_backend('json')
+
+对于很大的文件列表，可以使用 :func:`iter_items` 边接收边解析
+``list`` 数组，不需要把整个响应内容读到内存中::
+
+  >>> response = pcs.list_files('/apps/test_sdk', stream=True)
+  >>> for item in jsonlib.iter_items(response):
+  ...     print(item['path'])
+"""
+
+import codecs
+import json
+
+BACKENDS = ('orjson', 'ujson', 'simplejson', 'json')
+
+backend = None
+
+
+def loads(s):
+    # 第一次使用时才选择并导入 JSON 库
+    set_backend()
+    return loads(s)
+
+
+def set_backend(name=None):
+    """设置 ``loads`` 使用的 JSON 库.
+
+    :param name: 模块名称，为 None 时按 ``BACKENDS`` 的顺序使用第一个
+                 已安装的模块。
+    :return: 实际使用的模块名称
+    """
+    global backend, loads
+    for module_name in ((name,) if name else BACKENDS):
+        try:
+            module = __import__(module_name)
+        except ImportError:
+            if name:
+                raise
+            continue
+        backend = module_name
+        loads = module.loads
+        return module_name
+
+
+def response_json(response):
+    """使用当前 JSON 库解析 Response 对象的内容."""
+    if backend is None:
+        set_backend()
+    content = response.content
+    if backend != 'orjson':
+        content = content.decode(response.encoding or 'utf-8')
+    return loads(content)
+
+
+class _Reader(object):
+    """在不断增长的文本缓冲区上解析 JSON."""
+    whitespace = ' \t\n\r'
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.raw_decode = json.JSONDecoder().raw_decode
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def more(self):
+        """读取更多内容，同时丢弃已经解析过的部分."""
+        if self.eof:
+            return False
+        for chunk in self.chunks:
+            if chunk:
+                self.buf = self.buf[self.pos:] + self.decoder.decode(chunk)
+                self.pos = 0
+                return True
+        self.buf = self.buf[self.pos:] + self.decoder.decode(b'', True)
+        self.pos = 0
+        self.eof = True
+        return False
+
+    def peek(self):
+        """跳过空白字符，返回下一个字符."""
+        while True:
+            buf, pos = self.buf, self.pos
+            while pos < len(buf) and buf[pos] in self.whitespace:
+                pos += 1
+            self.pos = pos
+            if pos < len(buf):
+                return buf[pos]
+            if not self.more():
+                raise ValueError('Unexpected end of JSON data')
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError('Expecting %r at %d' % (char, self.pos))
+        self.pos += 1
+
+    def decode(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.raw_decode(self.buf, self.pos)
+            except ValueError:
+                if not self.more():
+                    raise
+                continue
+            # 以缓冲区结尾结束的数字等可能被截断，读到更多内容后再解析
+            if end == len(self.buf) and self.more():
+                continue
+            self.pos = end
+            return value
+
+def iter_items(response_or_chunks, key='list', chunk_size=64 * 1024):
+    """增量解析响应内容中 ``key`` 对应的数组，逐个返回其中的元素.
+
+    ``key`` 对应的值为对象时（如 ``diff`` 的 ``entries``）逐个返回对象的值。
+    只匹配最外层对象的键，排在 ``key`` 之前的其他键的值会被完整解析后丢弃。
+
+    :param response_or_chunks: 使用 ``stream=True`` 请求得到的 Response
+                               对象，或者由 bytes 组成的可迭代对象。
+    :param key: 数组在响应内容中的键名，默认为 ``list`` 。
+    :param chunk_size: 每次从 Response 读取的字节数。
+    """
+    if hasattr(response_or_chunks, 'iter_content'):
+        response_or_chunks = response_or_chunks.iter_content(chunk_size)
+    reader = _Reader(response_or_chunks)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        name = reader.decode()
+        reader.expect(':')
+        if name == key:
+            break
+        reader.decode()
+        if reader.peek() == '}':
+            return
+        reader.expect(',')
+
+    container = reader.peek()
+    if container not in '[{':
+        return
+    end_char = ']' if container == '[' else '}'
+    reader.pos += 1
+    if reader.peek() == end_char:
+        return
+    while True:
+        if container == '{':
+            reader.decode()
+            reader.expect(':')
+        yield reader.decode()
+        char = reader.peek()
+        if char == end_char:
+            return
+        reader.expect(',')
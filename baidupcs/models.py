@@ -0,0 +1,310 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""可选的 api 返回结果解析类型.
+
+api 方法依旧返回 ``requests.Response`` 对象，需要时可以把
+``response.json()`` 的结果解析为以下带 ``__slots__`` 的类型::
+
+  >>> quota = Quota.from_response(pcs.info())
+  >>> files = FileList.from_response(pcs.list_files('/apps/test_sdk'))
+  >>> files.total_size()
+
+大量文件列表（``list_files``/``diff``/``list_recycle_bin``）使用按列存储的
+:class:`FileList` 保存，比每个条目一个 dict 节省数倍内存。
+"""
+
+from array import array
+import binascii
+import posixpath
+import sys
+
+from .jsonlib import iter_items, response_json
+
+if sys.version_info[0] >= 3:
+    text_type = str
+else:
+    text_type = unicode  # noqa
+
+try:
+    array('q')
+    _INT64 = 'q'
+except ValueError:  # Python 2 的 array 不支持 'q'
+    _INT64 = 'd'
+
+_EMPTY_MD5 = b'\x00' * 16
+_FLAG_ISDIR = 1
+
+
+def _md5_to_bytes(md5):
+    if md5 and len(md5) == 32:
+        try:
+            return binascii.unhexlify(md5)
+        except (TypeError, ValueError):
+            pass
+    return _EMPTY_MD5
+
+
+def _bytes_to_md5(raw):
+    if raw == _EMPTY_MD5:
+        return ''
+    return binascii.hexlify(raw).decode('ascii')
+
+
+class FileEntry(object):
+    """文件/目录的元信息（``list_files``、``meta``、``diff`` 等的条目）.
+
+    ``isdelete`` 保留 ``diff`` 返回的原始值：1 为删除，-1 为彻底删除。
+    """
+    __slots__ = ('fs_id', 'path', 'size', 'ctime', 'mtime', 'md5',
+                 'isdir', 'isdelete')
+
+    def __init__(self, fs_id, path, size=0, ctime=0, mtime=0, md5='',
+                 isdir=0, isdelete=0):
+        self.fs_id = fs_id
+        self.path = path
+        self.size = size
+        self.ctime = ctime
+        self.mtime = mtime
+        self.md5 = md5
+        self.isdir = isdir
+        self.isdelete = isdelete
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(fs_id=data.get('fs_id', 0),
+                   path=data.get('path', ''),
+                   size=data.get('size', 0),
+                   ctime=data.get('ctime', 0),
+                   mtime=data.get('mtime', 0),
+                   md5=data.get('md5', ''),
+                   isdir=data.get('isdir', 0),
+                   isdelete=data.get('isdelete', 0))
+
+    @classmethod
+    def from_response(cls, response):
+        """解析 ``meta`` 的返回结果，返回 FileEntry 列表."""
+        data = response_json(response)
+        return [cls.from_dict(x) for x in data.get('list', [])]
+
+    @property
+    def name(self):
+        return posixpath.basename(self.path)
+
+    def to_dict(self):
+        # 子类（如 RecycleEntry）的 __slots__ 为空，使用 FileEntry 的字段
+        return dict((k, getattr(self, k)) for k in FileEntry.__slots__)
+
+    def __eq__(self, other):
+        return (isinstance(other, FileEntry) and
+                self.to_dict() == other.to_dict())
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '<%s %r>' % (self.__class__.__name__, self.path)
+
+
+class RecycleEntry(FileEntry):
+    """回收站中的文件/目录（``list_recycle_bin`` 的条目）."""
+    __slots__ = ()
+
+
+class Quota(object):
+    """空间配额信息（``info`` 的返回结果）."""
+    __slots__ = ('quota', 'used')
+
+    def __init__(self, quota, used):
+        self.quota = quota
+        self.used = used
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(quota=data['quota'], used=data['used'])
+
+    @classmethod
+    def from_response(cls, response):
+        return cls.from_dict(response_json(response))
+
+    @property
+    def free(self):
+        return self.quota - self.used
+
+    def __repr__(self):
+        return '<Quota used=%d quota=%d>' % (self.used, self.quota)
+
+
+class DownloadTask(object):
+    """离线下载任务（``query_download_tasks``/``list_download_tasks``）."""
+    __slots__ = ('task_id', 'status', 'source_url', 'save_path',
+                 'file_size', 'finished_size', 'create_time', 'start_time',
+                 'finish_time', 'task_name', 'rate_limit', 'timeout',
+                 'callback')
+
+    def __init__(self, task_id, **kwargs):
+        self.task_id = text_type(task_id)
+        for name in self.__slots__[1:]:
+            setattr(self, name, kwargs.get(name))
+
+    @classmethod
+    def from_dict(cls, data, task_id=None):
+        kwargs = dict((k, data.get(k)) for k in cls.__slots__[1:])
+        return cls(task_id if task_id is not None else data.get('task_id'),
+                   **kwargs)
+
+    @classmethod
+    def from_response(cls, response):
+        """解析任务列表，兼容 ``query_task`` (dict) 和 ``list_task`` (list)."""
+        task_info = response_json(response).get('task_info') or []
+        if isinstance(task_info, dict):
+            return [cls.from_dict(v, task_id=k)
+                    for k, v in task_info.items()]
+        return [cls.from_dict(x) for x in task_info]
+
+    @property
+    def finished(self):
+        # 0: 下载成功，1: 下载进行中，其他为失败
+        return self.status is not None and int(self.status) != 1
+
+    def __repr__(self):
+        return '<DownloadTask %s status=%s>' % (self.task_id, self.status)
+
+
+class FileList(object):
+    """按列存储的文件列表.
+
+    数值字段保存在 ``array`` 中，md5 以 16 字节二进制保存，
+    路径拆分为目录前缀（相同目录只保存一份）和文件名。
+    支持 ``len()``、下标（切片返回新的 FileList）和迭代，访问时才生成
+    :class:`FileEntry` 。
+    """
+    __slots__ = ('_dirs', '_dir_list', '_dir_ids', '_names', '_md5s',
+                 '_flags', '_deletes', 'fs_ids', 'sizes', 'ctimes', 'mtimes',
+                 'entry_class')
+
+    def __init__(self, entries=(), entry_class=FileEntry):
+        self._dirs = {}
+        self._dir_list = []
+        self._dir_ids = array('l')
+        self._names = []
+        self._md5s = bytearray()
+        self._flags = array('b')
+        self._deletes = array('b')
+        self.fs_ids = array(_INT64)
+        self.sizes = array(_INT64)
+        self.ctimes = array(_INT64)
+        self.mtimes = array(_INT64)
+        self.entry_class = entry_class
+        self.extend(entries)
+
+    @classmethod
+    def from_response(cls, response, key='list', entry_class=FileEntry,
+                      stream=False):
+        """解析 Response 对象.
+
+        :param stream: 是否边接收边解析，需要请求时指定 ``stream=True`` 。
+        """
+        if stream:
+            items = iter_items(response, key=key)
+        else:
+            items = response_json(response).get(key) or []
+        return cls(items, entry_class=entry_class)
+
+    def _dir_id(self, dirname):
+        try:
+            return self._dirs[dirname]
+        except KeyError:
+            dir_id = self._dirs[dirname] = len(self._dir_list)
+            self._dir_list.append(dirname)
+            return dir_id
+
+    def append(self, entry):
+        """添加一个条目，``entry`` 可以是 dict 或 FileEntry."""
+        if isinstance(entry, FileEntry):
+            entry = entry.to_dict()
+        dirname, name = posixpath.split(entry.get('path', ''))
+        self._dir_ids.append(self._dir_id(dirname))
+        self._names.append(name)
+        self._md5s.extend(_md5_to_bytes(entry.get('md5')))
+        self._flags.append(_FLAG_ISDIR if entry.get('isdir') else 0)
+        self._deletes.append(int(entry.get('isdelete') or 0))
+        self.fs_ids.append(entry.get('fs_id') or 0)
+        self.sizes.append(entry.get('size') or 0)
+        self.ctimes.append(entry.get('ctime') or 0)
+        self.mtimes.append(entry.get('mtime') or 0)
+
+    def extend(self, entries):
+        for entry in entries:
+            self.append(entry)
+
+    def path(self, index):
+        return posixpath.join(self._dir_list[self._dir_ids[index]],
+                              self._names[index])
+
+    def _entry(self, index):
+        return self.entry_class(
+            fs_id=int(self.fs_ids[index]),
+            path=self.path(index),
+            size=int(self.sizes[index]),
+            ctime=int(self.ctimes[index]),
+            mtime=int(self.mtimes[index]),
+            md5=_bytes_to_md5(bytes(self._md5s[index * 16:index * 16 + 16])),
+            isdir=int(bool(self._flags[index] & _FLAG_ISDIR)),
+            isdelete=self._deletes[index],
+        )
+
+    def total_size(self):
+        return int(sum(self.sizes))
+
+    def __len__(self):
+        return len(self._names)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.__class__(
+                (self._entry(x) for x in range(*index.indices(len(self)))),
+                entry_class=self.entry_class)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('FileList index out of range')
+        return self._entry(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._entry(index)
+
+    def __repr__(self):
+        return '<FileList %d entries>' % len(self)
+
+
+class DiffPage(object):
+    """增量更新查询（``diff``）的一页结果."""
+    __slots__ = ('entries', 'has_more', 'reset', 'cursor')
+
+    def __init__(self, entries, has_more, reset, cursor):
+        self.entries = entries
+        self.has_more = has_more
+        self.reset = reset
+        self.cursor = cursor
+
+    @classmethod
+    def from_dict(cls, data):
+        entries = data.get('entries') or {}
+        if isinstance(entries, dict):
+            entries = entries.values()
+        return cls(entries=FileList(entries),
+                   has_more=bool(data.get('has_more')),
+                   reset=bool(data.get('reset')),
+                   cursor=data.get('cursor'))
+
+    @classmethod
+    def from_response(cls, response):
+        return cls.from_dict(response_json(response))
+
+    def __repr__(self):
+        return '<DiffPage %d entries has_more=%s>' % (len(self.entries),
+                                                       self.has_more)
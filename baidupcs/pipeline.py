@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""大量小文件的流水线上传."""
+
+import copy
+import time
+
+from .hashing import SLICE_SIZE, content_digest
+from .utils import imap_unordered
+
+
+def _with_session(pcs, workers):
+    """返回复用连接的 PCS 对象，连接池大小与并发数相同."""
+    if getattr(pcs, 'session', False) is not None:
+        return pcs
+    import requests
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=workers)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    pcs = copy.copy(pcs)
+    pcs.session = session
+    return pcs
+
+
+class SmallFileUploader(object):
+    """流水线上传大量小文件.
+
+    * 一个线程预先读取之后的文件并计算校验值，同时 ``workers`` 个线程
+      上传已经读取的文件；
+    * 所有请求复用 ``requests.Session`` 的连接（``pcs`` 没有指定
+      ``session`` 时使用一个 ``pcs`` 的副本）；
+    * 大于 256KB 的文件先尝试 ``rapid_upload`` 秒传；
+    * 文件内容读入内存后直接拼接成 multipart 请求体。
+
+    ::
+
+      >>> uploader = SmallFileUploader(pcs, workers=32)
+      >>> for local_path, remote_path, method, response in uploader.upload(
+      ...         jobs):
+      ...     response.raise_for_status()
+      >>> uploader.files_per_second()
+
+    :param pcs: PCS 对象
+    :param workers: 同时上传的文件数。
+    :param ondup: 同 ``PCS.upload`` 。
+    :param rapid_upload: 是否尝试秒传。
+    """
+
+    def __init__(self, pcs, workers=16, ondup=None, rapid_upload=True):
+        self.pcs = _with_session(pcs, workers)
+        self.workers = workers
+        self.ondup = ondup
+        self.rapid_upload = rapid_upload
+        #: 上传成功的文件数
+        self.files = 0
+        #: 上传成功的字节数
+        self.bytes = 0
+        #: 上传失败（响应不是 2xx）的文件数
+        self.failures = 0
+        #: 秒传成功的文件数
+        self.rapid_uploads = 0
+        #: 上传花费的秒数
+        self.elapsed = 0.0
+
+    def files_per_second(self):
+        return self.files / self.elapsed if self.elapsed else 0.0
+
+    def _read(self, job):
+        local_path, remote_path = job
+        with open(local_path, 'rb') as f:
+            content = f.read()
+        digest = None
+        if self.rapid_upload and len(content) > SLICE_SIZE:
+            digest = content_digest(content)
+        return local_path, remote_path, content, digest
+
+    def _send(self, item):
+        local_path, remote_path, content, digest = item
+        if digest is not None:
+            response = self.pcs.rapid_upload(
+                remote_path, *digest.rapid_upload_args(), ondup=self.ondup)
+            if response.ok:
+                return 'rapid_upload', response
+        return 'upload', self.pcs.upload(remote_path, content,
+                                         ondup=self.ondup)
+
+    def upload(self, jobs, callback=None):
+        """上传 ``jobs`` 中的 ``(本地路径, 网盘路径)`` ，按完成顺序返回
+        ``(本地路径, 网盘路径, 方式, Response 对象)`` ，
+        方式为 ``'rapid_upload'`` 或 ``'upload'`` 。上传失败的文件也会返回，
+        需要检查 Response 对象的状态，它们不计入 ``files`` 和 ``bytes`` 。
+
+        :param callback: （可选）每成功上传一个文件后调用
+                         ``callback(字节数)`` 。
+        """
+        start = time.time()
+        # imap_unordered 在单独的线程中遍历 jobs ，读取文件与上传同时进行
+        items = (self._read(job) for job in jobs)
+        try:
+            for item, (method, response) in imap_unordered(
+                    self._send, items, self.workers):
+                if response.ok:
+                    size = len(item[2])
+                    self.files += 1
+                    self.bytes += size
+                    if method == 'rapid_upload':
+                        self.rapid_uploads += 1
+                    if callback:
+                        callback(size)
+                else:
+                    self.failures += 1
+                yield item[0], item[1], method, response
+        finally:
+            self.elapsed += time.time() - start
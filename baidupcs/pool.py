@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""多个 Access Token 组成的客户端池."""
+
+from collections import deque
+import threading
+import time
+
+from .api import PCS, InvalidToken
+from .jsonlib import response_json
+from .models import Quota
+
+try:
+    string_types = basestring  # noqa
+except NameError:
+    string_types = str
+
+#: 百度 PCS 表示请求过于频繁的错误码
+THROTTLE_ERROR_CODES = (31034,)
+
+
+def _error_code(response):
+    try:
+        return response_json(response).get('error_code')
+    except Exception:
+        return None
+
+
+def _streams(args, kwargs):
+    """返回参数中的文件对象及其当前位置，有不能 seek 的文件对象时返回 None.
+
+    请求失败后重试前需要把文件对象恢复到原来的位置。
+    """
+    streams = []
+    for value in list(args) + list(kwargs.values()):
+        if not hasattr(value, 'read'):
+            continue
+        seekable = getattr(value, 'seekable', None)
+        if seekable is not None and not seekable():
+            return None
+        try:
+            streams.append((value, value.tell()))
+        except (AttributeError, IOError, OSError, ValueError):
+            return None
+    return streams
+
+
+def _rewind(streams):
+    for stream, position in streams:
+        stream.seek(position)
+
+
+class PoolMember(object):
+    """客户端池中的一个客户端及其状态."""
+
+    def __init__(self, pcs, refresh_token=None, client_id=None,
+                 client_secret=None, window=50):
+        self.pcs = pcs
+        self.refresh_token = refresh_token
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.in_flight = 0
+        self.results = deque(maxlen=window)
+        self.quota = None
+        self.unavailable_until = 0
+        self.invalid = False
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def error_rate(self):
+        if not self.results:
+            return 0.0
+        return 1.0 - float(sum(self.results)) / len(self.results)
+
+    def available(self, now):
+        return not self.invalid and self.unavailable_until <= now
+
+    def refresh(self, expired_token=None):
+        """使用 Refresh Token 获取新的 Access Token.
+
+        Refresh Token 只能使用一次，同一时间只有一个线程刷新；
+        ``expired_token`` 已经被其他线程刷新过时不再刷新。
+        """
+        from .tools import get_new_access_token
+        with self._refresh_lock:
+            if (expired_token is not None and
+                    self.pcs.access_token != expired_token):
+                return
+            response = get_new_access_token(
+                self.refresh_token, self.client_id, self.client_secret)
+            response.raise_for_status()
+            data = response_json(response)
+            self.pcs.access_token = data['access_token']
+            self.refresh_token = data.get('refresh_token', self.refresh_token)
+
+    def stats(self):
+        return {
+            'in_flight': self.in_flight,
+            'error_rate': self.error_rate,
+            'quota': self.quota.quota if self.quota else None,
+            'used': self.quota.used if self.quota else None,
+            'available': self.available(time.time()),
+            'invalid': self.invalid,
+        }
+
+
+class NoAvailableClient(Exception):
+    """异常：客户端池中没有可用的客户端."""
+    pass
+
+
+class PCSPool(object):
+    """把请求分发给多个 PCS 客户端.
+
+    每次调用选择可用客户端中进行中的请求最少、错误率最低、剩余空间最多的
+    一个。请求被限流或错误率过高的客户端会在 ``cooldown`` 秒内不再使用；
+    Access Token 失效时如果提供了 Refresh Token 会自动刷新，否则（或者
+    刷新失败时）移出池，并在下一个客户端上重试::
+
+      >>> pool = PCSPool(['token1', 'token2'])
+      >>> pool.add('token3', refresh_token='xxx', client_id='id',
+      ...          client_secret='secret')
+      >>> response = pool.list_files('/apps/test_sdk')
+
+    .. warning::
+       池中的客户端需要能够处理相同的请求（例如同一个用户的同一个应用的
+       多个 Access Token）。
+
+    :param clients: PCS 对象或 Access Token 的列表。
+    :param max_error_rate: 最近 ``window`` 次请求的错误率超过该值时
+                           暂停使用该客户端。
+    :param min_samples: 计算错误率所需的最少请求数。
+    :param cooldown: 暂停使用的秒数。
+    :param window: 统计错误率的请求数。
+    """
+
+    def __init__(self, clients=(), max_error_rate=0.5, min_samples=10,
+                 cooldown=60, window=50):
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.window = window
+        self.members = []
+        self._lock = threading.Lock()
+        for client in clients:
+            self.add(client)
+
+    def add(self, client, refresh_token=None, client_id=None,
+            client_secret=None):
+        """添加一个 PCS 对象或 Access Token."""
+        if isinstance(client, string_types):
+            client = PCS(client)
+        member = PoolMember(client, refresh_token, client_id, client_secret,
+                            window=self.window)
+        with self._lock:
+            self.members.append(member)
+        return member
+
+    def _free(self, member):
+        return member.quota.free if member.quota else 0
+
+    def acquire(self):
+        """选择一个客户端并把它的进行中请求数加一."""
+        now = time.time()
+        with self._lock:
+            members = [x for x in self.members if x.available(now)]
+            if not members:
+                raise NoAvailableClient('No available client in the pool')
+            member = min(members, key=lambda x: (x.in_flight, x.error_rate,
+                                                 -self._free(x)))
+            member.in_flight += 1
+        return member
+
+    def release(self, member, ok, throttled=False):
+        now = time.time()
+        with self._lock:
+            member.in_flight -= 1
+            member.results.append(bool(ok))
+            if throttled:
+                member.unavailable_until = now + self.cooldown
+            elif (len(member.results) >= self.min_samples and
+                    member.error_rate > self.max_error_rate):
+                member.unavailable_until = now + self.cooldown
+                member.results.clear()
+
+    def _invoke(self, member, name, args, kwargs, streams):
+        """调用 ``name`` 方法，Access Token 失效并且无法刷新时把客户端
+        标记为失效."""
+        token = member.pcs.access_token
+        try:
+            return getattr(member.pcs, name)(*args, **kwargs)
+        except InvalidToken as e:
+            if not member.refresh_token:
+                member.invalid = True
+                raise
+            error = e
+        try:
+            member.refresh(token)
+        except Exception:
+            member.invalid = True
+            raise error
+        if streams is None:
+            # 客户端仍然可用，但是文件对象已经被读取，不能重试
+            raise error
+        _rewind(streams)
+        try:
+            return getattr(member.pcs, name)(*args, **kwargs)
+        except InvalidToken:
+            member.invalid = True
+            raise
+
+    def call(self, name, *args, **kwargs):
+        """在选中的客户端上调用 PCS 的 ``name`` 方法.
+
+        Access Token 失效（并且无法刷新）的客户端被移出池，
+        请求在下一个客户端上重试；没有可用的客户端时抛出最后一个
+        :class:`~baidupcs.InvalidToken` 。重试前参数中的文件对象恢复到
+        第一次请求前的位置，有不能 seek 的文件对象时不重试，
+        直接抛出 :class:`~baidupcs.InvalidToken` 。
+        """
+        streams = _streams(args, kwargs)
+        error = None
+        while True:
+            try:
+                member = self.acquire()
+            except NoAvailableClient:
+                if error is not None:
+                    raise error
+                raise
+            ok = throttled = False
+            try:
+                if error is not None:
+                    _rewind(streams)
+                response = self._invoke(member, name, args, kwargs, streams)
+            except InvalidToken as e:
+                if streams is None:
+                    raise
+                error = e
+                continue
+            else:
+                throttled = (response.status_code in (429, 503) or
+                             (not response.ok and
+                              _error_code(response) in THROTTLE_ERROR_CODES))
+                ok = response.status_code < 500 and not throttled
+                return response
+            finally:
+                self.release(member, ok, throttled)
+
+    def __getattr__(self, name):
+        if name.startswith('_') or not callable(getattr(PCS, name, None)):
+            raise AttributeError(name)
+
+        def method(*args, **kwargs):
+            return self.call(name, *args, **kwargs)
+        method.__name__ = name
+        return method
+
+    def refresh_quota(self):
+        """调用 ``info`` 更新每个客户端的空间配额信息."""
+        for member in list(self.members):
+            response = member.pcs.info()
+            if response.ok:
+                member.quota = Quota.from_response(response)
+
+    def stats(self):
+        """返回每个客户端的状态."""
+        with self._lock:
+            return [x.stats() for x in self.members]
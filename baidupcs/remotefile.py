@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""通过 ``Range`` 请求按需读取网盘文件的只读文件对象."""
+
+from collections import OrderedDict
+import io
+import threading
+
+from .models import FileEntry
+
+
+class RemoteFile(io.RawIOBase):
+    """只读、支持 ``seek`` 的网盘文件.
+
+    文件按 ``block_size`` 分块，读取时只通过 ``download`` 的 ``Range``
+    请求下载用到的块，下载过的块保存在 LRU 缓存中；顺序读取时一次多下载
+    ``read_ahead`` 个块。可以直接交给 ``zipfile`` 、``tarfile`` 等使用::
+
+      >>> with pcs.open('/apps/test_sdk/big.zip') as f:
+      ...     print(zipfile.ZipFile(f).namelist())
+
+    :param pcs: PCS 对象
+    :param remote_path: 网盘中文件的路径。
+    :param size: （可选）文件大小，没有指定时通过 ``meta`` 获取。
+    :param block_size: 每块的大小。
+    :param cache_blocks: 最多缓存的块数。
+    :param read_ahead: 顺序读取时额外下载的块数。
+    :param kwargs: 传给 ``download`` 的其他参数。
+    """
+
+    def __init__(self, pcs, remote_path, size=None, block_size=1024 * 1024,
+                 cache_blocks=32, read_ahead=2, **kwargs):
+        super(RemoteFile, self).__init__()
+        if size is None:
+            response = pcs.meta(remote_path)
+            response.raise_for_status()
+            size = FileEntry.from_response(response)[0].size
+        self.pcs = pcs
+        self.name = remote_path
+        self.size = size
+        self.block_size = block_size
+        self.cache_blocks = max(cache_blocks, read_ahead + 1)
+        self.read_ahead = read_ahead
+        #: 发出的 ``Range`` 请求数
+        self.requests = 0
+        #: 下载的总字节数
+        self.bytes_fetched = 0
+        self._kwargs = kwargs
+        self._position = 0
+        self._last_block = None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError('invalid whence (%r)' % whence)
+        if position < 0:
+            raise ValueError('negative seek position %d' % position)
+        self._position = position
+        return position
+
+    def readinto(self, b):
+        if self.closed:
+            raise ValueError('I/O operation on closed file.')
+        start = self._position
+        end = min(start + len(b), self.size)
+        if start >= end:
+            return 0
+        with self._lock:
+            self._fetch(start // self.block_size,
+                        (end - 1) // self.block_size)
+            written = 0
+            position = start
+            while position < end:
+                index, skip = divmod(position, self.block_size)
+                data = self._cache[index][skip:skip + end - position]
+                b[written:written + len(data)] = data
+                written += len(data)
+                position += len(data)
+            while len(self._cache) > self.cache_blocks:
+                self._cache.popitem(last=False)
+        self._position = end
+        return written
+
+    def readall(self):
+        return self.read(max(self.size - self._position, 0))
+
+    def _fetch(self, first, last):
+        """确保第 ``first`` 到 ``last`` 块都在缓存中."""
+        sequential = (self._last_block is not None and
+                      first in (self._last_block, self._last_block + 1))
+        self._last_block = last
+        if sequential:
+            last += self.read_ahead
+        last = min(last, (self.size - 1) // self.block_size)
+        index = first
+        while index <= last:
+            if index in self._cache:
+                self._cache[index] = self._cache.pop(index)
+                index += 1
+                continue
+            # 连续的未缓存的块用一个请求下载
+            stop = index
+            while stop + 1 <= last and stop + 1 not in self._cache:
+                stop += 1
+            self._download(index, stop)
+            index = stop + 1
+
+    def _download(self, first, last):
+        start = first * self.block_size
+        end = min((last + 1) * self.block_size, self.size)
+        headers = dict(self._kwargs.get('headers') or {},
+                       Range='bytes=%d-%d' % (start, end - 1))
+        kwargs = dict(self._kwargs, headers=headers)
+        response = self.pcs.download(self.name, **kwargs)
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise IOError('Range requests are not supported')
+        content = response.content
+        if len(content) != end - start:
+            raise IOError('Incomplete range: %d of %d bytes' % (
+                len(content), end - start))
+        self.requests += 1
+        self.bytes_fetched += len(content)
+        for index in range(first, last + 1):
+            offset = (index - first) * self.block_size
+            self._cache[index] = content[offset:offset + self.block_size]
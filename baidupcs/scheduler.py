@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""多个传输任务之间的优先级调度和带宽限制."""
+
+from contextlib import contextmanager
+import itertools
+import threading
+import time
+
+#: 交互式的传输（例如用户正在等待的小文件）
+INTERACTIVE = 0
+#: 普通传输
+NORMAL = 1
+#: 批量传输，只使用剩余的带宽
+BULK = 2
+
+
+class TokenBucket(object):
+    """令牌桶限速.
+
+    :param rate: 每秒的字节数，为 None 时不限速。
+    :param burst: 桶的容量，默认为 ``rate`` 。
+    """
+
+    def __init__(self, rate=None, burst=None):
+        self.rate = rate
+        self.burst = burst or rate
+        self.tokens = self.burst
+        self.timestamp = time.time()
+        self._lock = threading.Lock()
+
+    def consume(self, nbytes):
+        """取出 ``nbytes`` 个令牌，不足时等待."""
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.time()
+            self.tokens = min(self.burst, self.tokens +
+                              (now - self.timestamp) * self.rate)
+            self.timestamp = now
+            # 允许透支，之后的请求等待透支的部分恢复
+            self.tokens -= nbytes
+            wait = -self.tokens / float(self.rate)
+        if wait > 0:
+            time.sleep(wait)
+
+
+class Scheduler(object):
+    """在多个传输任务之间分配同时进行的请求数和带宽.
+
+    分片上传和并发 ``Range`` 下载的每个分片在传输前都要通过
+    :meth:`slot` 获得一个名额：
+
+    * 名额空出时优先分配给优先级最高（数值最小）的分片，所以批量任务在
+      分片之间就会被交互式任务抢占；
+    * 优先级相同时在各个队列（例如不同的用户）之间按权重公平分配；
+    * 所有传输共享上传和下载的带宽上限。
+
+    ::
+
+      >>> scheduler = Scheduler(streams=8, upload_rate=2 * 1024 * 1024)
+      >>> upload_file(pcs, 'big.iso', '/apps/test_sdk/big.iso',
+      ...             scheduler=scheduler, priority=BULK, queue='backup')
+
+    :param streams: 同时进行的请求数。
+    :param upload_rate: （可选）上传带宽上限（字节/秒）。
+    :param download_rate: （可选）下载带宽上限（字节/秒）。
+    :param weights: （可选）``{队列: 权重}`` ，默认权重为 1 。
+    """
+
+    def __init__(self, streams=4, upload_rate=None, download_rate=None,
+                 weights=None):
+        self.streams = streams
+        self.buckets = {'upload': TokenBucket(upload_rate),
+                        'download': TokenBucket(download_rate)}
+        self.weights = dict(weights or {})
+        self.active = 0
+        self._waiting = []
+        self._busy = {}
+        self._served = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def _next(self):
+        return min(self._waiting, key=lambda x: (
+            x[0], self._served.get(x[2], 0), x[1]))
+
+    def acquire(self, priority=NORMAL, queue='default'):
+        """等待并占用一个名额."""
+        waiter = (priority, next(self._seq), queue)
+        with self._cond:
+            if not self._busy.get(queue):
+                # 空闲过的队列不能用之前攒下的份额插队
+                others = [self._served.get(x[2], 0) for x in self._waiting]
+                if others:
+                    self._served[queue] = max(self._served.get(queue, 0),
+                                              min(others))
+            self._busy[queue] = self._busy.get(queue, 0) + 1
+            self._waiting.append(waiter)
+            while self.active >= self.streams or self._next() is not waiter:
+                self._cond.wait()
+            self._waiting.remove(waiter)
+            self.active += 1
+            self._served[queue] = (self._served.get(queue, 0) +
+                                   1.0 / self.weights.get(queue, 1))
+            self._cond.notify_all()
+
+    def release(self, queue='default'):
+        """释放 :meth:`acquire` 占用的名额."""
+        with self._cond:
+            self.active -= 1
+            self._busy[queue] -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority=NORMAL, queue='default'):
+        self.acquire(priority, queue)
+        try:
+            yield self
+        finally:
+            self.release(queue)
+
+    def throttle(self, direction, nbytes):
+        """按带宽上限等待传输 ``nbytes`` 个字节.
+
+        :param direction: ``'upload'`` 或 ``'download'`` 。
+        """
+        self.buckets[direction].consume(nbytes)
+
+
+@contextmanager
+def scheduled(scheduler, priority=NORMAL, queue='default'):
+    """``scheduler`` 为 None 时不做任何调度."""
+    if scheduler is None:
+        yield
+        return
+    with scheduler.slot(priority, queue):
+        yield
+
+
+def throttle(scheduler, direction, nbytes):
+    if scheduler is not None:
+        scheduler.throttle(direction, nbytes)
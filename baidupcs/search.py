@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from .jsonlib import response_json
+from .models import FileEntry
+from .utils import imap_unordered
+
+
+def multi_search(pcs, queries, recurrent='0', workers=4, index=None,
+                 max_age=300, **kwargs):
+    """并发地在多个目录中搜索多个关键词，边搜索边返回结果.
+
+    结果按 ``fs_id`` 去重，以 :class:`~baidupcs.models.FileEntry` 的形式
+    按完成的先后顺序返回::
+
+      >>> queries = [('/apps/a', 'foo'), ('/apps/b', 'foo'),
+      ...            ('/apps/b', 'bar')]
+      >>> for entry in multi_search(pcs, queries):
+      ...     print(entry.path)
+
+    :param pcs: PCS 对象
+    :param queries: ``(remote_path, keyword)`` 对的列表。
+    :param recurrent: 是否递归，同 ``PCS.search`` 。
+    :param workers: 同时进行的搜索请求数。
+    :param index: （可选）:class:`~baidupcs.index.MetadataIndex` 对象，
+                  目录在 ``max_age`` 秒内同步过的查询直接在索引中搜索，
+                  其他查询仍然调用 api 。
+    :param max_age: 索引的有效期（秒）。
+    :param kwargs: 传给 ``PCS.search`` 的其他参数。
+    """
+    seen = set()
+    if index is not None:
+        remaining = []
+        for remote_path, keyword in queries:
+            if not index.is_fresh(max_age, remote_path):
+                remaining.append((remote_path, keyword))
+                continue
+            for entry in index.search(remote_path, keyword, recurrent):
+                if entry.fs_id not in seen:
+                    seen.add(entry.fs_id)
+                    yield entry
+        queries = remaining
+
+    def search(query):
+        response = pcs.search(query[0], query[1], recurrent, **kwargs)
+        response.raise_for_status()
+        return response_json(response).get('list') or []
+
+    for query, items in imap_unordered(search, queries, workers):
+        for item in items:
+            if item.get('fs_id') not in seen:
+                seen.add(item.get('fs_id'))
+                yield FileEntry.from_dict(item)
@@ -1,8 +1,6 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import requests
-
 
 def get_new_access_token(refresh_token, client_id, client_secret,
                          scope=None, **kwargs):
@@ -33,4 +31,5 @@ def get_new_access_token(refresh_token, client_id, client_secret,
     if scope:
         data['scope'] = scope
     url = 'https://openapi.baidu.com/oauth/2.0/token'
+    import requests
     return requests.post(url, data=data)
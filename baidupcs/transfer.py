@@ -0,0 +1,486 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""支持断点续传的文件上传/下载."""
+
+from hashlib import md5
+import json
+import os
+import threading
+
+from .adaptive import FixedController, PermanentError, run_chunks
+from .hashing import BLOCK_SIZE, MAX_BLOCKS, block_size_for, hash_file
+from .jsonlib import response_json
+from .models import FileEntry
+from .scheduler import NORMAL, scheduled, throttle
+from .utils import imap_unordered, replace_file
+
+
+class IntegrityError(PermanentError):
+    """异常：传输的内容与服务端返回的校验值不一致."""
+
+    def __init__(self, message, expected=None, actual=None):
+        super(IntegrityError, self).__init__(message)
+        self.expected = expected
+        self.actual = actual
+
+
+class HashingReader(object):
+    """在读取的同时计算 MD5 的文件对象包装."""
+
+    def __init__(self, fileobj, size):
+        self.fileobj = fileobj
+        self.size = size
+        self.position = 0
+        self.md5 = md5()
+
+    @property
+    def len(self):
+        # requests_toolbelt 通过 len 获取剩余长度
+        return self.size - self.position
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.md5.update(data)
+        self.position += len(data)
+        return data
+
+    def hexdigest(self):
+        return self.md5.hexdigest()
+
+
+def check_integrity(expected, actual, what):
+    """``expected`` （服务端返回的值）与 ``actual`` （本地计算的值）都不为空
+    并且不一致时抛出 :class:`IntegrityError` ."""
+    if expected and actual and expected != actual:
+        raise IntegrityError('%s mismatch: expected %s, got %s' % (
+            what, expected, actual), expected, actual)
+
+
+def upload_block(pcs, data, check_md5=True, what='MD5 of block', **kwargs):
+    """用 ``upload_tmpfile`` 上传一个分片，返回服务端返回的分片 md5 .
+
+    :param check_md5: 是否与 ``data`` 的 MD5 比较，不一致时抛出
+                      :class:`IntegrityError` 。
+    :param what: 校验失败时异常信息中的名称。
+    :param kwargs: 传给 ``upload_tmpfile`` 的其他参数。
+    """
+    response = pcs.upload_tmpfile(data, **kwargs)
+    response.raise_for_status()
+    block_md5 = response_json(response)['md5']
+    if check_md5:
+        check_integrity(block_md5, md5(data).hexdigest(), what)
+    return block_md5
+
+
+def _save_json(path, data):
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    replace_file(tmp_path, path)
+
+
+def _state_path(state_dir, local_path, remote_path):
+    key = '%s\n%s' % (os.path.abspath(local_path), remote_path)
+    return os.path.join(state_dir,
+                        md5(key.encode('utf-8')).hexdigest() + '.json')
+
+
+class TransferState(object):
+    """记录分片传输进度的状态文件，用于断点续传.
+
+    已完成的分片以 ``{offset: [length, 附加信息]}`` 的形式保存；
+    本地文件的大小或修改时间变化后之前的进度作废。
+    """
+
+    def __init__(self, path, info):
+        self.path = path
+        self.info = info
+        self.blocks = {}
+        self._lock = threading.Lock()
+        if not path:
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return
+        if all(data.get(k) == v for k, v in self.info.items()):
+            self.blocks = dict((int(k), tuple(v))
+                               for k, v in data.get('blocks', {}).items())
+
+    @classmethod
+    def for_upload(cls, state_dir, local_path, remote_path):
+        stat = os.stat(local_path)
+        return cls(_state_path(state_dir, local_path, remote_path),
+                   {'size': stat.st_size, 'mtime': int(stat.st_mtime)})
+
+    def ranges(self):
+        return [(offset, x[0]) for offset, x in self.blocks.items()]
+
+    def add(self, offset, length, value=None):
+        with self._lock:
+            self.blocks[offset] = (length, value)
+            if not self.path:
+                return
+            _save_json(self.path, dict(self.info, blocks=self.blocks))
+
+    def clear(self):
+        self.blocks = {}
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def upload_file(pcs, local_path, remote_path, ondup=None,
+                block_size=BLOCK_SIZE, workers=4, state_dir=None,
+                callback=None, controller=None, check_md5=True,
+                scheduler=None, priority=NORMAL, queue='default', **kwargs):
+    """上传本地文件.
+
+    不超过 ``block_size`` 的文件使用 ``upload`` 直接上传，
+    更大的文件使用 ``upload_tmpfile`` 并发上传各个分片后
+    再调用 ``upload_superfile`` 合并。
+
+    上传的同时计算内容的 MD5 ，与服务端返回的文件/分片的 md5 比较，
+    不一致时抛出 :class:`IntegrityError` ，不需要再读一遍文件。
+
+    :param pcs: PCS 对象
+    :param local_path: 本地文件路径。
+    :param remote_path: 网盘中文件的保存路径（包含文件名）。
+    :param ondup: 同 ``PCS.upload`` 。
+    :param block_size: 分片大小。
+    :param workers: 同时上传的分片数。
+    :param state_dir: （可选）保存上传进度的目录，指定后支持断点续传。
+    :param callback: （可选）每上传完一部分内容后调用 ``callback(字节数)`` 。
+    :param controller: （可选）:class:`~baidupcs.adaptive.AdaptiveController`
+                       对象，指定后由它动态决定分片大小和并发数，
+                       此时忽略 ``block_size`` 和 ``workers`` 。
+    :param check_md5: 是否校验上传的内容。
+    :param scheduler: （可选）:class:`~baidupcs.scheduler.Scheduler` 对象，
+                      每个分片上传前从它获得名额并按带宽上限等待。
+    :param priority: 在 ``scheduler`` 中的优先级。
+    :param queue: 在 ``scheduler`` 中所属的队列。
+    :return: 最后一次请求的 Response 对象
+    """
+    size = os.path.getsize(local_path)
+    # upload_superfile 至少需要两个分片
+    if size <= (controller.chunk_size if controller else block_size):
+        with scheduled(scheduler, priority, queue):
+            throttle(scheduler, 'upload', size)
+            with open(local_path, 'rb') as f:
+                reader = HashingReader(f, size)
+                response = pcs.upload(remote_path, reader, ondup=ondup,
+                                      **kwargs)
+        response.raise_for_status()
+        if check_md5:
+            check_integrity(response_json(response).get('md5'),
+                            reader.hexdigest(), 'MD5 of %s' % remote_path)
+        if callback:
+            callback(size)
+        return response
+    if controller is None:
+        controller = FixedController(block_size_for(size, block_size),
+                                     workers)
+
+    if state_dir:
+        state = TransferState.for_upload(state_dir, local_path, remote_path)
+    else:
+        state = TransferState(None, {})
+    blocks = dict(state.blocks)
+    if callback and blocks:
+        callback(sum(x[0] for x in blocks.values()))
+
+    def upload_range(offset, length):
+        with open(local_path, 'rb') as f:
+            f.seek(offset)
+            data = f.read(length)
+        with scheduled(scheduler, priority, queue):
+            throttle(scheduler, 'upload', length)
+            block_md5 = upload_block(pcs, data, check_md5,
+                                     'MD5 of block at %d' % offset, **kwargs)
+        state.add(offset, length, block_md5)
+        if callback:
+            callback(length)
+        return block_md5
+
+    for offset, length, block_md5 in run_chunks(
+            controller, size, upload_range, done=state.ranges(),
+            max_chunks=MAX_BLOCKS):
+        blocks[offset] = (length, block_md5)
+
+    response = pcs.upload_superfile(
+        remote_path, [blocks[x][1] for x in sorted(blocks)], ondup=ondup,
+        **kwargs)
+    # 合并失败时（例如分片已过期）下次重新上传所有分片
+    state.clear()
+    response.raise_for_status()
+    if check_md5:
+        check_integrity(size, response_json(response).get('size'),
+                        'Size of %s' % remote_path)
+    return response
+
+
+def delta_upload(pcs, local_path, remote_path, manifest_dir, ondup='overwrite',
+                 block_size=BLOCK_SIZE, workers=4, callback=None, **kwargs):
+    """只上传修改过的分片来更新网盘中的大文件.
+
+    上次上传的各个分片的 MD5 保存在 ``manifest_dir`` 中。再次上传时先计算
+    新文件的分片 MD5 列表，只用 ``upload_tmpfile`` 上传之前没有上传过的
+    分片，然后用完整的 MD5 列表调用 ``upload_superfile`` 合并；
+    服务端已经不接受之前的分片时（例如分片已过期）上传其余所有分片后
+    再合并一次。
+
+    文件不超过一个分片时与 :func:`upload_file` 相同。
+
+    :param pcs: PCS 对象
+    :param local_path: 本地文件路径。
+    :param remote_path: 网盘中文件的保存路径（包含文件名）。
+    :param manifest_dir: 保存分片 MD5 列表的目录。
+    :param ondup: 同 ``PCS.upload_superfile`` ，默认覆盖原文件。
+    :param block_size: 分片大小，修改后之前的分片都不能再使用。
+    :param workers: 同时上传的分片数。
+    :param callback: （可选）每上传完一个分片后调用 ``callback(字节数)`` 。
+    :return: 最后一次请求的 Response 对象
+    """
+    size = os.path.getsize(local_path)
+    if size <= block_size:
+        return upload_file(pcs, local_path, remote_path, ondup=ondup,
+                           block_size=block_size, callback=callback, **kwargs)
+    digest = hash_file(local_path, block_size)
+    manifest_path = _state_path(manifest_dir, local_path, remote_path)
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (IOError, OSError, ValueError):
+        manifest = {}
+    if manifest.get('block_size') == digest.block_size:
+        uploaded = set(manifest.get('block_list', ()))
+    else:
+        uploaded = set()
+
+    if (manifest.get('md5') == digest.content_md5 and
+            uploaded.issuperset(digest.block_list)):
+        # 文件没有变化，网盘中的文件也没有被修改时不需要上传
+        response = pcs.meta(remote_path, **kwargs)
+        if response.ok and FileEntry.from_response(response)[0].size == size:
+            return response
+
+    def upload_blocks(indexes):
+        # 内容相同的分片只上传一次
+        first = {}
+        for index in indexes:
+            first.setdefault(digest.block_list[index], index)
+        for _ in imap_unordered(upload_index, sorted(first.values()),
+                                workers):
+            pass
+        uploaded.update(first)
+
+    def upload_index(index):
+        with open(local_path, 'rb') as f:
+            f.seek(index * digest.block_size)
+            data = f.read(digest.block_size)
+        block_md5 = upload_block(pcs, data, False, **kwargs)
+        check_integrity(block_md5, digest.block_list[index],
+                        'MD5 of block %d' % index)
+        if callback:
+            callback(len(data))
+
+    indexes = range(len(digest.block_list))
+    reused = [i for i in indexes if digest.block_list[i] in uploaded]
+    upload_blocks([i for i in indexes if digest.block_list[i] not in uploaded])
+    response = pcs.upload_superfile(remote_path, digest.block_list,
+                                    ondup=ondup, **kwargs)
+    if not response.ok and reused:
+        upload_blocks(reused)
+        response = pcs.upload_superfile(remote_path, digest.block_list,
+                                        ondup=ondup, **kwargs)
+    response.raise_for_status()
+    check_integrity(size, response_json(response).get('size'),
+                    'Size of %s' % remote_path)
+    _save_json(manifest_path, {'block_size': digest.block_size,
+                               'block_list': digest.block_list,
+                               'md5': digest.content_md5})
+    return response
+
+
+def download_file(pcs, remote_path, local_path, chunk_size=64 * 1024,
+                  callback=None, controller=None, check_md5=True,
+                  expected_md5=None, scheduler=None, priority=NORMAL,
+                  queue='default', **kwargs):
+    """下载文件到本地.
+
+    下载过程中内容写入 ``local_path + '.part'`` ，完成后再重命名；
+    再次下载时通过 ``Range`` 请求头从已下载的位置继续。
+
+    指定 ``expected_md5`` 时写入的同时计算内容的 MD5 并与它比较，不一致时
+    删除已下载的内容并抛出 :class:`IntegrityError` ，断点续传时需要先读一遍
+    已下载的部分。响应头 ``Content-MD5`` 和 ``meta`` 返回的 md5 不一定是内容
+    的 MD5 （分片上传合并得到的文件），所以没有指定 ``expected_md5`` 时只比较
+    文件大小（来自 ``Content-Range`` / ``Content-Length`` 响应头或
+    ``meta``），不一致时抛出 :class:`IntegrityError` 但保留已下载的内容。
+
+    指定 ``controller`` 时使用多个 ``Range`` 请求并发下载，
+    由它动态决定每个请求的范围大小和并发数。文件大小来自 ``meta`` ，
+    指定了 ``expected_md5`` 时下载完成后再读一遍文件比较。
+
+    :param pcs: PCS 对象
+    :param remote_path: 网盘中文件的路径。
+    :param local_path: 本地文件路径。
+    :param chunk_size: 每次写入的字节数。
+    :param callback: （可选）每下载一部分内容后调用 ``callback(字节数)`` 。
+    :param controller: （可选）:class:`~baidupcs.adaptive.AdaptiveController`
+                       对象。
+    :param check_md5: 是否校验下载的内容。
+    :param expected_md5: （可选）文件内容的 MD5 。
+    :param scheduler: （可选）:class:`~baidupcs.scheduler.Scheduler` 对象。
+    :param priority: 在 ``scheduler`` 中的优先级。
+    :param queue: 在 ``scheduler`` 中所属的队列。
+    :return: Response 对象，并发下载时为最后一个 ``Range`` 请求的响应
+    """
+    if controller is not None:
+        return _download_ranges(pcs, remote_path, local_path, chunk_size,
+                                callback, controller, scheduler, priority,
+                                queue, expected_md5 if check_md5 else None,
+                                **kwargs)
+    with scheduled(scheduler, priority, queue):
+        return _download(pcs, remote_path, local_path, chunk_size, callback,
+                         check_md5, expected_md5, scheduler, **kwargs)
+
+
+def _download(pcs, remote_path, local_path, chunk_size, callback, check_md5,
+              expected_md5, scheduler, **kwargs):
+    part_path = local_path + '.part'
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = dict(kwargs.pop('headers', None) or {})
+    if offset:
+        headers['Range'] = 'bytes=%d-' % offset
+    response = pcs.download(remote_path, headers=headers, stream=True,
+                            **kwargs)
+    if offset and response.status_code == 416:
+        # 已经下载完成
+        response.close()
+    else:
+        response.raise_for_status()
+        if offset and response.status_code != 206:
+            offset = 0
+        if offset and callback:
+            callback(offset)
+        content_md5 = md5() if check_md5 and expected_md5 else None
+        if offset and content_md5:
+            with open(part_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    content_md5.update(chunk)
+        with open(part_path, 'ab' if offset else 'wb') as f:
+            for chunk in response.iter_content(chunk_size):
+                throttle(scheduler, 'download', len(chunk))
+                f.write(chunk)
+                if content_md5:
+                    content_md5.update(chunk)
+                if callback:
+                    callback(len(chunk))
+        if content_md5:
+            try:
+                check_integrity(expected_md5, content_md5.hexdigest(),
+                                'MD5 of %s' % remote_path)
+            except IntegrityError:
+                os.remove(part_path)
+                raise
+        elif check_md5:
+            # 大小不一致可能只是连接中断，保留 .part 下次继续下载
+            size = _response_size(response, offset)
+            if size is None:
+                meta = pcs.meta(remote_path, **kwargs)
+                meta.raise_for_status()
+                size = FileEntry.from_response(meta)[0].size
+            check_integrity(size, os.path.getsize(part_path),
+                            'Size of %s' % remote_path)
+    finish_download(part_path, local_path)
+    return response
+
+
+def _response_size(response, offset):
+    """从响应头得到整个文件的大小，得不到时返回 None ."""
+    content_range = response.headers.get('Content-Range', '')
+    if response.status_code == 206 and '/' in content_range:
+        total = content_range.rsplit('/', 1)[1].strip()
+        if total.isdigit():
+            return int(total)
+    length = response.headers.get('Content-Length')
+    if length is not None and str(length).isdigit():
+        return int(length) + (offset if response.status_code == 206 else 0)
+    return None
+
+
+def finish_download(part_path, local_path):
+    """把下载完成的 ``part_path`` 重命名为 ``local_path`` （覆盖已有文件）."""
+    replace_file(part_path, local_path)
+
+
+def _download_ranges(pcs, remote_path, local_path, chunk_size, callback,
+                     controller, scheduler, priority, queue, expected_md5,
+                     **kwargs):
+    response = pcs.meta(remote_path, **kwargs)
+    response.raise_for_status()
+    entry = FileEntry.from_response(response)[0]
+    part_path = local_path + '.part'
+    state = TransferState(part_path + '.json',
+                          {'remote_path': remote_path, 'size': entry.size,
+                           'md5': entry.md5})
+    if not state.blocks or not os.path.exists(part_path):
+        state.clear()
+        with open(part_path, 'wb') as f:
+            f.truncate(entry.size)
+    elif callback:
+        callback(sum(x[1] for x in state.ranges()))
+    headers = dict(kwargs.pop('headers', None) or {})
+
+    def download_range(offset, length):
+        with scheduled(scheduler, priority, queue):
+            return _download_range(offset, length)
+
+    def _download_range(offset, length):
+        range_headers = dict(headers,
+                             Range='bytes=%d-%d' % (offset,
+                                                    offset + length - 1))
+        response = pcs.download(remote_path, headers=range_headers,
+                                stream=True, **kwargs)
+        response.raise_for_status()
+        if response.status_code != 206:
+            response.close()
+            raise IOError('Range requests are not supported')
+        received = 0
+        with open(part_path, 'r+b') as f:
+            f.seek(offset)
+            for chunk in response.iter_content(chunk_size):
+                throttle(scheduler, 'download', len(chunk))
+                f.write(chunk[:length - received])
+                received += len(chunk)
+                if callback:
+                    callback(len(chunk))
+        if received < length:
+            raise IOError('Incomplete range: %d of %d bytes' % (received,
+                                                                length))
+        state.add(offset, length)
+        return response
+
+    # 所有部分之前都已经下载完成时返回 meta 的响应
+    for _, _, response in run_chunks(controller, entry.size, download_range,
+                                     done=state.ranges()):
+        pass
+    state.clear()
+    if expected_md5:
+        content_md5 = md5()
+        with open(part_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                content_md5.update(chunk)
+        try:
+            check_integrity(expected_md5, content_md5.hexdigest(),
+                            'MD5 of %s' % remote_path)
+        except IntegrityError:
+            os.remove(part_path)
+            raise
+    finish_download(part_path, local_path)
+    return response
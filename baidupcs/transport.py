@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""``PCS`` 发送请求使用的传输层.
+
+传输层是有 ``get(url, params=None, **kwargs)`` 和
+``post(url, params=None, data=None, **kwargs)`` 方法的对象，
+``requests`` 模块和 ``requests.Session`` 对象都可以直接作为传输层。
+没有指定 ``transport`` 时使用 ``session`` 或者 ``requests`` 模块。
+"""
+
+import json
+import threading
+
+
+class HTTPTransport(object):
+    """使用 ``requests.Session`` 发送请求.
+
+    :param session: （可选）``requests.Session`` 对象，默认新建一个。
+    :param pool_size: （可选）每个域名的连接池大小，并发请求较多时增大。
+    """
+
+    def __init__(self, session=None, pool_size=None):
+        if session is None:
+            import requests
+            session = requests.Session()
+            if pool_size:
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_maxsize=pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+        self.session = session
+
+    def get(self, url, params=None, **kwargs):
+        return self.session.get(url, params=params, **kwargs)
+
+    def post(self, url, params=None, data=None, **kwargs):
+        return self.session.post(url, params=params, data=data, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncTransport(object):
+    """在线程池中发送请求，api 方法立即返回 ``concurrent.futures.Future``
+    对象（Python 2 需要安装 futures）::
+
+      >>> pcs = PCS('access_token', transport=AsyncTransport(workers=8))
+      >>> futures = [pcs.meta(path) for path in paths]
+      >>> responses = [x.result() for x in futures]
+
+    在 asyncio 中可以使用 ``await asyncio.wrap_future(pcs.info())`` 。
+
+    只适用于直接调用 api 方法，不能与 ``hedger`` 、``breakers`` 同时使用。
+
+    :param transport: （可选）实际发送请求的传输层，
+                      默认为连接池大小与 ``workers`` 相同的
+                      :class:`HTTPTransport` 。
+    :param workers: 同时进行的请求数。
+    """
+    is_async = True
+
+    def __init__(self, transport=None, workers=8):
+        from concurrent.futures import ThreadPoolExecutor
+        if transport is None:
+            transport = HTTPTransport(pool_size=workers)
+        self.transport = transport
+        self.executor = ThreadPoolExecutor(workers)
+
+    def get(self, url, params=None, **kwargs):
+        return self.executor.submit(self.transport.get, url, params=params,
+                                    **kwargs)
+
+    def post(self, url, params=None, data=None, **kwargs):
+        return self.executor.submit(self.transport.post, url, params=params,
+                                    data=data, **kwargs)
+
+    def close(self):
+        self.executor.shutdown()
+
+
+def then(future, func):
+    """返回一个新的 Future ，结果为 ``func(future.result())`` ."""
+    result = type(future)()
+
+    def done(future):
+        try:
+            result.set_result(func(future.result()))
+        except Exception as e:
+            result.set_exception(e)
+    future.add_done_callback(done)
+    return result
+
+
+class MemoryResponse(object):
+    """:class:`MemoryTransport` 返回的 Response 对象，
+    支持 ``requests.Response`` 常用的属性和方法."""
+    encoding = 'utf-8'
+
+    def __init__(self, content=b'', status_code=200, headers=None, url=None):
+        self.content = content
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.url = url
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding)
+
+    def json(self):
+        return json.loads(self.text)
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def raise_for_status(self):
+        if not self.ok:
+            import requests
+            raise requests.HTTPError('%d Error for url: %s' % (
+                self.status_code, self.url), response=self)
+
+    def close(self):
+        pass
+
+
+class MemoryTransport(object):
+    """不发送请求，按 api 的 ``method`` 参数返回预先设置的响应.
+
+    可以用于测试，或者单独测量 SDK 本身的开销（构造参数、编码请求体、
+    解析 JSON 等）::
+
+      >>> transport = MemoryTransport()
+      >>> transport.add('info', {'quota': 6442450944, 'used': 5138887})
+      >>> pcs = PCS('access_token', transport=transport)
+      >>> pcs.info().json()
+      {'quota': 6442450944, 'used': 5138887}
+
+    没有设置响应的 api 返回 404 。
+
+    :param record: 是否记录每个请求的 ``(GET/POST, url, params, data)`` 。
+    """
+
+    def __init__(self, record=False):
+        self.record = record
+        self.responses = {}
+        #: 记录的请求
+        self.requests = []
+        #: 请求数
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self, method, data=None, content=None, status_code=200,
+            headers=None):
+        """设置 api ``method`` 的响应，``content`` 为空时使用
+        ``data`` 编码成的 JSON ."""
+        if content is None:
+            content = json.dumps(data).encode('utf-8')
+        self.responses[method] = (content, status_code, headers)
+
+    def _respond(self, http_method, url, params, data):
+        if hasattr(data, 'read'):
+            # 与真正发送请求时一样读取流式的请求体
+            while data.read(64 * 1024):
+                pass
+        method = (params or {}).get('method')
+        with self._lock:
+            self.count += 1
+            if self.record:
+                self.requests.append((http_method, url, params, data))
+        response = self.responses.get(method)
+        if response is None:
+            return MemoryResponse(
+                json.dumps({'error_code': 31023,
+                            'error_msg': 'no response for %s' % method}
+                           ).encode('utf-8'), 404, url=url)
+        content, status_code, headers = response
+        return MemoryResponse(content, status_code, headers, url)
+
+    def get(self, url, params=None, **kwargs):
+        return self._respond('GET', url, params, None)
+
+    def post(self, url, params=None, data=None, **kwargs):
+        return self._respond('POST', url, params, data)
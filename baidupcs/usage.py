@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""统计网盘目录占用的空间."""
+
+import posixpath
+
+from .models import FileList
+from .utils import imap_unordered
+
+
+class Usage(object):
+    """目录下所有文件的总大小和文件数."""
+    __slots__ = ('size', 'files')
+
+    def __init__(self, size=0, files=0):
+        self.size = size
+        self.files = files
+
+    def __eq__(self, other):
+        return (isinstance(other, Usage) and
+                (self.size, self.files) == (other.size, other.files))
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '<Usage size=%d files=%d>' % (self.size, self.files)
+
+
+def walk(pcs, remote_path, workers=4, **kwargs):
+    """并发调用 ``list_files`` 逐层遍历目录，边遍历边返回所有条目.
+
+    :param pcs: PCS 对象
+    :param remote_path: 网盘中目录的路径。
+    :param workers: 同时进行的 ``list_files`` 请求数。
+    :return: :class:`~baidupcs.models.FileEntry` 的迭代器
+    """
+    def list_files(path):
+        response = pcs.list_files(path, **kwargs)
+        response.raise_for_status()
+        return FileList.from_response(response)
+
+    level = [remote_path]
+    while level:
+        next_level = []
+        for _, files in imap_unordered(list_files, level, workers):
+            for entry in files:
+                if entry.isdir:
+                    next_level.append(entry.path)
+                yield entry
+        level = next_level
+
+
+def disk_usage(pcs, remote_path, depth=0, workers=4, index=None):
+    """统计目录及其子目录（最多 ``depth`` 层）中文件的总大小和文件数.
+
+    :param pcs: PCS 对象
+    :param remote_path: 网盘中目录的路径。
+    :param depth: 单独统计的子目录层数，0 表示只统计 ``remote_path`` 。
+    :param workers: 同时进行的 ``list_files`` 请求数。
+    :param index: （可选）:class:`~baidupcs.index.MetadataIndex` 对象。
+                  指定后先通过 ``diff`` 把索引更新到最新，然后在索引中统计，
+                  只有变化的部分需要从服务端获取。
+    :return: 以目录路径为键，:class:`Usage` 为值的 dict
+    """
+    base = remote_path.rstrip('/')
+    if index is not None:
+        index.sync(pcs)
+        entries = index.iter_children(base, recurrent=True)
+    else:
+        entries = walk(pcs, base, workers)
+
+    usage = {base: Usage()}
+    for entry in entries:
+        parts = entry.path[len(base) + 1:].split('/')[:-1]
+        if entry.isdir:
+            if len(parts) < depth:
+                path = posixpath.join(base, *(parts + [entry.name]))
+                usage.setdefault(path, Usage())
+            continue
+        for i in range(min(len(parts), depth) + 1):
+            path = posixpath.join(base, *parts[:i])
+            item = usage.get(path)
+            if item is None:
+                item = usage[path] = Usage()
+            item.size += entry.size
+            item.files += 1
+    return usage
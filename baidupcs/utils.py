@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+_DONE = object()
+
+
+def imap_unordered(func, iterable, workers=4):
+    """使用 ``workers`` 个线程对 ``iterable`` 中的每一项调用 ``func`` ，
+    按完成的先后顺序返回 ``(item, result)`` 。
+
+    ``func`` 抛出的异常会在调用方重新抛出，同时停止剩余的任务。
+    """
+    tasks = queue.Queue(workers * 2)
+    results = queue.Queue()
+    stop = threading.Event()
+
+    def feed():
+        try:
+            for item in iterable:
+                while not stop.is_set():
+                    try:
+                        tasks.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                if stop.is_set():
+                    break
+        except Exception:
+            results.put((None, None, sys.exc_info()))
+        finally:
+            for _ in range(workers):
+                tasks.put(_DONE)
+
+    def work():
+        while True:
+            item = tasks.get()
+            if item is _DONE:
+                results.put(_DONE)
+                return
+            if stop.is_set():
+                continue
+            try:
+                results.put((item, func(item), None))
+            except Exception:
+                results.put((item, None, sys.exc_info()))
+
+    threads = [threading.Thread(target=feed)]
+    threads.extend(threading.Thread(target=work) for _ in range(workers))
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    running = workers
+    try:
+        while running:
+            result = results.get()
+            if result is _DONE:
+                running -= 1
+                continue
+            item, value, exc_info = result
+            if exc_info is not None:
+                raise exc_info[1]
+            yield item, value
+    finally:
+        stop.set()
+
+
+def sqlite_connect(local, path, timeout=30):
+    """返回当前线程的 SQLite 连接，连接保存在 ``local``
+    （``threading.local`` 对象）中，``fork`` 之后重新连接.
+
+    数据库使用 WAL 模式，读操作不会被其他进程的写操作阻塞。
+    """
+    pid = os.getpid()
+    if getattr(local, 'pid', None) != pid:
+        import sqlite3
+        db = sqlite3.connect(path, timeout=timeout)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        local.db = db
+        local.pid = pid
+    return local.db
+
+
+def replace_file(src, dst):
+    """把 ``src`` 重命名为 ``dst`` ，``dst`` 已经存在时覆盖.
+
+    Python 3 使用原子操作 ``os.replace`` ；Python 2 没有，只能先删除
+    ``dst`` 再重命名。
+    """
+    if hasattr(os, 'replace'):
+        os.replace(src, dst)
+        return
+    if os.path.exists(dst):
+        os.remove(dst)
+    os.rename(src, dst)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""多个进程同时访问 SQLiteCache 时的查询延迟.
+
+  $ python benchmarks/bench_cache.py [每个进程的操作数] [写操作比例]
+"""
+from __future__ import print_function
+
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from baidupcs.cache import SQLiteCache  # noqa
+
+KEYS = 1000
+
+
+def _worker(args):
+    path, operations, write_ratio = args
+    cache = SQLiteCache(path)
+    value = {'path': '/apps/test_sdk/file', 'size': 1024, 'md5': 'x' * 32}
+    latencies = []
+    for _ in range(operations):
+        key = 'meta:%d' % random.randrange(KEYS)
+        start = time.time()
+        if random.random() < write_ratio:
+            cache.set(key, value)
+        else:
+            cache.get(key)
+        latencies.append(time.time() - start)
+    return latencies
+
+
+def main():
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    write_ratio = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'cache.db')
+    try:
+        cache = SQLiteCache(path)
+        for i in range(KEYS):
+            cache.set('meta:%d' % i, {'size': i})
+        print('%d operations per process, %d%% writes' % (
+            operations, write_ratio * 100))
+        for processes in (1, 2, 4, 8):
+            pool = multiprocessing.Pool(processes)
+            try:
+                results = pool.map(_worker, [(path, operations, write_ratio)]
+                                   * processes)
+            finally:
+                pool.close()
+                pool.join()
+            latencies = sorted(x for result in results for x in result)
+            mean = sum(latencies) / len(latencies)
+            p99 = latencies[int(len(latencies) * 0.99)]
+            print('%d processes: mean %7.1f us  p99 %7.1f us' % (
+                processes, mean * 1e6, p99 * 1e6))
+    finally:
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""计算文件校验值和分片 MD5 列表的速度.
+
+  $ python benchmarks/bench_hashing.py [文件大小(MB)] [workers]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from baidupcs.hashing import cpu_count, file_digest, hash_file  # noqa
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 512
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else cpu_count()
+    fd, path = tempfile.mkstemp()
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            chunk = os.urandom(1024 * 1024)
+            for _ in range(size):
+                f.write(chunk)
+        file_digest(path)  # 预热页缓存
+        gb = size / 1024.0
+        print('%d MB, %d workers' % (size, workers))
+        cases = [
+            ('file_digest (single thread)', lambda: file_digest(path), 1),
+            ('hash_file (threads)',
+             lambda: hash_file(path, workers=workers), workers),
+            ('hash_file (processes)',
+             lambda: hash_file(path, workers=workers, processes=True),
+             workers),
+        ]
+        for name, func, cores in cases:
+            start = time.time()
+            func()
+            elapsed = time.time() - start
+            print('%-30s %6.2f GB/s  %6.2f GB/s per core' % (
+                name, gb / elapsed, gb / elapsed / cores))
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
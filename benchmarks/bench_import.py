@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""``import baidupcs`` 和冷启动（导入、创建 PCS 对象并完成第一个请求）
+的耗时，每次都在新的 Python 进程中测量.
+
+  $ python benchmarks/bench_import.py [次数]
+"""
+from __future__ import print_function
+
+import os
+import subprocess
+import sys
+import threading
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+TIMER = '''
+import time
+start = time.time()
+%s
+print(time.time() - start)
+'''
+
+CASES = [
+    ('python startup', 'pass'),
+    ('import baidupcs', 'import baidupcs'),
+    ('import + PCS()', 'import baidupcs; baidupcs.PCS("token")'),
+    ('cold start (meta)',
+     'import baidupcs; '
+     'baidupcs.PCS("token", api_template="http://127.0.0.1:%d/{0}")'
+     '.meta("/apps/test_sdk/a.jpg").json()'),
+]
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b'{"list": [{"path": "/apps/test_sdk/a.jpg", "size": 1}]}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def measure(code, times):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    results = []
+    for _ in range(times):
+        output = subprocess.check_output(
+            [sys.executable, '-c', TIMER % code], env=env)
+        results.append(float(output.decode('ascii').strip()))
+    return min(results), sorted(results)[len(results) // 2]
+
+
+def main():
+    times = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+        for name, code in CASES:
+            if '%d' in code:
+                code = code % server.server_address[1]
+            best, median = measure(code, times)
+            print('%-20s min %7.1f ms  median %7.1f ms' % (
+                name, best * 1000, median * 1000))
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""解析 10 万条目的 ``list_files`` 响应的耗时对比.
+
+  $ python benchmarks/bench_json.py [条目数]
+"""
+from __future__ import print_function
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from baidupcs import jsonlib  # noqa
+from baidupcs.models import FileList  # noqa
+
+
+class FakeResponse(object):
+    encoding = 'utf-8'
+
+    def __init__(self, content):
+        self.content = content
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+
+def make_listing(count):
+    return json.dumps({
+        'list': [{
+            'fs_id': 3528850315 + i,
+            'path': '/apps/test_sdk/dir%d/file%d.txt' % (i % 100, i),
+            'ctime': 1384854880 + i,
+            'mtime': 1384854880 + i,
+            'md5': '%032x' % i,
+            'size': i * 17,
+            'isdir': 0,
+        } for i in range(count)],
+        'request_id': 1216061570,
+    }).encode('utf-8')
+
+
+def timeit(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        func()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    content = make_listing(count)
+    response = FakeResponse(content)
+    print('%d entries, %.1f MB' % (count, len(content) / 1024.0 / 1024))
+
+    cases = [('json.loads', lambda: json.loads(content.decode('utf-8')))]
+    for name in jsonlib.BACKENDS:
+        try:
+            jsonlib.set_backend(name)
+        except ImportError:
+            continue
+        cases.append(('jsonlib.loads (%s)' % name,
+                      lambda loads=jsonlib.loads, name=name: loads(
+                          content if name == 'orjson'
+                          else content.decode('utf-8'))))
+    jsonlib.set_backend()
+    cases.extend([
+        ('jsonlib.iter_items', lambda: sum(
+            1 for _ in jsonlib.iter_items(response))),
+        ('FileList.from_response', lambda: FileList.from_response(response)),
+        ('FileList.from_response(stream=True)',
+         lambda: FileList.from_response(response, stream=True)),
+    ])
+    for name, func in cases:
+        print('%-40s %8.1f ms' % (name, timeit(func) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""使用 ``MemoryTransport`` 测量 SDK 本身每次调用的开销（不包括网络）.
+
+  $ python benchmarks/bench_overhead.py [调用次数]
+"""
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from baidupcs import PCS  # noqa
+from baidupcs.jsonlib import response_json  # noqa
+from baidupcs.transport import MemoryTransport  # noqa
+
+
+def make_transport():
+    transport = MemoryTransport()
+    transport.add('info', {'quota': 6442450944, 'used': 5138887,
+                           'request_id': 1216061570})
+    transport.add('meta', {'list': [{
+        'fs_id': 3528850315, 'path': '/apps/test_sdk/a.txt',
+        'ctime': 1384854880, 'mtime': 1384854880,
+        'md5': '6c37219ba0d3dfdfa95ff6912e2c42ac', 'size': 4, 'isdir': 0,
+    }], 'request_id': 1216061570})
+    transport.add('list', {'list': [{
+        'fs_id': 3528850315 + i, 'path': '/apps/test_sdk/%d.txt' % i,
+        'ctime': 1384854880, 'mtime': 1384854880,
+        'md5': '%032x' % i, 'size': i, 'isdir': 0,
+    } for i in range(100)], 'request_id': 1216061570})
+    transport.add('upload', {'path': '/apps/test_sdk/a.txt', 'size': 4,
+                             'md5': '6c37219ba0d3dfdfa95ff6912e2c42ac',
+                             'request_id': 1216061570})
+    return transport
+
+
+def timeit(func, number, repeat=7):
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        for _ in range(number):
+            func()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / number
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    pcs = PCS('access_token', transport=make_transport())
+    cases = [
+        ('info', lambda: pcs.info()),
+        ('info + response_json', lambda: response_json(pcs.info())),
+        ('meta', lambda: pcs.meta('/apps/test_sdk/a.txt')),
+        ('list_files(limit=...)', lambda: pcs.list_files(
+            '/apps/test_sdk', by='name', order='asc', limit='0-100')),
+        ('list_files + response_json (100)', lambda: response_json(
+            pcs.list_files('/apps/test_sdk'))),
+        ('upload (4 bytes)', lambda: pcs.upload('/apps/test_sdk/a.txt',
+                                                b'test')),
+    ]
+    for name, func in cases:
+        print('%-36s %8.2f us' % (name, timeit(func, number) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -46,6 +46,15 @@ setup(
     package_dir={'baidupcs': 'baidupcs'},
     include_package_data=True,
     install_requires=requirements,
+    extras_require={
+        'fsspec': ['fsspec'],
+        'zstd': ['zstandard'],
+    },
+    entry_points={
+        'console_scripts': ['baidupcs = baidupcs.cli:main'],
+        'fsspec.specs': ['baidupcs = baidupcs.fs:PCSFileSystem',
+                         'bdpcs = baidupcs.fs:PCSFileSystem'],
+    },
     zip_safe=False,
     classifiers=[
         'Development Status :: 5 - Production/Stable',
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import time
+
+import pytest
+
+from baidupcs import PCS
+from baidupcs.breaker import (CLOSED, HALF_OPEN, OPEN, CircuitBreaker,
+                              CircuitBreakers, CircuitOpen)
+from .utils import FakeResponse
+
+
+class FlakySession(object):
+    def __init__(self):
+        self.status_code = 200
+        self.urls = []
+
+    def get(self, url, params=None, **kwargs):
+        self.urls.append(url)
+        if self.status_code is None:
+            raise IOError('timed out')
+        return FakeResponse({}, status_code=self.status_code)
+
+
+def test_breaker_states():
+    changes = []
+    breaker = CircuitBreaker('d.pcs.baidu.com', min_requests=4,
+                             reset_timeout=0.05, slow_seconds=1,
+                             listener=lambda *args: changes.append(args))
+    for ok in (True, True, False):
+        breaker.before()
+        breaker.record(ok, 0.1)
+    assert breaker.state == CLOSED
+    breaker.record(False, 0.1)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpen) as e:
+        breaker.before()
+    assert e.value.host == 'd.pcs.baidu.com'
+    assert e.value.retry_after > 0
+
+    time.sleep(0.06)
+    breaker.before()
+    assert breaker.state == HALF_OPEN
+    breaker.record(False, 0.1)
+    assert breaker.state == OPEN
+    time.sleep(0.06)
+    breaker.before()
+    breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+    assert [x[2] for x in changes] == [OPEN, HALF_OPEN, OPEN, HALF_OPEN,
+                                       CLOSED]
+
+
+def test_slow_requests():
+    breaker = CircuitBreaker('pcs.baidu.com', min_requests=2,
+                             slow_seconds=1, slow_rate=0.5)
+    breaker.record(True, 0.1)
+    breaker.record(True, 2)
+    assert breaker.state == OPEN
+
+
+def test_breakers_per_host():
+    session = FlakySession()
+    breakers = CircuitBreakers(min_requests=2, reset_timeout=60)
+    pcs = PCS('token', session=session, breakers=breakers)
+    session.status_code = 503
+    pcs.meta('/apps/test_sdk/a')
+    session.status_code = None
+    with pytest.raises(IOError):
+        pcs.meta('/apps/test_sdk/a')
+    with pytest.raises(CircuitOpen) as e:
+        pcs.meta('/apps/test_sdk/a')
+    assert e.value.host == 'pcs.baidu.com'
+    assert len(session.urls) == 2
+
+    # 其他域名不受影响
+    session.status_code = 200
+    assert pcs.download('/apps/test_sdk/a').ok
+    stats = breakers.stats()
+    assert stats['pcs.baidu.com']['state'] == OPEN
+    assert stats['d.pcs.baidu.com']['state'] == CLOSED
+
+
+def test_interrupted_probe():
+    breakers = CircuitBreakers(min_requests=1, reset_timeout=0.05)
+    url = 'https://pcs.baidu.com/rest/2.0/pcs/file'
+    breakers.get('pcs.baidu.com').record(False, 0.1)
+    time.sleep(0.06)
+
+    def interrupt():
+        raise KeyboardInterrupt
+    with pytest.raises(KeyboardInterrupt):
+        breakers.call(url, interrupt)
+    # 被中断的试探请求归还名额，之后的请求仍然可以试探
+    assert breakers.get('pcs.baidu.com').state == HALF_OPEN
+    assert breakers.call(url, lambda: FakeResponse({})).ok
+    assert breakers.get('pcs.baidu.com').state == CLOSED
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import pytest
+
+from baidupcs.bundle import BundleReader, BundleWriter
+from baidupcs.transfer import IntegrityError
+from .utils import FakePCS
+
+
+def _files(count):
+    return [('%d.log' % i, ('line %d\n' % i).encode('utf-8') * (i + 1))
+            for i in range(count)]
+
+
+def test_write_and_read():
+    pcs = FakePCS()
+    files = _files(30)
+    with BundleWriter(pcs, '/apps/test_sdk/logs', bundle_size=1000,
+                      block_size=64, workers=2, prefix='p') as writer:
+        for name, content in files:
+            writer.add(name, content)
+    assert len(writer.bundles) > 1
+    assert writer.files == 30
+    assert all(len(pcs.files[x]) <= 1000 or x.endswith('-00000.pack')
+               for x in writer.bundles)
+    assert pcs.files['/apps/test_sdk/logs/p-00000.pack'].startswith(
+        files[0][1])
+
+    reader = BundleReader(pcs, '/apps/test_sdk/logs').load()
+    assert len(reader) == 30
+    del pcs.calls[:]
+    for name, content in files:
+        assert reader.read(name) == content
+    assert [x[0] for x in pcs.calls] == ['download'] * 30
+
+
+def test_single_block_bundle():
+    pcs = FakePCS()
+    writer = BundleWriter(pcs, '/apps/test_sdk/logs', prefix='p')
+    writer.add('a', b'aaa')
+    writer.add('empty', b'')
+    assert writer.close() == '/apps/test_sdk/logs/p-00000.pack'
+    assert writer.close() is None
+    assert 'upload_superfile' not in [x[0] for x in pcs.calls]
+    reader = BundleReader(pcs, '/apps/test_sdk/logs').load()
+    assert reader.read('a') == b'aaa'
+    assert reader.read('empty') == b''
+
+
+def test_newer_bundle_wins():
+    pcs = FakePCS()
+    # 以上传的先后为准，与前缀的顺序无关
+    for prefix, content in (('2', b'old'), ('1', b'new')):
+        with BundleWriter(pcs, '/apps/test_sdk/logs', prefix=prefix) as w:
+            w.add('a', content)
+    reader = BundleReader(pcs, '/apps/test_sdk/logs').load()
+    assert reader.names() == ['a']
+    assert reader.read('a') == b'new'
+
+
+def test_too_large():
+    pcs = FakePCS()
+    writer = BundleWriter(pcs, '/apps/test_sdk/logs', bundle_size=100,
+                          block_size=10, prefix='p')
+    with pytest.raises(ValueError):
+        writer.add('big', b'x' * 101)
+    writer.add('a', b'x' * 100)
+    assert writer.close() == '/apps/test_sdk/logs/p-00000.pack'
+
+
+def test_integrity():
+    pcs = FakePCS()
+    with BundleWriter(pcs, '/apps/test_sdk/logs', prefix='p') as writer:
+        writer.add('a', b'aaa')
+    pcs.files['/apps/test_sdk/logs/p-00000.pack'] = b'bbb'
+    reader = BundleReader(pcs, '/apps/test_sdk/logs').load()
+    with pytest.raises(IntegrityError):
+        reader.read('a')
+    assert reader.read('a', check_md5=False) == b'bbb'
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import multiprocessing
+import os
+import time
+
+from baidupcs.cache import (MemoryCache, SQLiteCache, cached_digest,
+                            cached_meta)
+from .utils import FakePCS
+
+
+def _check_cache(cache):
+    assert cache.get('a') is None
+    cache.set('a', {'size': 1})
+    cache.set('b', b'\x00\xff')
+    assert cache.get('a') == {'size': 1}
+    assert cache.get('b') == b'\x00\xff'
+    cache.set('c', 1, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get('c', 'missing') == 'missing'
+    cache.delete('a')
+    assert cache.get('a') is None
+    assert cache.get_or_set('a', lambda: 2) == 2
+    assert cache.get_or_set('a', lambda: 3) == 2
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_memory_cache():
+    _check_cache(MemoryCache())
+    cache = MemoryCache(max_entries=2)
+    for key in 'abc':
+        cache.set(key, key)
+    assert cache.get('a') is None
+    assert cache.get('c') == 'c'
+
+
+def test_sqlite_cache(tmpdir):
+    _check_cache(SQLiteCache(str(tmpdir.join('cache.db'))))
+    cache = SQLiteCache(str(tmpdir.join('lru.db')), max_entries=10,
+                        cull_frequency=2, touch_interval=0)
+    for i in range(10):
+        cache.set(str(i), i)
+    cache.get('0')
+    cache.set('10', 10)
+    # 淘汰了最久没有访问的 5 个
+    assert len(cache) == 6
+    assert cache.get('0') == 0
+    assert cache.get('1') is None
+
+
+def test_sqlite_cache_cull_interval(tmpdir):
+    cache = SQLiteCache(str(tmpdir.join('cull.db')), max_entries=10,
+                        cull_interval=5)
+    # 第 1 、6 、11 次写入时检查条目数
+    for i in range(12):
+        cache.set(str(i), i)
+    assert len(cache) == 11
+    assert cache.get('0') is None
+
+
+def _worker(path):
+    cache = SQLiteCache(path)
+    for i in range(20):
+        cache.set('%d:%d' % (os.getpid(), i), i)
+        cache.get('shared')
+
+
+def test_sqlite_cache_processes(tmpdir):
+    path = str(tmpdir.join('cache.db'))
+    cache = SQLiteCache(path)
+    cache.set('shared', 1)
+    processes = [multiprocessing.Process(target=_worker, args=(path,))
+                 for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+    assert len(cache) == 81
+
+
+def test_cached_helpers(tmpdir):
+    pcs = FakePCS()
+    pcs.files['/apps/test_sdk/a'] = b'abc'
+    cache = SQLiteCache(str(tmpdir.join('cache.db')))
+    for _ in range(2):
+        entry = cached_meta(pcs, '/apps/test_sdk/a', cache)
+        assert entry.size == 3
+    assert len(pcs.calls) == 1
+
+    path = str(tmpdir.join('a'))
+    with open(path, 'wb') as f:
+        f.write(b'abc')
+    digest = cached_digest(path, cache)
+    assert cached_digest(path, cache).content_md5 == digest.content_md5
+    assert len(cache) == 2
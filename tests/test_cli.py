@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import os
+
+from baidupcs import cli
+from .utils import FakePCS
+
+
+def _run(pcs, *argv):
+    args = cli.build_parser().parse_args(['-t', 'token'] + list(argv))
+    args.func(pcs, args)
+
+
+def test_format_size():
+    assert cli.format_size(10) == '10B'
+    assert cli.format_size(1536) == '1.5K'
+
+
+def test_put_get(capsys, tmpdir):
+    source = str(tmpdir.join('src'))
+    os.makedirs(os.path.join(source, 'sub'))
+    for name, content in (('a.txt', b'a'), ('sub/b.txt', b'bb')):
+        with open(os.path.join(source, *name.split('/')), 'wb') as f:
+            f.write(content)
+    pcs = FakePCS()
+    _run(pcs, 'put', '--no-resume', source, '/apps/test_sdk')
+    assert pcs.files == {'/apps/test_sdk/src/a.txt': b'a',
+                         '/apps/test_sdk/src/sub/b.txt': b'bb'}
+
+    target = str(tmpdir.join('dst'))
+    _run(pcs, 'get', '/apps/test_sdk/src', target)
+    with open(os.path.join(target, 'sub', 'b.txt'), 'rb') as f:
+        assert f.read() == b'bb'
+
+    _run(pcs, 'du', '-b', '-d', '1', '/apps/test_sdk/src')
+    out = capsys.readouterr()[0]
+    assert '3\t2\t/apps/test_sdk/src\n' in out
+    assert '2\t1\t/apps/test_sdk/src/sub\n' in out
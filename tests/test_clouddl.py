@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import time
+
+try:
+    from urllib2 import HTTPError, urlopen
+except ImportError:
+    from urllib.error import HTTPError
+    from urllib.request import urlopen
+
+import pytest
+
+from baidupcs.clouddl import CallbackReceiver
+from .utils import FakeResponse
+
+
+class FakeCloudDL(object):
+    def __init__(self):
+        self.tasks = {}
+        self.callbacks = {}
+        self.queries = []
+
+    def add_download_task(self, source_url, remote_path, callback='',
+                          **kwargs):
+        task_id = str(len(self.tasks) + 1)
+        self.tasks[task_id] = {'status': '1', 'source_url': source_url,
+                               'save_path': remote_path}
+        self.callbacks[task_id] = callback
+        return FakeResponse({'task_id': int(task_id)})
+
+    def query_download_tasks(self, task_ids, **kwargs):
+        self.queries.append(list(task_ids))
+        return FakeResponse({'task_info': dict(
+            (x, self.tasks[x]) for x in task_ids)})
+
+    def finish(self, task_id, status='0'):
+        self.tasks[task_id]['status'] = status
+
+
+def test_callback():
+    pcs = FakeCloudDL()
+    finished = []
+    with CallbackReceiver(pcs, host='127.0.0.1', poll_interval=60) as r:
+        r.on_finished(finished.append)
+        futures = [r.submit('http://example.com/%d' % i,
+                            '/apps/test_sdk/%d' % i) for i in range(3)]
+        assert r.pending() == ['1', '2', '3']
+        pcs.finish('2')
+        urlopen(pcs.callbacks['2']).read()
+        task = futures[1].result(timeout=5)
+        assert task.task_id == '2'
+        assert task.save_path == '/apps/test_sdk/1'
+        assert not futures[0].done()
+        assert r.pending() == ['1', '3']
+        assert pcs.queries == [['2']]
+        assert [x.task_id for x in finished] == ['2']
+        # 已经完成的任务不再接受回调
+        with pytest.raises(HTTPError) as e:
+            urlopen(pcs.callbacks['2'])
+        assert e.value.code == 404
+
+
+def test_poll():
+    pcs = FakeCloudDL()
+    receiver = CallbackReceiver(pcs, host='127.0.0.1', batch_size=2)
+    try:
+        futures = [receiver.submit('http://example.com/%d' % i,
+                                   '/apps/test_sdk/%d' % i)
+                   for i in range(3)]
+        pcs.finish('1')
+        pcs.finish('3', status='3')
+        receiver.poll()
+        assert pcs.queries == [['1', '2'], ['3']]
+        assert futures[0].result(0).status == '0'
+        assert futures[2].result(0).status == '3'
+        assert receiver.pending() == ['2']
+        called = []
+        futures[0].add_done_callback(called.append)
+        assert called == [futures[0]]
+    finally:
+        receiver.close()
+
+
+def test_handler_error(caplog):
+    pcs = FakeCloudDL()
+    receiver = CallbackReceiver(pcs, host='127.0.0.1')
+    try:
+        finished = []
+
+        @receiver.on_finished
+        def fail(task):
+            raise ValueError(task.task_id)
+        receiver.on_finished(finished.append)
+        futures = [receiver.submit('http://example.com/%d' % i,
+                                   '/apps/test_sdk/%d' % i)
+                   for i in range(2)]
+        pcs.finish('1')
+        pcs.finish('2')
+        receiver.poll()
+        # 出错的 handler 不影响其他 handler 和其他任务
+        assert [x.task_id for x in finished] == ['1', '2']
+        assert all(x.done() for x in futures)
+        assert 'Handler' in caplog.text
+    finally:
+        receiver.close()
+
+
+def test_poll_with_callbacks():
+    pcs = FakeCloudDL()
+    with CallbackReceiver(pcs, host='127.0.0.1', poll_interval=0.3) as r:
+        futures = [r.submit('http://example.com/%d' % i,
+                            '/apps/test_sdk/%d' % i) for i in range(2)]
+        # 任务 2 完成时没有回调，任务 1 不断收到回调
+        pcs.finish('2')
+        deadline = time.time() + 5
+        while not futures[1].done() and time.time() < deadline:
+            urlopen(pcs.callbacks['1']).read()
+            time.sleep(0.02)
+        assert futures[1].result(0).status == '0'
+        assert not futures[0].done()
+        assert ['1', '2'] in pcs.queries
+
+
+def test_wildcard_host():
+    for host in ('0.0.0.0', '', '::'):
+        with pytest.raises(ValueError):
+            CallbackReceiver(FakeCloudDL(), host=host)
+    receiver = CallbackReceiver(FakeCloudDL(), host='0.0.0.0',
+                                public_url='http://example.com:8000/')
+    receiver.close()
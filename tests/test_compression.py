@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import binascii
+import gzip
+import io
+import os
+import time
+import zlib
+
+import pytest
+
+from baidupcs.compression import (_prefetch, codec_for_path,
+                                  download_decompressed, upload_compressed)
+from .utils import FakePCS, local_file
+
+
+def _gunzip(content):
+    return gzip.GzipFile(fileobj=io.BytesIO(content)).read()
+
+
+def test_codec_for_path():
+    assert codec_for_path('/apps/test_sdk/a.log.gz') == 'gzip'
+    assert codec_for_path('/apps/test_sdk/a.log.zst') == 'zstd'
+    assert codec_for_path('/apps/test_sdk/a.log') is None
+
+
+def test_upload_small(tmpdir):
+    pcs = FakePCS()
+    content = b'log line\n' * 1000
+    path = local_file(tmpdir, 'a.log', content)
+    upload_compressed(pcs, path, '/apps/test_sdk/a.log')
+    compressed = pcs.files['/apps/test_sdk/a.log.gz']
+    assert len(compressed) < len(content) / 10
+    assert _gunzip(compressed) == content
+    assert [x[0] for x in pcs.calls] == ['upload']
+
+
+def test_upload_blocks_and_download(tmpdir):
+    pcs = FakePCS()
+    content = binascii.hexlify(os.urandom(20000))
+    path = local_file(tmpdir, 'a.log', content)
+    sizes = []
+    upload_compressed(pcs, path, '/apps/test_sdk/a.log.gz', block_size=1000,
+                      callback=sizes.append)
+    compressed = pcs.files['/apps/test_sdk/a.log.gz']
+    assert _gunzip(compressed) == content
+    assert sum(sizes) == len(compressed)
+    assert [x[0] for x in pcs.calls].count('upload_tmpfile') > 1
+
+    local_path = str(tmpdir.join('b.log'))
+    download_decompressed(pcs, '/apps/test_sdk/a.log.gz', local_path,
+                          chunk_size=100)
+    with open(local_path, 'rb') as f:
+        assert f.read() == content
+    assert not os.path.exists(local_path + '.part')
+
+
+def test_upload_grow_blocks(monkeypatch, tmpdir):
+    monkeypatch.setattr('baidupcs.compression.GROW_BLOCKS', 4)
+    pcs = FakePCS()
+    # 无法压缩的内容压缩后比原文件还大
+    content = os.urandom(20000)
+    path = local_file(tmpdir, 'a.log', content)
+    upload_compressed(pcs, path, '/apps/test_sdk/a.log', block_size=1000,
+                      workers=1)
+    compressed = pcs.files['/apps/test_sdk/a.log.gz']
+    assert _gunzip(compressed) == content
+    # 4 * 1000 + 4 * 2000 + 3 * 4000 ，最后一个分片不满
+    assert [x[0] for x in pcs.calls].count('upload_tmpfile') == 11
+
+    monkeypatch.setattr('baidupcs.compression.MAX_BLOCKS', 8)
+    with pytest.raises(IOError):
+        upload_compressed(pcs, path, '/apps/test_sdk/b.log', block_size=1000)
+    assert '/apps/test_sdk/b.log.gz' not in pcs.files
+
+
+def test_download_multi_member(tmpdir):
+    pcs = FakePCS()
+    members = []
+    for content in (b'first\n' * 100, b'second\n' * 100):
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        members.append(compressor.compress(content) + compressor.flush())
+    # 多个 gzip 文件首尾相连（如 cat a.gz b.gz）
+    pcs.files['/apps/test_sdk/a.log.gz'] = b''.join(members)
+    local_path = str(tmpdir.join('b.log'))
+    download_decompressed(pcs, '/apps/test_sdk/a.log.gz', local_path,
+                          chunk_size=7)
+    with open(local_path, 'rb') as f:
+        assert f.read() == b'first\n' * 100 + b'second\n' * 100
+
+
+def test_download_truncated(tmpdir):
+    pcs = FakePCS()
+    path = local_file(tmpdir, 'a.log', os.urandom(1000))
+    upload_compressed(pcs, path, '/apps/test_sdk/a.log')
+    pcs.files['/apps/test_sdk/a.log.gz'] = \
+        pcs.files['/apps/test_sdk/a.log.gz'][:-10]
+    local_path = str(tmpdir.join('b.log'))
+    with pytest.raises(IOError):
+        download_decompressed(pcs, '/apps/test_sdk/a.log.gz', local_path)
+    assert not os.path.exists(local_path + '.part')
+    assert not os.path.exists(local_path)
+
+
+def test_download_corrupt(tmpdir):
+    pcs = FakePCS()
+    pcs.files['/apps/test_sdk/a.log.gz'] = b'not gzip' * 100
+    local_path = str(tmpdir.join('b.log'))
+    with pytest.raises(zlib.error):
+        download_decompressed(pcs, '/apps/test_sdk/a.log.gz', local_path,
+                              chunk_size=10)
+    assert not os.path.exists(local_path + '.part')
+
+
+def test_prefetch_stop():
+    produced = []
+
+    def items():
+        for i in range(1000):
+            produced.append(i)
+            yield i
+    chunks = _prefetch(items(), size=2)
+    assert next(chunks) == 0
+    chunks.close()
+    time.sleep(0.3)
+    # 关闭后遍历的线程不再阻塞在 put 上，也不再继续遍历
+    count = len(produced)
+    time.sleep(0.3)
+    assert len(produced) == count < 10
+
+
+def test_zstd(tmpdir):
+    pytest.importorskip('zstandard')
+    pcs = FakePCS()
+    content = b'log line\n' * 1000
+    path = local_file(tmpdir, 'a.log', content)
+    upload_compressed(pcs, path, '/apps/test_sdk/a.log', codec='zstd')
+    local_path = str(tmpdir.join('b.log'))
+    download_decompressed(pcs, '/apps/test_sdk/a.log.zst', local_path)
+    with open(local_path, 'rb') as f:
+        assert f.read() == content
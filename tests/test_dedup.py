@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import json
+
+from baidupcs.dedup import Deduplicator
+from .utils import FakePCS, content_md5, local_file
+
+
+def test_dedup_upload(tmpdir):
+    pcs = FakePCS()
+    small = local_file(tmpdir, 'small', b'abc')
+    big = local_file(tmpdir, 'big', b'x' * 300 * 1024)
+    pcs.upload('/apps/a/small', b'abc')
+    pcs.upload('/apps/a/big', b'x' * 300 * 1024)
+    dedup = Deduplicator(pcs, [pcs._entry('/apps/a/small')])
+
+    assert dedup.upload(small, '/apps/b/small')[0] == 'copy'
+    assert dedup.upload(big, '/apps/b/big')[0] == 'rapid_upload'
+    assert dedup.lookup(content_md5(b'abc')) == '/apps/a/small'
+
+    with open(small, 'wb') as f:
+        f.write(b'new')
+    assert dedup.upload(small, '/apps/b/new')[0] == 'upload'
+    assert pcs.files['/apps/b/new'] == b'new'
+
+
+def test_dedup_stale_entry(tmpdir):
+    pcs = FakePCS()
+    path = local_file(tmpdir, 'a', b'abc')
+    pcs.upload('/apps/a/deleted', b'abc')
+    pcs.upload('/apps/a/changed', b'abc')
+    dedup = Deduplicator(pcs, [pcs._entry('/apps/a/deleted')])
+    pcs.delete('/apps/a/deleted')
+    assert dedup.upload(path, '/apps/b/1')[0] == 'upload'
+    assert pcs.files['/apps/b/1'] == b'abc'
+    assert dedup.lookup(content_md5(b'abc')) == '/apps/b/1'
+
+    dedup = Deduplicator(pcs, [pcs._entry('/apps/a/changed')])
+    pcs.upload('/apps/a/changed', b'new', ondup='overwrite')
+    assert dedup.upload(path, '/apps/b/2')[0] == 'upload'
+    assert pcs.files['/apps/b/2'] == b'abc'
+    assert not [x for x in pcs.calls if x[0] == 'copy']
+
+
+def test_dedup_copy_ondup(tmpdir):
+    pcs = FakePCS()
+    path = local_file(tmpdir, 'a', b'abc')
+    pcs.upload('/apps/a/src', b'abc')
+    pcs.upload('/apps/b/dst', b'old')
+    dedup = Deduplicator(pcs, [pcs._entry('/apps/a/src')])
+    method, response = dedup.upload(path, '/apps/b/dst', ondup='overwrite')
+    assert (method, response.ok) == ('copy', True)
+    assert pcs.files['/apps/b/dst'] == b'abc'
+
+
+def test_dedup_superfile_not_remembered(tmpdir):
+    pcs = FakePCS()
+    path = local_file(tmpdir, 'a', b'abc' * 100)
+    upload_superfile = pcs.upload_superfile
+
+    def merged_upload_superfile(remote_path, block_list, **kwargs):
+        # 合并得到的文件的 md5 不是内容的 MD5
+        response = upload_superfile(remote_path, block_list, **kwargs)
+        response.content = json.dumps(dict(
+            response.json(), md5='0' * 32)).encode('utf-8')
+        return response
+    pcs.upload_superfile = merged_upload_superfile
+    dedup = Deduplicator(pcs)
+    assert dedup.upload(path, '/apps/b/big', block_size=100)[0] == 'upload'
+    assert dedup.lookup(content_md5(b'abc' * 100)) is None
+    assert dedup.lookup('0' * 32) is None
+    assert dedup.upload(path, '/apps/b/small')[0] == 'upload'
+    assert dedup.lookup(content_md5(b'abc' * 100)) == '/apps/b/small'
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import os
+
+import pytest
+
+pytest.importorskip('fsspec')
+from baidupcs.fs import PCSFileSystem  # noqa
+from .utils import FakePCS  # noqa
+
+
+def _fs(**kwargs):
+    pcs = FakePCS()
+    pcs.files['/apps/test_sdk/data/a.csv'] = b'a,b\n1,2\n'
+    pcs.files['/apps/test_sdk/data/b.bin'] = bytes(bytearray(range(256)))
+    pcs.files['/apps/test_sdk/data/sub/c.txt'] = b'c'
+    return pcs, PCSFileSystem(pcs=pcs, skip_instance_cache=True, **kwargs)
+
+
+def test_ls_info_cache():
+    pcs, fs = _fs()
+    names = fs.ls('baidupcs:///apps/test_sdk/data', detail=False)
+    assert names == ['/apps/test_sdk/data/a.csv',
+                     '/apps/test_sdk/data/b.bin',
+                     '/apps/test_sdk/data/sub']
+    fs.ls('/apps/test_sdk/data')
+    assert fs.info('/apps/test_sdk/data/sub')['type'] == 'directory'
+    assert fs.info('/apps/test_sdk/data/b.bin')['size'] == 256
+    assert [x[0] for x in pcs.calls] == ['list_files']
+    assert fs.isfile('/apps/test_sdk/data/sub/c.txt')
+    assert not fs.exists('/apps/test_sdk/missing')
+    with pytest.raises(FileNotFoundError):
+        fs.info('/apps/test_sdk/missing')
+
+
+def test_cat_ranges():
+    pcs, fs = _fs()
+    assert fs.cat_file('/apps/test_sdk/data/b.bin', 10, 13) == b'\x0a\x0b\x0c'
+    assert fs.cat_file('/apps/test_sdk/data/b.bin', -2) == b'\xfe\xff'
+    results = fs.cat_ranges(['/apps/test_sdk/data/b.bin'] * 3 +
+                            ['/apps/test_sdk/missing'],
+                            [0, 100, 250, 0], [2, 102, None, 1])
+    assert results[:3] == [b'\x00\x01', b'\x64\x65', bytes(bytearray(
+        range(250, 256)))]
+    assert isinstance(results[3], Exception)
+    with fs.open('/apps/test_sdk/data/b.bin', block_size=16) as f:
+        f.seek(200)
+        assert f.read(3) == b'\xc8\xc9\xca'
+
+
+def test_write():
+    pcs, fs = _fs()
+    fs.ls('/apps/test_sdk/data')
+    with fs.open('/apps/test_sdk/data/small', 'wb') as f:
+        f.write(b'hello')
+    assert pcs.files['/apps/test_sdk/data/small'] == b'hello'
+    assert '/apps/test_sdk/data/small' in fs.ls('/apps/test_sdk/data',
+                                                detail=False)
+
+    content = os.urandom(1000)
+    with fs.open('/apps/test_sdk/data/big', 'wb', block_size=100) as f:
+        for i in range(0, 1000, 30):
+            f.write(content[i:i + 30])
+    assert pcs.files['/apps/test_sdk/data/big'] == content
+    assert 'upload_superfile' in [x[0] for x in pcs.calls]
+
+    with fs.open('/apps/test_sdk/data/two', 'wb', block_size=100) as f:
+        f.write(content[:150])
+    assert pcs.files['/apps/test_sdk/data/two'] == content[:150]
+
+    with fs.open('/apps/test_sdk/data/one', 'wb', block_size=100) as f:
+        f.write(content[:100])
+    assert pcs.files['/apps/test_sdk/data/one'] == content[:100]
+
+
+def test_write_many_blocks(monkeypatch):
+    pcs, fs = _fs()
+    content = os.urandom(10 * 200 + 20 * 60)
+    with fs.open('/apps/test_sdk/data/many', 'wb', block_size=10) as f:
+        for i in range(0, len(content), 10):
+            f.write(content[i:i + 10])
+        # 上传 128 个分片后分片大小加倍
+        assert f.blocksize == 20
+    assert pcs.files['/apps/test_sdk/data/many'] == content
+
+    monkeypatch.setattr('baidupcs.fs.GROW_BLOCKS', 10 ** 6)
+    monkeypatch.setattr('baidupcs.fs.MAX_BLOCKS', 4)
+    with pytest.raises(IOError):
+        with fs.open('/apps/test_sdk/data/too_many', 'wb',
+                     block_size=10) as f:
+            for _ in range(6):
+                f.write(os.urandom(10))
+    assert '/apps/test_sdk/data/too_many' not in pcs.files
+
+
+def test_checksum():
+    pcs, fs = _fs()
+    fs.ls('/apps/test_sdk/data')
+    assert fs.checksum('/apps/test_sdk/data/a.csv') != \
+        fs.checksum('/apps/test_sdk/data/b.bin')
+    # 目录没有 md5 ，根目录也没有 fs_id
+    assert isinstance(fs.checksum('/apps/test_sdk/data/sub'), int)
+    assert fs.checksum('/') == fs.checksum('/')
+
+
+def test_bulk_operations():
+    pcs, fs = _fs()
+    fs.copy(['/apps/test_sdk/data/a.csv', '/apps/test_sdk/data/b.bin'],
+            ['/apps/test_sdk/copy/a.csv', '/apps/test_sdk/copy/b.bin'])
+    fs.mv(['/apps/test_sdk/copy/a.csv', '/apps/test_sdk/copy/b.bin'],
+          ['/apps/test_sdk/moved/a.csv', '/apps/test_sdk/moved/b.bin'])
+    assert fs.ls('/apps/test_sdk/moved', detail=False) == [
+        '/apps/test_sdk/moved/a.csv', '/apps/test_sdk/moved/b.bin']
+    fs.rm(['/apps/test_sdk/moved', '/apps/test_sdk/data/sub'])
+    assert sorted(pcs.files) == ['/apps/test_sdk/data/a.csv',
+                                 '/apps/test_sdk/data/b.bin']
+    fs.makedirs('/apps/test_sdk/empty')
+    assert fs.isdir('/apps/test_sdk/empty')
+    with pytest.raises(FileExistsError):
+        fs.makedirs('/apps/test_sdk/empty')
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import os
+
+import pytest
+
+from baidupcs import hashing
+from baidupcs.hashing import file_digest, hash_file
+from .utils import content_crc32, content_md5, local_file, slice_md5
+
+
+def test_file_digest(tmpdir):
+    content = os.urandom(300 * 1024)
+    path = local_file(tmpdir, 'a', content)
+    digest = file_digest(path, buffer_size=100 * 1024)
+    assert digest.rapid_upload_args() == (
+        len(content), content_md5(content), content_crc32(content),
+        slice_md5(content))
+
+
+def test_hash_file(tmpdir):
+    content = os.urandom(1024 * 1024 + 3)
+    path = local_file(tmpdir, 'a', content)
+    for processes in (False, True):
+        digest = hash_file(path, block_size=256 * 1024, workers=2,
+                           processes=processes, buffer_size=100000)
+        assert digest.rapid_upload_args() == (
+            len(content), content_md5(content), content_crc32(content),
+            slice_md5(content))
+        assert digest.block_list == [
+            content_md5(content[i:i + 256 * 1024])
+            for i in range(0, len(content), 256 * 1024)]
+
+
+def test_hash_file_empty(tmpdir):
+    path = local_file(tmpdir, 'a', b'')
+    digest = hash_file(path)
+    assert digest.content_md5 == content_md5(b'')
+    assert digest.block_list == []
+
+
+def test_hash_file_error(monkeypatch, tmpdir):
+    def crc32(data, value=0):
+        raise ValueError('crc32 failed')
+    monkeypatch.setattr(hashing, 'crc32', crc32)
+    path = local_file(tmpdir, 'a', b'x' * 1024)
+    # 计算整个文件校验值的线程中的异常在调用者中重新抛出
+    with pytest.raises(ValueError):
+        hash_file(path, block_size=256, workers=2)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import threading
+import time
+
+from baidupcs import PCS
+from baidupcs.hedging import Hedger
+from .utils import FakeResponse
+
+
+class SlowOnce(object):
+    """第一次调用很慢，之后的调用立即返回."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.calls = 0
+        self.closed = []
+        self.threads = []
+        self.lock = threading.Lock()
+
+    def get(self, url, params=None, **kwargs):
+        with self.lock:
+            self.calls += 1
+            number = self.calls
+            self.threads.append(threading.current_thread())
+        if number == 1:
+            time.sleep(self.seconds)
+        response = FakeResponse({'number': number})
+        response.close = lambda: self.closed.append(number)
+        return response
+
+
+def _hedger(**kwargs):
+    hedger = Hedger(min_samples=5, **kwargs)
+    for _ in range(5):
+        hedger.record(('file', 'meta'), 0.01)
+    return hedger
+
+
+def test_hedge():
+    hedger = _hedger(max_ratio=1)
+    session = SlowOnce(0.3)
+    pcs = PCS('token', session=session, hedger=hedger)
+    start = time.time()
+    response = pcs.meta('/apps/test_sdk/a')
+    assert time.time() - start < 0.2
+    assert response.json() == {'number': 2}
+    assert hedger.stats() == {'requests': 1, 'hedges': 1, 'wins': 1}
+    time.sleep(0.5)
+    assert session.closed == [1]
+
+
+def test_hedge_budget():
+    hedger = _hedger(max_ratio=0.5)
+    session = SlowOnce(0.1)
+    pcs = PCS('token', session=session, hedger=hedger)
+    # 第一个请求时对冲请求数会超过总请求数的一半
+    assert pcs.meta('/apps/test_sdk/a').json() == {'number': 1}
+    assert hedger.hedges == 0
+    assert session.calls == 1
+    # 没有对冲名额时直接在当前线程中发送请求
+    assert session.threads == [threading.current_thread()]
+
+
+def test_no_samples():
+    hedger = Hedger()
+    session = SlowOnce(0)
+    pcs = PCS('token', session=session, hedger=hedger)
+    for _ in range(3):
+        pcs.meta('/apps/test_sdk/a')
+    assert hedger.delay(('file', 'meta')) is None
+    assert session.calls == 3
+    pcs.download('/apps/test_sdk/a', stream=True)
+    assert hedger.requests == 3
+
+
+def test_not_hedged():
+    hedger = _hedger(max_ratio=1)
+    for endpoint in (('file', 'download'), ('thumbnail', 'generate')):
+        for _ in range(5):
+            hedger.record(endpoint, 0.01)
+    session = SlowOnce(0.1)
+    pcs = PCS('token', session=session, hedger=hedger)
+    # 下载和缩略图不在 apis 中，慢的请求也不会对冲
+    assert pcs.download('/apps/test_sdk/a').json() == {'number': 1}
+    assert pcs.thumbnail('/apps/test_sdk/a.jpg', 100, 100).json() == {
+        'number': 2}
+    assert hedger.stats() == {'requests': 0, 'hedges': 0, 'wins': 0}
+    assert session.calls == 2
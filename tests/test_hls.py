@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import threading
+import time
+try:
+    from urllib2 import urlopen
+except ImportError:
+    from urllib.request import urlopen
+
+from baidupcs.hls import HLSServer, SegmentPrefetcher, parse_playlist
+from .utils import FakePCS, FakeResponse
+
+PLAYLIST = '''#EXTM3U
+#EXT-X-TARGETDURATION:10
+#EXTINF:10,
+http://example.com/0.ts
+#EXTINF:10,
+1.ts
+#EXTINF:10,
+http://example.com/2.ts
+#EXTINF:10,
+http://example.com/3.ts
+#EXTINF:10,
+http://example.com/4.ts
+#EXT-X-ENDLIST
+'''
+
+
+class FakeSession(object):
+    def __init__(self):
+        self.urls = []
+        self.lock = threading.Lock()
+
+    def get(self, url):
+        with self.lock:
+            self.urls.append(url)
+        return FakeResponse(content=url.encode('utf-8'))
+
+
+def _prefetcher(**kwargs):
+    pcs = FakePCS()
+    response = FakeResponse(content=PLAYLIST.encode('utf-8'))
+    response.url = 'http://example.com/video.m3u8'
+    pcs.video_convert = lambda remote_path, video_type: response
+    session = FakeSession()
+    return session, SegmentPrefetcher(pcs, '/apps/test_sdk/a.mp4',
+                                      'M3U8_640_480', session=session,
+                                      **kwargs).load()
+
+
+def test_parse_playlist():
+    lines, urls, positions = parse_playlist(PLAYLIST, 'http://example.com/')
+    assert urls[1] == 'http://example.com/1.ts'
+    assert len(urls) == 5
+    assert [lines[x] for x in positions][0] == 'http://example.com/0.ts'
+
+
+def test_prefetch_ring_buffer():
+    session, prefetcher = _prefetcher(prefetch=2, keep=1)
+    try:
+        assert prefetcher.get(0) == b'http://example.com/0.ts'
+        assert prefetcher.get(1) == b'http://example.com/1.ts'
+        for _ in range(100):
+            if prefetcher.buffered() == [0, 1, 2, 3]:
+                break
+            time.sleep(0.01)
+        assert prefetcher.buffered() == [0, 1, 2, 3]
+        prefetcher.get(4)
+        assert prefetcher.buffered() == [3, 4]
+        assert len(session.urls) == 5
+        assert 'segment/4.ts' in prefetcher.playlist()
+    finally:
+        prefetcher.close()
+
+
+def test_server():
+    session, prefetcher = _prefetcher()
+    server = HLSServer(prefetcher).start()
+    try:
+        playlist = urlopen(server.url).read().decode('utf-8')
+        assert playlist.count('segment/') == 5
+        base = server.url.rsplit('/', 1)[0]
+        assert urlopen(base + '/segment/3.ts').read() == \
+            b'http://example.com/3.ts'
+    finally:
+        server.close()
@@ -0,0 +1,17 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def test_lazy_imports():
+    code = ('import sys, baidupcs; baidupcs.PCS("token"); '
+            'print(sorted(m for m in ("requests", "requests_toolbelt") '
+            'if m in sys.modules))')
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    output = subprocess.check_output([sys.executable, '-c', code], env=env)
+    assert output.decode('ascii').strip() == '[]'
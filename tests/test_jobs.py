@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from baidupcs.jobs import (DONE, FAILED, QUEUED, RUNNING, JobQueue,
+                           TransferWorker)
+from .utils import FakePCS, local_file
+
+
+def test_claim_complete_fail(tmpdir):
+    jobs = JobQueue(str(tmpdir.join('jobs.db')), max_attempts=2,
+                    retry_delay=0)
+    first = jobs.put('upload', 'a', '/apps/test_sdk/a', ondup='overwrite')
+    jobs.put('download', 'b', '/apps/test_sdk/b')
+    job = jobs.claim()
+    assert (job.id, job.state, job.attempts) == (first, RUNNING, 1)
+    assert job.options == {'ondup': 'overwrite'}
+    assert jobs.complete(job)
+    assert jobs.get(first).state == DONE
+
+    job = jobs.claim()
+    assert jobs.fail(job, IOError('network'))
+    assert jobs.get(job.id).state == QUEUED
+    job = jobs.claim()
+    assert job.attempts == 2
+    jobs.fail(job, IOError('network'))
+    assert jobs.get(job.id).state == FAILED
+    assert jobs.get(job.id).error == 'network'
+    assert jobs.claim() is None
+    assert jobs.counts() == {QUEUED: 0, RUNNING: 0, DONE: 1, FAILED: 1}
+
+    jobs.retry(job.id)
+    assert jobs.claim().id == job.id
+
+
+def test_lease_expired(tmpdir):
+    jobs = JobQueue(str(tmpdir.join('jobs.db')), lease=0.05)
+    jobs.put('upload', 'a', '/apps/test_sdk/a')
+    job = jobs.claim()
+    assert jobs.claim() is None
+    time.sleep(0.1)
+    # 原来的进程已经退出，其他进程重新取得任务
+    other = jobs.claim()
+    assert other.id == job.id
+    assert not jobs.renew(job)
+    assert not jobs.complete(job)
+    assert jobs.complete(other)
+
+
+def _claim_all(path, results):
+    jobs = JobQueue(path)
+    claimed = []
+    while True:
+        job = jobs.claim()
+        if job is None:
+            break
+        claimed.append(job.id)
+        jobs.complete(job)
+    results.put(claimed)
+
+
+def test_multiple_processes(tmpdir):
+    path = str(tmpdir.join('jobs.db'))
+    jobs = JobQueue(path)
+    ids = [jobs.put('upload', str(i), '/apps/test_sdk/%d' % i)
+           for i in range(100)]
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=_claim_all,
+                                         args=(path, results))
+                 for _ in range(4)]
+    for process in processes:
+        process.start()
+    claimed = []
+    for _ in processes:
+        claimed.extend(results.get(timeout=30))
+    for process in processes:
+        process.join()
+    assert sorted(claimed) == ids
+    assert jobs.counts()[DONE] == 100
+
+
+class FlakyPCS(FakePCS):
+    """``upload_tmpfile`` 成功 ``successes`` 次之后一直失败，
+    模拟传输中断."""
+
+    def __init__(self, successes):
+        super(FlakyPCS, self).__init__()
+        self.successes = successes
+
+    def upload_tmpfile(self, file_content, **kwargs):
+        if self.successes is not None:
+            if not self.successes:
+                raise IOError('connection reset')
+            self.successes -= 1
+        return super(FlakyPCS, self).upload_tmpfile(file_content, **kwargs)
+
+
+def test_worker_resume(tmpdir):
+    pcs = FlakyPCS(successes=3)
+    content = os.urandom(1000)
+    path = local_file(tmpdir, 'a.bin', content)
+    jobs = JobQueue(str(tmpdir.join('jobs.db')), retry_delay=0)
+    job_id = jobs.put('upload', path, '/apps/test_sdk/a.bin',
+                      block_size=100, workers=1)
+    worker = TransferWorker(pcs, jobs, str(tmpdir.join('state')))
+    worker.run_once()
+    assert jobs.get(job_id).state == QUEUED
+    assert jobs.get(job_id).error == 'connection reset'
+
+    pcs.successes = None
+    del pcs.calls[:]
+    worker.run(exit_when_empty=True)
+    assert (worker.done, worker.failures) == (1, 1)
+    assert jobs.get(job_id).state == DONE
+    assert jobs.get(job_id).attempts == 2
+    assert pcs.files['/apps/test_sdk/a.bin'] == content
+    # 第二次只上传剩余的分片
+    assert [x[0] for x in pcs.calls].count('upload_tmpfile') == 7
+
+    jobs.put('download', str(tmpdir.join('b.bin')),
+             '/apps/test_sdk/a.bin')
+    worker.run(exit_when_empty=True)
+    with open(str(tmpdir.join('b.bin')), 'rb') as f:
+        assert f.read() == content
+
+
+def test_put_reserved_options(tmpdir):
+    jobs = JobQueue(str(tmpdir.join('jobs.db')))
+    with pytest.raises(ValueError):
+        jobs.put('upload', 'a.bin', '/apps/test_sdk/a.bin', state_dir='/tmp')
+    assert jobs.jobs() == []
+
+
+class StolenPCS(FakePCS):
+    """上传第一个分片时任务被其他进程取得."""
+
+    def __init__(self, queue, wait):
+        super(StolenPCS, self).__init__()
+        self.queue = queue
+        self.wait = wait
+        self.stolen = False
+
+    def upload_tmpfile(self, file_content, **kwargs):
+        if not self.stolen:
+            self.stolen = True
+            db = self.queue._connect()
+            with db:
+                db.execute('UPDATE jobs SET token = ?', ('other',))
+            time.sleep(self.wait)
+        return super(StolenPCS, self).upload_tmpfile(file_content, **kwargs)
+
+
+def test_worker_lease_lost(tmpdir):
+    jobs = JobQueue(str(tmpdir.join('jobs.db')), lease=0.3)
+    pcs = StolenPCS(jobs, wait=0.5)
+    path = local_file(tmpdir, 'a.bin', os.urandom(1000))
+    job_id = jobs.put('upload', path, '/apps/test_sdk/a.bin',
+                      block_size=100, workers=1)
+    worker = TransferWorker(pcs, jobs, str(tmpdir.join('state')))
+    worker.run_once()
+    assert (worker.done, worker.failures, worker.lost) == (0, 0, 1)
+    # 传输被中止，任务的状态仍然属于取得它的进程
+    calls = [x[0] for x in pcs.calls]
+    assert 'upload_superfile' not in calls
+    # 租约失效后不再上传分片，也不重试
+    assert calls.count('upload_tmpfile') == 1
+    job = jobs.get(job_id)
+    assert (job.state, job.token, job.error) == (RUNNING, 'other', None)
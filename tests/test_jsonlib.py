@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import json
+
+from baidupcs import jsonlib
+
+data = {
+    'request_id': 1,
+    'list': [{'path': '/apps/test_sdk/%d' % i, 'size': i * 1000,
+              'extra': {'list': [i]}} for i in range(50)],
+}
+content = json.dumps(data).encode('utf-8')
+
+
+def _chunks(content, size):
+    return [content[i:i + size] for i in range(0, len(content), size)]
+
+
+def test_set_backend():
+    name = jsonlib.backend
+    try:
+        assert jsonlib.set_backend('json') == 'json'
+        assert jsonlib.loads(content.decode('utf-8')) == data
+    finally:
+        jsonlib.set_backend(name)
+
+
+def test_iter_items():
+    for size in (1, 3, 64, len(content)):
+        assert list(jsonlib.iter_items(_chunks(content, size))) == data['list']
+
+
+def test_iter_items_object():
+    diff = {'entries': {'/a': {'path': '/a'}, '/b': {'path': '/b'}},
+            'cursor': 'list'}
+    items = jsonlib.iter_items(_chunks(json.dumps(diff).encode('utf-8'), 2),
+                               key='entries')
+    assert sorted(x['path'] for x in items) == ['/a', '/b']
+
+
+def test_iter_items_empty():
+    assert list(jsonlib.iter_items([b'{"list": []}'])) == []
+    assert list(jsonlib.iter_items([b'{"type": "list"}'])) == []
+    assert list(jsonlib.iter_items([b'{"list": [1', b'23, 4]}'])) == [123, 4]
+    assert list(jsonlib.iter_items([b'{}'])) == []
+
+
+def test_iter_items_top_level():
+    # 只匹配最外层的键，嵌套对象和字符串中的 "list" 被跳过
+    nested = {'extra': {'list': [0]}, 'name': '"list": [1]',
+              'list': [2, 3]}
+    for size in (1, 5):
+        chunks = _chunks(json.dumps(nested).encode('utf-8'), size)
+        assert list(jsonlib.iter_items(chunks)) == [2, 3]
+    assert list(jsonlib.iter_items([b'{"extra": {"list": [1]}}'])) == []
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from baidupcs import (FileEntry, RecycleEntry, Quota, DownloadTask,
+                      FileList, DiffPage)
+from .utils import FakeResponse
+
+
+entries = [
+    {'fs_id': 1, 'path': '/apps/test_sdk/a.txt', 'ctime': 10, 'mtime': 11,
+     'md5': 'd41d8cd98f00b204e9800998ecf8427e', 'size': 3, 'isdir': 0},
+    {'fs_id': 2, 'path': '/apps/test_sdk/dir', 'ctime': 20, 'mtime': 21,
+     'size': 0, 'isdir': 1},
+    {'fs_id': 3, 'path': '/apps/test_sdk/b.txt', 'ctime': 30, 'mtime': 31,
+     'md5': '900150983cd24fb0d6963f7d28e17f72', 'size': 5, 'isdir': 0},
+]
+
+
+def test_file_entry():
+    entry = FileEntry.from_dict(entries[0])
+    assert entry.name == 'a.txt'
+    assert entry.size == 3
+    assert not hasattr(entry, '__dict__')
+    assert FileEntry.from_dict(entry.to_dict()) == entry
+
+
+def test_quota():
+    quota = Quota.from_response(FakeResponse({'quota': 100, 'used': 30}))
+    assert quota.free == 70
+
+
+def test_file_list():
+    files = FileList.from_response(FakeResponse({'list': entries}))
+    assert len(files) == 3
+    assert files.total_size() == 8
+    assert list(files) == [FileEntry.from_dict(x) for x in entries]
+    assert files[-1].path == '/apps/test_sdk/b.txt'
+    assert files[1].isdir == 1 and files[1].md5 == ''
+    assert len(files._dir_list) == 1
+
+    streamed = FileList.from_response(FakeResponse({'list': entries}),
+                                      stream=True)
+    assert list(streamed) == list(files)
+
+
+def test_file_list_slice():
+    files = FileList(entries, entry_class=RecycleEntry)
+    assert [x.fs_id for x in files[1:]] == [2, 3]
+    assert [x.fs_id for x in files[::-2]] == [3, 1]
+    assert isinstance(files[:1], FileList) and len(files[:1]) == 1
+    assert isinstance(files[:1][0], RecycleEntry)
+    assert len(files[5:]) == 0
+
+
+def test_recycle_entries():
+    files = FileList(entries, entry_class=RecycleEntry)
+    assert isinstance(files[0], RecycleEntry)
+
+
+def test_diff_page():
+    data = {
+        'entries': {
+            '/apps/test_sdk/a.txt': dict(entries[0], isdelete=-1),
+        },
+        'has_more': False,
+        'reset': True,
+        'cursor': 'abc',
+    }
+    page = DiffPage.from_response(FakeResponse(data))
+    assert page.cursor == 'abc' and page.reset and not page.has_more
+    # -1 表示彻底删除，保留原始值
+    assert page.entries[0].isdelete == -1
+
+
+def test_download_tasks():
+    query = {'task_info': {'123': {'status': '1', 'file_size': '10'}}}
+    tasks = DownloadTask.from_response(FakeResponse(query))
+    assert tasks[0].task_id == '123' and not tasks[0].finished
+
+    listing = {'task_info': [{'task_id': '456', 'status': '0'}]}
+    tasks = DownloadTask.from_response(FakeResponse(listing))
+    assert tasks[0].task_id == '456' and tasks[0].finished
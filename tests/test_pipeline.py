@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import os
+
+from requests_toolbelt.multipart.decoder import MultipartDecoder
+
+from baidupcs import PCS
+from baidupcs.api import _encode_files
+from baidupcs.pipeline import SmallFileUploader
+from .utils import FakePCS, FakeResponse
+
+
+def test_upload_pipeline(tmpdir):
+    pcs = FakePCS()
+    existing = os.urandom(300 * 1024)
+    pcs.files['/apps/test_sdk/existing'] = existing
+    jobs = []
+    for i in range(20):
+        path = str(tmpdir.join(str(i)))
+        with open(path, 'wb') as f:
+            f.write(existing if i == 0 else os.urandom(i * 100))
+        jobs.append((path, '/apps/test_sdk/small/%d' % i))
+    sizes = []
+    uploader = SmallFileUploader(pcs, workers=4)
+    results = list(uploader.upload(jobs, callback=sizes.append))
+    assert len(results) == 20
+    assert dict((x[1], x[2]) for x in results)[
+        '/apps/test_sdk/small/0'] == 'rapid_upload'
+    for path, remote_path in jobs:
+        with open(path, 'rb') as f:
+            assert pcs.files[remote_path] == f.read()
+    assert uploader.files == 20
+    assert uploader.rapid_uploads == 1
+    assert uploader.bytes == sum(sizes)
+    assert uploader.files_per_second() > 0
+
+
+def test_upload_failures(tmpdir):
+    pcs = FakePCS()
+    upload = pcs.upload
+
+    def flaky_upload(remote_path, file_content, **kwargs):
+        if remote_path.endswith('/1'):
+            return FakeResponse({'error_code': 31061}, status_code=400)
+        return upload(remote_path, file_content, **kwargs)
+    pcs.upload = flaky_upload
+    jobs = []
+    for i in range(3):
+        path = str(tmpdir.join(str(i)))
+        with open(path, 'wb') as f:
+            f.write(b'x' * 100)
+        jobs.append((path, '/apps/test_sdk/small/%d' % i))
+    sizes = []
+    uploader = SmallFileUploader(pcs, workers=2)
+    results = list(uploader.upload(jobs, callback=sizes.append))
+    assert len(results) == 3
+    # 失败的上传不计入文件数和字节数
+    assert (uploader.files, uploader.bytes, uploader.failures) == (2, 200, 1)
+    assert sizes == [100, 100]
+
+
+def test_session():
+    pcs = PCS('token')
+    uploader = SmallFileUploader(pcs, workers=8)
+    assert pcs.session is None
+    assert uploader.pcs.session is not None
+    assert uploader.pcs.access_token == 'token'
+
+
+def test_encode_files():
+    body, content_type = _encode_files({'file': ('file', b'a\r\nb', '')})
+    parts = MultipartDecoder(body, content_type).parts
+    assert parts[0].content == b'a\r\nb'
+    with open(__file__, 'rb') as f:
+        data, content_type = _encode_files({'file': ('file', f, '')})
+    assert content_type == data.content_type
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import os
+import threading
+
+import pytest
+
+from baidupcs import InvalidToken, PCSPool, NoAvailableClient
+from .utils import FakePCS, FakeResponse
+
+
+class FlakyPCS(FakePCS):
+    def __init__(self, status_code=200, error_code=None):
+        super(FlakyPCS, self).__init__()
+        self.access_token = 'token'
+        self.status_code = status_code
+        self.error_code = error_code
+
+    def meta(self, remote_path, **kwargs):
+        self._call('meta', remote_path)
+        if self.access_token == 'expired':
+            raise InvalidToken()
+        return FakeResponse({'error_code': self.error_code},
+                            status_code=self.status_code)
+
+
+class UploadPCS(FlakyPCS):
+    def upload(self, remote_path, file_content, ondup=None, **kwargs):
+        self._call('upload', remote_path)
+        content = file_content.read()
+        if self.access_token == 'expired':
+            raise InvalidToken()
+        self._save(remote_path, content)
+        return FakeResponse(self._entry(remote_path))
+
+
+def test_least_loaded():
+    a, b = FlakyPCS(), FlakyPCS()
+    pool = PCSPool([a, b])
+    member = pool.acquire()
+    pool.meta('/apps/a')
+    pool.release(member, True)
+    assert len(a.calls) + len(b.calls) == 1
+    assert (member.pcs is a) == (len(b.calls) == 1)
+
+
+def test_drain_unhealthy():
+    bad, good = FlakyPCS(status_code=500), FlakyPCS()
+    pool = PCSPool([bad], min_samples=2, cooldown=60)
+    pool.meta('/apps/a')
+    pool.meta('/apps/a')
+    pool.add(good)
+    assert [x['available'] for x in pool.stats()] == [False, True]
+    for _ in range(3):
+        pool.meta('/apps/a')
+    assert len(bad.calls) == 2 and len(good.calls) == 3
+
+
+def test_throttled():
+    throttled = FlakyPCS(status_code=400, error_code=31034)
+    pool = PCSPool([throttled])
+    pool.meta('/apps/a')
+    with pytest.raises(NoAvailableClient):
+        pool.meta('/apps/a')
+
+
+def test_invalid_token():
+    expired = FlakyPCS()
+    expired.access_token = 'expired'
+    good = FlakyPCS()
+    pool = PCSPool()
+    pool.add(expired)
+    pool.add(good)
+    # 失效的客户端被移出池，请求在下一个客户端上重试
+    assert pool.meta('/apps/a').status_code == 200
+    assert pool.members[0].invalid
+    assert len(expired.calls) == 1 and len(good.calls) == 1
+    assert pool.meta('/apps/a').status_code == 200
+    assert len(expired.calls) == 1
+
+
+def test_invalid_token_no_client():
+    expired = FlakyPCS()
+    expired.access_token = 'expired'
+    pool = PCSPool([expired])
+    with pytest.raises(InvalidToken):
+        pool.meta('/apps/a')
+    assert pool.members[0].invalid
+
+
+def test_refresh_token(monkeypatch):
+    refreshed = []
+    lock = threading.Lock()
+
+    def get_new_access_token(refresh_token, client_id, client_secret):
+        with lock:
+            refreshed.append(refresh_token)
+        return FakeResponse({'access_token': 'token%d' % len(refreshed),
+                             'refresh_token': 'refresh%d' % len(refreshed)})
+    monkeypatch.setattr('baidupcs.tools.get_new_access_token',
+                        get_new_access_token)
+    expired = FlakyPCS()
+    expired.access_token = 'expired'
+    pool = PCSPool()
+    member = pool.add(expired, refresh_token='refresh0', client_id='id',
+                      client_secret='secret')
+    threads = [threading.Thread(target=pool.meta, args=('/apps/a',))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 并发的请求只使用一次 Refresh Token
+    assert refreshed == ['refresh0']
+    assert expired.access_token == 'token1'
+    assert member.refresh_token == 'refresh1'
+    assert not member.invalid
+
+
+def test_refresh_token_failed(monkeypatch):
+    monkeypatch.setattr('baidupcs.tools.get_new_access_token',
+                        lambda *args: FakeResponse({}, status_code=400))
+    expired = FlakyPCS()
+    expired.access_token = 'expired'
+    good = FlakyPCS()
+    pool = PCSPool()
+    pool.add(expired, refresh_token='refresh0')
+    pool.add(good)
+    assert pool.meta('/apps/a').status_code == 200
+    assert pool.members[0].invalid
+
+
+def test_invalid_token_rewind(tmpdir):
+    content = os.urandom(100000)
+    path = tmpdir.join('blob')
+    path.write_binary(content)
+    expired = UploadPCS()
+    expired.access_token = 'expired'
+    good = UploadPCS()
+    pool = PCSPool()
+    pool.add(expired)
+    pool.add(good)
+    with open(str(path), 'rb') as f:
+        f.read(10)
+        assert pool.upload('/apps/a', f).status_code == 200
+    # 在下一个客户端上重试前恢复到第一次请求前的位置
+    assert good.files['/apps/a'] == content[10:]
+    assert len(expired.calls) == 1
+
+
+def test_invalid_token_not_seekable():
+    expired = UploadPCS()
+    expired.access_token = 'expired'
+    good = UploadPCS()
+    pool = PCSPool()
+    pool.add(expired)
+    pool.add(good)
+    read_fd, write_fd = os.pipe()
+    with os.fdopen(write_fd, 'wb') as f:
+        f.write(b'abc')
+    with os.fdopen(read_fd, 'rb') as f:
+        with pytest.raises(InvalidToken):
+            pool.upload('/apps/a', f)
+    assert good.calls == []
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import io
+import os
+import zipfile
+
+from baidupcs.remotefile import RemoteFile
+from .utils import FakePCS
+
+
+def _remote_file(content, **kwargs):
+    pcs = FakePCS()
+    pcs.files['/apps/test_sdk/big'] = content
+    return pcs, RemoteFile(pcs, '/apps/test_sdk/big', **kwargs)
+
+
+def test_seek_and_read():
+    content = os.urandom(10000)
+    pcs, f = _remote_file(content, block_size=1000)
+    assert f.size == 10000
+    f.seek(-10, io.SEEK_END)
+    assert f.read() == content[-10:]
+    assert f.read(1) == b''
+    f.seek(4990)
+    assert f.read(20) == content[4990:5010]
+    assert f.tell() == 5010
+    f.seek(-5, io.SEEK_CUR)
+    buf = bytearray(10)
+    assert f.readinto(buf) == 10
+    assert bytes(buf) == content[5005:5015]
+    assert f.bytes_fetched < len(content)
+
+
+def test_read_ahead_and_cache():
+    content = os.urandom(10000)
+    pcs, f = _remote_file(content, block_size=1000, read_ahead=3,
+                          cache_blocks=4)
+    assert f.read(500) == content[:500]
+    assert f.read(1000) == content[500:1500]
+    # 第二次读取是顺序的，一个请求下载了之后的三块
+    assert f.requests == 2
+    assert f.read(2500) == content[1500:4000]
+    # 第 1-4 块已经缓存，只需下载预读的第 5、6 块
+    assert f.requests == 3
+    assert f.bytes_fetched == 7000
+    # 第 0 块已经被淘汰
+    f.seek(0)
+    assert f.read(10) == content[:10]
+    assert f.requests == 4
+    assert len(f._cache) <= 4
+
+
+def test_zipfile():
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w') as archive:
+        archive.writestr('a.txt', b'a' * 50000)
+        archive.writestr('b.txt', b'hello')
+    pcs, f = _remote_file(buf.getvalue(), block_size=256)
+    with zipfile.ZipFile(f) as archive:
+        assert archive.read('b.txt') == b'hello'
+    assert f.bytes_fetched < len(buf.getvalue())
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import os
+import threading
+import time
+
+from baidupcs.adaptive import FixedController
+from baidupcs.scheduler import (BULK, INTERACTIVE, NORMAL, Scheduler,
+                                TokenBucket)
+from baidupcs.transfer import download_file, upload_file
+from .utils import FakePCS, content_md5
+
+
+def _wait_for(scheduler, count):
+    while len(scheduler._waiting) < count:
+        time.sleep(0.001)
+
+
+def _start(scheduler, order, name, priority=NORMAL, queue='default'):
+    def work():
+        with scheduler.slot(priority, queue):
+            order.append(name)
+    thread = threading.Thread(target=work)
+    thread.start()
+    return thread
+
+
+def test_priority():
+    scheduler = Scheduler(streams=1)
+    order = []
+    scheduler.acquire()
+    threads = [_start(scheduler, order, 'bulk', BULK)]
+    _wait_for(scheduler, 1)
+    threads.append(_start(scheduler, order, 'normal', NORMAL))
+    _wait_for(scheduler, 2)
+    threads.append(_start(scheduler, order, 'interactive', INTERACTIVE))
+    _wait_for(scheduler, 3)
+    scheduler.release()
+    for thread in threads:
+        thread.join()
+    assert order == ['interactive', 'normal', 'bulk']
+    assert scheduler.active == 0
+
+
+def test_fair_queues():
+    scheduler = Scheduler(streams=1)
+    order = []
+    scheduler.acquire(queue='other')
+    threads = []
+    for name in ['a1', 'a2', 'a3', 'b1']:
+        threads.append(_start(scheduler, order, name, queue=name[0]))
+        _wait_for(scheduler, len(threads))
+    scheduler.release(queue='other')
+    for thread in threads:
+        thread.join()
+    assert order == ['a1', 'b1', 'a2', 'a3']
+
+
+def test_token_bucket():
+    bucket = TokenBucket(10000)
+    start = time.time()
+    bucket.consume(10000)
+    assert time.time() - start < 0.1
+    bucket.consume(2000)
+    assert time.time() - start >= 0.15
+    TokenBucket(None).consume(10 ** 9)
+
+
+def test_transfer_with_scheduler(tmpdir):
+    pcs = FakePCS()
+    content = os.urandom(1000)
+    path = str(tmpdir.join('big'))
+    with open(path, 'wb') as f:
+        f.write(content)
+    scheduler = Scheduler(streams=2, upload_rate=10 ** 6,
+                          download_rate=10 ** 6)
+    upload_file(pcs, path, '/apps/test_sdk/big', block_size=100,
+                scheduler=scheduler, priority=BULK, queue='backup')
+    assert pcs.files['/apps/test_sdk/big'] == content
+    download_file(pcs, '/apps/test_sdk/big', path + '.copy',
+                  controller=FixedController(100, 4),
+                  expected_md5=content_md5(content),
+                  scheduler=scheduler)
+    with open(path + '.copy', 'rb') as f:
+        assert f.read() == content
+    assert scheduler.active == 0
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import threading
+
+from baidupcs import MetadataIndex, multi_search
+from .utils import FakeResponse
+
+
+class SearchPCS(object):
+    """只实现了 ``search`` 的 PCS 对象."""
+    files = [
+        {'fs_id': 1, 'path': '/apps/a/foo.txt', 'isdir': 0},
+        {'fs_id': 2, 'path': '/apps/a/sub/foo.log', 'isdir': 0},
+        {'fs_id': 3, 'path': '/apps/b/foobar', 'isdir': 0},
+        {'fs_id': 4, 'path': '/apps/b/foo', 'isdir': 1},
+    ]
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def search(self, remote_path, keyword, recurrent='0', **kwargs):
+        with self.lock:
+            self.calls.append((remote_path, keyword))
+        index = MetadataIndex(self.files)
+        return FakeResponse({'list': [
+            x.to_dict() for x in index.search(remote_path, keyword,
+                                              recurrent)
+        ]})
+
+
+def test_index_search():
+    index = MetadataIndex(SearchPCS.files)
+    assert [x.fs_id for x in index.search('/apps/a', 'foo')] == [1]
+    assert sorted(x.fs_id for x in index.search('/apps/a', 'foo', '1')) \
+        == [1, 2]
+    index.remove('/apps/a/sub')
+    assert '/apps/a/sub/foo.log' not in index
+
+
+def test_index_freshness():
+    index = MetadataIndex(SearchPCS.files)
+    # update 不会把索引标记为已同步
+    assert not index.is_fresh(60)
+    index.touch('/apps/a')
+    assert index.is_fresh(60, '/apps/a')
+    assert index.is_fresh(60, '/apps/a/sub/')
+    assert not index.is_fresh(60, '/apps/ab')
+    assert not index.is_fresh(60, '/apps')
+    index.synced['/apps/a'] -= 120
+    assert not index.is_fresh(60, '/apps/a')
+    index.touch()
+    assert index.is_fresh(60, '/apps/b')
+
+
+def test_multi_search():
+    pcs = SearchPCS()
+    queries = [('/apps/a', 'foo'), ('/apps/b', 'foo'), ('/apps', 'foo')]
+    results = list(multi_search(pcs, queries, recurrent='1', workers=2))
+    assert sorted(x.fs_id for x in results) == [1, 2, 3]
+    assert len(pcs.calls) == 3
+
+
+def test_multi_search_default_recurrent():
+    pcs = SearchPCS()
+    results = list(multi_search(pcs, [('/apps/a', 'foo')]))
+    assert [x.fs_id for x in results] == [1]
+
+
+def test_multi_search_index():
+    pcs = SearchPCS()
+    index = MetadataIndex(SearchPCS.files)
+    index.touch('/apps')
+    results = list(multi_search(pcs, [('/apps', 'foo')], recurrent='1',
+                                index=index))
+    assert sorted(x.fs_id for x in results) == [1, 2, 3]
+    assert pcs.calls == []
+
+
+def test_multi_search_partial_index():
+    pcs = SearchPCS()
+    # 只索引了 /apps/a
+    index = MetadataIndex(x for x in SearchPCS.files
+                          if x['path'].startswith('/apps/a/'))
+    index.touch('/apps/a')
+    results = list(multi_search(pcs, [('/apps/a', 'foo'), ('/apps/b', 'foo')],
+                                recurrent='1', index=index))
+    assert sorted(x.fs_id for x in results) == [1, 2, 3]
+    assert pcs.calls == [('/apps/b', 'foo')]
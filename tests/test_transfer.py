@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import os
+
+import pytest
+
+from baidupcs.adaptive import AdaptiveController, FixedController, run_chunks
+from baidupcs.transfer import (IntegrityError, delta_upload, download_file,
+                               upload_file)
+from .utils import FakePCS, FakeResponse, content_md5, local_file
+
+
+def test_upload_small_file(tmpdir):
+    pcs = FakePCS()
+    path = local_file(tmpdir, 'a.txt', b'abc')
+    upload_file(pcs, path, '/apps/test_sdk/a.txt')
+    assert pcs.files['/apps/test_sdk/a.txt'] == b'abc'
+    assert pcs.calls[0][0] == 'upload'
+
+
+def test_upload_blocks_resume(tmpdir):
+    pcs = FakePCS()
+    content = os.urandom(1000)
+    path = local_file(tmpdir, 'big', content)
+    state_dir = str(tmpdir.join('state'))
+
+    # 第一次上传到合并时失败
+    pcs.upload_superfile = lambda *args, **kwargs: 1 / 0
+    try:
+        upload_file(pcs, path, '/apps/test_sdk/big', block_size=100,
+                    state_dir=state_dir)
+    except ZeroDivisionError:
+        pass
+    del pcs.upload_superfile
+    assert len(pcs.blocks) == 10
+
+    pcs.calls = []
+    sizes = []
+    upload_file(pcs, path, '/apps/test_sdk/big', block_size=100,
+                state_dir=state_dir, callback=sizes.append)
+    assert pcs.files['/apps/test_sdk/big'] == content
+    assert [x[0] for x in pcs.calls] == ['upload_superfile']
+    assert sum(sizes) == len(content)
+    assert os.listdir(state_dir) == []
+
+
+def test_delta_upload(tmpdir):
+    pcs = FakePCS()
+    manifest_dir = str(tmpdir.join('manifest'))
+    content = bytearray(os.urandom(1000))
+    path = local_file(tmpdir, 'a.bin', bytes(content))
+    delta_upload(pcs, path, '/apps/test_sdk/a.bin', manifest_dir,
+                 block_size=100)
+    assert len([x for x in pcs.calls if x[0] == 'upload_tmpfile']) == 10
+
+    content[250:260] = os.urandom(10)
+    content += b'tail'
+    local_file(tmpdir, 'a.bin', bytes(content))
+    del pcs.calls[:]
+    delta_upload(pcs, path, '/apps/test_sdk/a.bin', manifest_dir,
+                 block_size=100)
+    assert pcs.files['/apps/test_sdk/a.bin'] == bytes(content)
+    assert [x for x in pcs.calls if x[0] == 'upload_tmpfile'] == [
+        ('upload_tmpfile', 100), ('upload_tmpfile', 4)]
+
+    # 没有变化时只检查网盘中的文件
+    del pcs.calls[:]
+    delta_upload(pcs, path, '/apps/test_sdk/a.bin', manifest_dir,
+                 block_size=100)
+    assert [x[0] for x in pcs.calls] == ['meta']
+
+
+def test_delta_upload_expired_blocks(tmpdir):
+    pcs = FakePCS()
+    manifest_dir = str(tmpdir.join('manifest'))
+    content = bytearray(os.urandom(1000))
+    path = local_file(tmpdir, 'a.bin', bytes(content))
+    delta_upload(pcs, path, '/apps/test_sdk/a.bin', manifest_dir,
+                 block_size=100)
+    pcs.blocks.clear()
+    content[0:1] = b'x' if content[0:1] != b'x' else b'y'
+    local_file(tmpdir, 'a.bin', bytes(content))
+    del pcs.calls[:]
+    delta_upload(pcs, path, '/apps/test_sdk/a.bin', manifest_dir,
+                 block_size=100)
+    assert pcs.files['/apps/test_sdk/a.bin'] == bytes(content)
+    assert [x[0] for x in pcs.calls].count('upload_superfile') == 2
+    assert len([x for x in pcs.calls if x[0] == 'upload_tmpfile']) == 10
+
+
+def test_download_resume(tmpdir):
+    pcs = FakePCS()
+    content = os.urandom(1000)
+    pcs.files['/apps/test_sdk/big'] = content
+    path = str(tmpdir.join('big'))
+    local_file(tmpdir, 'big.part', content[:300])
+    response = download_file(pcs, '/apps/test_sdk/big', path)
+    assert response.status_code == 206
+    with open(path, 'rb') as f:
+        assert f.read() == content
+    assert not os.path.exists(path + '.part')
+
+
+def test_upload_integrity(tmpdir):
+    pcs = FakePCS()
+    path = local_file(tmpdir, 'big', os.urandom(1000))
+    upload_tmpfile = pcs.upload_tmpfile
+
+    def corrupt_upload_tmpfile(file_content, **kwargs):
+        upload_tmpfile(file_content, **kwargs)
+        return FakeResponse({'md5': '0' * 32})
+    pcs.upload_tmpfile = corrupt_upload_tmpfile
+    with pytest.raises(IntegrityError) as e:
+        upload_file(pcs, path, '/apps/test_sdk/big', block_size=100)
+    assert e.value.expected == '0' * 32
+    assert '/apps/test_sdk/big' not in pcs.files
+
+
+def test_download_integrity(tmpdir):
+    pcs = FakePCS()
+    content = os.urandom(1000)
+    pcs.files['/apps/test_sdk/big'] = content
+    path = str(tmpdir.join('big'))
+    local_file(tmpdir, 'big.part', b'x' * 300)
+    with pytest.raises(IntegrityError):
+        download_file(pcs, '/apps/test_sdk/big', path,
+                      expected_md5=content_md5(content))
+    assert not os.path.exists(path + '.part')
+
+    download_file(pcs, '/apps/test_sdk/big', path,
+                  expected_md5=content_md5(content))
+    with open(path, 'rb') as f:
+        assert f.read() == content
+
+
+def test_upload_adaptive(tmpdir):
+    pcs = FakePCS()
+    content = os.urandom(10000)
+    path = local_file(tmpdir, 'big', content)
+    sizes = []
+
+    class Controller(AdaptiveController):
+        def record(self, nbytes, seconds, ok):
+            sizes.append(nbytes)
+            # 固定的延迟加上传输时间：分片越大吞吐量越高
+            super(Controller, self).record(nbytes, 0.01 + nbytes / 1e6, ok)
+
+    controller = Controller(initial_chunk=100, min_chunk=50, max_chunk=1000,
+                            initial_streams=1, max_streams=1, window=2)
+    upload_file(pcs, path, '/apps/test_sdk/big', controller=controller)
+    assert pcs.files['/apps/test_sdk/big'] == content
+    assert sizes[:6] == [100, 100, 200, 200, 400, 400]
+    assert max(sizes) == 1000
+    assert sum(sizes) == len(content)
+
+
+def test_download_adaptive_resume(tmpdir):
+    pcs = FakePCS()
+    content = os.urandom(10000)
+    pcs.files['/apps/test_sdk/big'] = content
+    path = str(tmpdir.join('big'))
+    flaky = {'count': 0}
+    download = pcs.download
+
+    def flaky_download(remote_path, headers=None, **kwargs):
+        flaky['count'] += 1
+        if flaky['count'] % 3 == 0:
+            raise IOError('connection reset')
+        return download(remote_path, headers=headers, **kwargs)
+    pcs.download = flaky_download
+
+    controller = AdaptiveController(initial_chunk=1000, min_chunk=100,
+                                    max_streams=4)
+    response = download_file(pcs, '/apps/test_sdk/big', path, chunk_size=64,
+                             controller=controller,
+                             expected_md5=content_md5(content))
+    assert response.status_code == 206
+    with open(path, 'rb') as f:
+        assert f.read() == content
+    assert not os.path.exists(path + '.part.json')
+
+
+def test_download_ranges_md5(tmpdir):
+    pcs = FakePCS()
+    content = os.urandom(1000)
+    pcs.files['/apps/test_sdk/big'] = content
+    path = str(tmpdir.join('big'))
+    controller = FixedController(100, 4)
+    with pytest.raises(IntegrityError):
+        download_file(pcs, '/apps/test_sdk/big', path, controller=controller,
+                      expected_md5='0' * 32)
+    assert not os.path.exists(path + '.part')
+    assert not os.path.exists(path)
+    # 没有指定 expected_md5 时只比较大小
+    download_file(pcs, '/apps/test_sdk/big', path, controller=controller)
+    with open(path, 'rb') as f:
+        assert f.read() == content
+
+
+def test_download_ignores_header_md5(tmpdir):
+    pcs = FakePCS()
+    content = os.urandom(1000)
+    pcs.files['/apps/test_sdk/big'] = content
+    path = str(tmpdir.join('big'))
+    download = pcs.download
+
+    def superfile_download(remote_path, headers=None, **kwargs):
+        # 分片上传合并得到的文件的 Content-MD5 不是内容的 MD5
+        response = download(remote_path, headers=headers, **kwargs)
+        response.headers['Content-MD5'] = '0' * 32
+        return response
+    pcs.download = superfile_download
+    download_file(pcs, '/apps/test_sdk/big', path)
+    with open(path, 'rb') as f:
+        assert f.read() == content
+
+
+def test_download_size_mismatch_keeps_part(tmpdir):
+    pcs = FakePCS()
+    content = os.urandom(1000)
+    pcs.files['/apps/test_sdk/big'] = content
+    path = str(tmpdir.join('big'))
+    download = pcs.download
+
+    def truncated_download(remote_path, headers=None, **kwargs):
+        response = download(remote_path, headers=headers, **kwargs)
+        response.content = response.content[:400]
+        return response
+    pcs.download = truncated_download
+    with pytest.raises(IntegrityError) as e:
+        download_file(pcs, '/apps/test_sdk/big', path)
+    assert (e.value.expected, e.value.actual) == (1000, 400)
+    assert os.path.getsize(path + '.part') == 400
+    assert not os.path.exists(path)
+
+    pcs.download = download
+    download_file(pcs, '/apps/test_sdk/big', path)
+    with open(path, 'rb') as f:
+        assert f.read() == content
+
+
+def test_controller():
+    controller = AdaptiveController(initial_chunk=1024, min_chunk=256,
+                                    initial_streams=4, window=1)
+    controller.record(1024, 0.1, False)
+    assert (controller.chunk_size, controller.streams) == (512, 2)
+    controller.record(512, 0.1, True)
+    assert (controller.chunk_size, controller.streams) == (1024, 3)
+
+
+def test_controller_throughput():
+    controller = AdaptiveController(initial_chunk=1024, min_chunk=256,
+                                    initial_streams=2, window=2)
+    # 吞吐量 2048 / 2 * 2 = 2048
+    controller.record(1024, 1.0, True)
+    controller.record(1024, 1.0, True)
+    assert (controller.chunk_size, controller.streams) == (2048, 3)
+    # 吞吐量升高到 4096 / 2 * 3 = 6144 ，继续增大
+    controller.record(2048, 1.0, True)
+    controller.record(2048, 1.0, True)
+    assert (controller.chunk_size, controller.streams) == (4096, 4)
+    # 吞吐量降低到 8192 / 8 * 4 = 4096 ，反向调整
+    controller.record(4096, 4.0, True)
+    controller.record(4096, 4.0, True)
+    assert (controller.chunk_size, controller.streams) == (2048, 3)
+    # 吞吐量 4096 / 1 * 3 = 12288 高于上一次，继续减小
+    controller.record(2048, 0.5, True)
+    controller.record(2048, 0.5, True)
+    assert (controller.chunk_size, controller.streams) == (1024, 2)
+    # 失败时减半
+    controller.record(1024, 0.1, False)
+    assert (controller.chunk_size, controller.streams) == (512, 1)
+
+
+def test_run_chunks_max_chunks():
+    chunks = list(run_chunks(FixedController(10, 2), 1000,
+                             lambda offset, length: length, max_chunks=20))
+    assert len(chunks) <= 20
+    assert sum(x[1] for x in chunks) == 1000
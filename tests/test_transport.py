@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import pytest
+
+from baidupcs import PCS, InvalidToken
+from baidupcs.breaker import CircuitBreakers
+from baidupcs.transport import AsyncTransport, MemoryTransport
+
+
+def test_memory_transport():
+    transport = MemoryTransport(record=True)
+    transport.add('info', {'quota': 100, 'used': 1})
+    pcs = PCS('token', transport=transport)
+    assert pcs.info().json() == {'quota': 100, 'used': 1}
+    assert pcs.meta('/apps/test_sdk/a.txt').status_code == 404
+    pcs.list_files('/apps/test_sdk', by='name', order=None)
+    pcs.upload('/apps/test_sdk/a.txt', b'abc', ondup=None)
+    assert transport.count == 4
+    http_method, url, params, data = transport.requests[2]
+    assert (http_method, params) == ('GET', {
+        'method': 'list', 'access_token': 'token',
+        'path': '/apps/test_sdk', 'by': 'name'})
+    http_method, url, params, data = transport.requests[3]
+    assert http_method == 'POST'
+    assert url == 'https://c.pcs.baidu.com/rest/2.0/pcs/file'
+    assert params == {'method': 'upload', 'access_token': 'token',
+                      'path': '/apps/test_sdk/a.txt'}
+    assert b'abc' in data
+
+
+def test_invalid_token():
+    transport = MemoryTransport()
+    transport.add('info', {'error_code': 110}, status_code=401)
+    with pytest.raises(InvalidToken):
+        PCS('token', transport=transport).info()
+
+
+def test_async_transport():
+    transport = MemoryTransport()
+    transport.add('info', {'quota': 100, 'used': 1})
+    transport.add('meta', {'error_code': 110}, status_code=401)
+    pcs = PCS('token', transport=AsyncTransport(transport, workers=2))
+    futures = [pcs.info() for _ in range(5)]
+    assert [x.result().json()['quota'] for x in futures] == [100] * 5
+    with pytest.raises(InvalidToken):
+        pcs.meta('/apps/test_sdk/a.txt').result()
+    pcs.transport.close()
+
+    with pytest.raises(ValueError):
+        PCS('token', transport=AsyncTransport(transport),
+            breakers=CircuitBreakers())
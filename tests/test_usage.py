@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import os
+import tempfile
+
+from baidupcs import MetadataIndex
+from baidupcs.usage import Usage, disk_usage, walk
+from .utils import FakePCS
+
+
+def _pcs():
+    pcs = FakePCS()
+    pcs.upload('/apps/a/1.txt', b'1')
+    pcs.upload('/apps/a/x/2.txt', b'22')
+    pcs.upload('/apps/a/x/y/3.txt', b'333')
+    pcs.upload('/apps/a/z/4.txt', b'4444')
+    return pcs
+
+
+def test_walk():
+    paths = sorted(x.path for x in walk(_pcs(), '/apps/a', workers=2))
+    assert paths == ['/apps/a/1.txt', '/apps/a/x', '/apps/a/x/2.txt',
+                     '/apps/a/x/y', '/apps/a/x/y/3.txt', '/apps/a/z',
+                     '/apps/a/z/4.txt']
+
+
+def test_disk_usage():
+    usage = disk_usage(_pcs(), '/apps/a', depth=1)
+    assert usage == {
+        '/apps/a': Usage(10, 4),
+        '/apps/a/x': Usage(5, 2),
+        '/apps/a/z': Usage(4, 1),
+    }
+    assert disk_usage(_pcs(), '/apps/a/') == {'/apps/a': Usage(10, 4)}
+
+
+def test_disk_usage_index():
+    pcs = _pcs()
+    fd, filename = tempfile.mkstemp()
+    os.close(fd)
+    os.remove(filename)
+    try:
+        index = MetadataIndex.load(filename)
+        usage = disk_usage(pcs, '/apps/a', index=index)
+        assert usage['/apps/a'] == Usage(10, 4)
+        index.save(filename)
+
+        pcs.delete('/apps/a/z/4.txt')
+        pcs.upload('/apps/a/5.txt', b'55555')
+        pcs.calls = []
+        index = MetadataIndex.load(filename)
+        cursor = index.cursor
+        usage = disk_usage(pcs, '/apps/a', depth=1, index=index)
+        assert usage['/apps/a'] == Usage(11, 4)
+        assert usage['/apps/a/x'] == Usage(5, 2)
+        assert pcs.calls == [('diff', cursor)]
+    finally:
+        if os.path.exists(filename):
+            os.remove(filename)
@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import time
+
+import pytest
+
+from baidupcs.utils import imap_unordered, replace_file
+from .utils import local_file
+
+
+def test_imap_unordered():
+    def slow_square(x):
+        time.sleep(0.01 * (5 - x))
+        return x * x
+    results = dict(imap_unordered(slow_square, range(5), workers=5))
+    assert results == dict((x, x * x) for x in range(5))
+
+
+def test_imap_unordered_error():
+    def fail(x):
+        raise ValueError(x)
+    with pytest.raises(ValueError):
+        list(imap_unordered(fail, range(3)))
+
+
+def test_replace_file(tmpdir):
+    src = local_file(tmpdir, 'a.tmp', b'new')
+    dst = local_file(tmpdir, 'a', b'old')
+    replace_file(src, dst)
+    with open(dst, 'rb') as f:
+        assert f.read() == b'new'
+    assert not tmpdir.join('a.tmp').check()
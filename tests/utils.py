@@ -2,6 +2,8 @@
 # -*- coding: utf-8 -*-
 
 from hashlib import md5
+import json
+import threading
 from zlib import crc32
 
 
@@ -18,3 +20,205 @@ def content_crc32(content):
 def slice_md5(content):
     """待秒传文件校验段的MD5."""
     return md5(content[:1024 * 256]).hexdigest()
+
+
+def local_file(tmpdir, name, content):
+    """在 pytest 的 ``tmpdir`` 中创建内容为 ``content`` 的文件，返回路径."""
+    path = str(tmpdir.join(name))
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path
+
+
+class FakeResponse(object):
+    """测试用的 Response 对象."""
+    encoding = 'utf-8'
+
+    def __init__(self, data=None, content=None, status_code=200,
+                 headers=None):
+        if content is None:
+            content = json.dumps(data).encode('utf-8')
+        self.content = content
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.ok = status_code < 400
+
+    def json(self):
+        return json.loads(self.content.decode('utf-8'))
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise IOError(self.status_code)
+
+    def close(self):
+        pass
+
+
+class FakePCS(object):
+    """把文件保存在内存中的 PCS ，用于测试."""
+
+    def __init__(self):
+        self.files = {}
+        self.dirs = set()
+        self.blocks = {}
+        self.mtimes = {}
+        self.calls = []
+        self.changes = []
+        self.lock = threading.Lock()
+
+    def _call(self, name, *args):
+        with self.lock:
+            self.calls.append((name,) + args)
+
+    def _entry(self, path):
+        isdir = path not in self.files
+        return {'fs_id': abs(hash(path)), 'path': path, 'isdir': int(isdir),
+                'size': 0 if isdir else len(self.files[path]),
+                'md5': '' if isdir else content_md5(self.files[path]),
+                'mtime': self.mtimes.get(path, 0), 'ctime': 0}
+
+    def _save(self, remote_path, content):
+        self.files[remote_path] = content
+        # 用修改的次数代替时间，保证先后顺序
+        self.mtimes[remote_path] = len(self.changes) + 1
+        self.changes.append(self._entry(remote_path))
+
+    def _read(self, file_content):
+        if hasattr(file_content, 'read'):
+            return file_content.read()
+        return file_content
+
+    def upload(self, remote_path, file_content, ondup=None, **kwargs):
+        self._call('upload', remote_path)
+        self._save(remote_path, self._read(file_content))
+        return FakeResponse(self._entry(remote_path))
+
+    def upload_tmpfile(self, file_content, **kwargs):
+        content = self._read(file_content)
+        self._call('upload_tmpfile', len(content))
+        self.blocks[content_md5(content)] = content
+        return FakeResponse({'md5': content_md5(content)})
+
+    def upload_superfile(self, remote_path, block_list, ondup=None,
+                         **kwargs):
+        self._call('upload_superfile', remote_path)
+        if not all(x in self.blocks for x in block_list):
+            return FakeResponse({'error_code': 31363}, status_code=400)
+        self._save(remote_path, b''.join(self.blocks[x] for x in block_list))
+        return FakeResponse(self._entry(remote_path))
+
+    def download(self, remote_path, headers=None, **kwargs):
+        self._call('download', remote_path)
+        content = self.files[remote_path]
+        range_ = (headers or {}).get('Range')
+        if not range_:
+            return FakeResponse(content=content, headers={
+                'Content-Length': str(len(content))})
+        start, end = range_.split('=')[1].split('-')
+        start = int(start)
+        end = min(int(end) + 1 if end else len(content), len(content))
+        if start >= len(content):
+            return FakeResponse(content=b'', status_code=416)
+        return FakeResponse(content=content[start:end], status_code=206,
+                            headers={'Content-Length': str(end - start),
+                                     'Content-Range': 'bytes %d-%d/%d' % (
+                                         start, end - 1, len(content))})
+
+    def _exists(self, path):
+        prefix = path.rstrip('/') + '/'
+        return (path in self.files or path in self.dirs or
+                any(x.startswith(prefix) for x in self.files) or
+                any(x.startswith(prefix) for x in self.dirs))
+
+    def meta(self, remote_path, **kwargs):
+        self._call('meta', remote_path)
+        if not self._exists(remote_path):
+            return FakeResponse({'error_code': 31066}, status_code=404)
+        return FakeResponse({'list': [self._entry(remote_path)]})
+
+    def mkdir(self, remote_path, **kwargs):
+        self._call('mkdir', remote_path)
+        self.dirs.add(remote_path)
+        return FakeResponse({'path': remote_path})
+
+    def list_files(self, remote_path, **kwargs):
+        self._call('list_files', remote_path)
+        prefix = remote_path.rstrip('/') + '/'
+        children = set()
+        for path in list(self.files) + list(self.dirs):
+            if path.startswith(prefix):
+                children.add(prefix + path[len(prefix):].split('/')[0])
+        return FakeResponse({'list': [self._entry(x)
+                                      for x in sorted(children)]})
+
+    def info(self, **kwargs):
+        used = sum(len(x) for x in self.files.values())
+        return FakeResponse({'quota': 1024 ** 3, 'used': used})
+
+    def delete(self, remote_path, **kwargs):
+        self._call('delete', remote_path)
+        prefix = remote_path.rstrip('/') + '/'
+        for path in list(self.files):
+            if path == remote_path or path.startswith(prefix):
+                entry = self._entry(path)
+                del self.files[path]
+                self.changes.append(dict(entry, isdelete=1))
+        self.dirs = set(x for x in self.dirs
+                        if x != remote_path and not x.startswith(prefix))
+        return FakeResponse({})
+
+    def multi_delete(self, path_list, **kwargs):
+        for path in path_list:
+            self.delete(path)
+        return FakeResponse({})
+
+    def move(self, from_path, to_path, **kwargs):
+        self._call('move', from_path, to_path)
+        content = self.files.pop(from_path)
+        self._save(to_path, content)
+        return FakeResponse({})
+
+    def multi_move(self, path_list, **kwargs):
+        for from_path, to_path in path_list:
+            self.move(from_path, to_path)
+        return FakeResponse({})
+
+    def diff(self, cursor='null', **kwargs):
+        self._call('diff', cursor)
+        if cursor == 'null':
+            entries = [self._entry(x) for x in self.files]
+        else:
+            entries = self.changes[int(cursor):]
+        return FakeResponse({
+            'entries': dict((x['path'], x) for x in entries),
+            'has_more': False,
+            'reset': cursor == 'null',
+            'cursor': str(len(self.changes)),
+        })
+
+    def copy(self, from_path, to_path, ondup=None, **kwargs):
+        self._call('copy', from_path, to_path)
+        if to_path in self.files and ondup != 'overwrite':
+            return FakeResponse({'error_code': 31061}, status_code=400)
+        self._save(to_path, self.files[from_path])
+        return FakeResponse({})
+
+    def multi_copy(self, path_list, **kwargs):
+        for from_path, to_path in path_list:
+            response = self.copy(from_path, to_path)
+            if not response.ok:
+                return response
+        return FakeResponse({})
+
+    def rapid_upload(self, remote_path, content_length, content_md5,
+                     content_crc32, slice_md5, ondup=None, **kwargs):
+        self._call('rapid_upload', remote_path)
+        for content in list(self.files.values()):
+            if md5(content).hexdigest() == content_md5:
+                self._save(remote_path, content)
+                return FakeResponse(self._entry(remote_path))
+        return FakeResponse({'error_code': 31079}, status_code=404)